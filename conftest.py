@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from hashlib import sha256
 
 import pytest
+from django.core.cache import caches
 from django.db.models.deletion import ProtectedError
 from django.http import QueryDict
 from django.utils.timezone import make_aware
@@ -11,6 +12,7 @@ from rest_framework.test import APIClient
 
 from haven.api.models import ApplicationProfile
 from haven.core import recipes
+from haven.data.caching import clear_process_caches
 from haven.data.tiers import Tier
 from haven.identity.models import User
 from haven.identity.roles import UserRole
@@ -26,6 +28,14 @@ class Helpers:
         assert "/login/" in response.url
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Caches outlive the test database, so make sure each test starts with empty ones"""
+    for cache in caches.all():
+        cache.clear()
+    clear_process_caches()
+
+
 @pytest.fixture
 def helpers():
     return Helpers
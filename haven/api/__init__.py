@@ -0,0 +1 @@
+default_app_config = "haven.api.app.APIConfig"
@@ -1,6 +1,14 @@
 from django.contrib import admin
 
-from haven.api.models import ApplicationProfile
+from haven.api.models import (
+    ApplicationProfile,
+    OutboxDelivery,
+    OutboxEvent,
+    WebhookEndpoint,
+)
 
 
 admin.site.register(ApplicationProfile)
+admin.site.register(WebhookEndpoint)
+admin.site.register(OutboxEvent)
+admin.site.register(OutboxDelivery)
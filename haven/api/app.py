@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class APIConfig(AppConfig):
-    name = "api"
+    name = "haven.api"
+
+    def ready(self):
+        # Connect signal receivers for webhook events and cache invalidation
+        from haven.api import signals  # noqa: F401
@@ -0,0 +1,95 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from oauth2_provider.models import AccessToken
+
+from haven.api.models import ApplicationProfile
+
+
+def get_token_cache():
+    return caches[settings.API_TOKEN_CACHE]
+
+
+def token_cache_key(token):
+    """Cache key for an access token, which avoids storing the token itself in the cache"""
+    return "api-access-token:" + sha256(token.encode()).hexdigest()
+
+
+def get_bearer_token(request):
+    """Return the bearer token from the request's Authorization header, if there is one"""
+    auth = request.META.get("HTTP_AUTHORIZATION", "").split()
+    if len(auth) == 2 and auth[0].lower() == "bearer":
+        return auth[1]
+    return None
+
+
+def cache_access_token(access_token):
+    """
+    Cache a validated access token, along with its user, application and the application's maximum
+    tier
+
+    The entry expires when the token does, or after `API_TOKEN_CACHE_SECONDS` if that is sooner, so
+    that revocations made in another process are picked up even when the cache is not shared.
+    """
+    profile = ApplicationProfile.objects.filter(application_id=access_token.application_id).last()
+    entry = {
+        "access_token": access_token,
+        "maximum_tier": profile.maximum_tier if profile else None,
+    }
+    timeout = min(
+        (access_token.expires - timezone.now()).total_seconds(),
+        settings.API_TOKEN_CACHE_SECONDS,
+    )
+    if timeout > 0:
+        get_token_cache().set(token_cache_key(access_token.token), entry, timeout)
+    return entry
+
+
+def invalidate_access_tokens(tokens):
+    """Remove the given access token strings from the cache"""
+    keys = [token_cache_key(token) for token in tokens]
+    if not keys:
+        return
+    get_token_cache().delete_many(keys)
+    # Another request may cache the old token again before the change is committed, so
+    # invalidate again once it has been
+    transaction.on_commit(lambda: get_token_cache().delete_many(keys))
+
+
+def invalidate_application_tokens(application_id):
+    """Remove all access tokens for the given application from the cache"""
+    tokens = AccessToken.objects.filter(application_id=application_id)
+    invalidate_access_tokens(tokens.values_list("token", flat=True))
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2 authentication which caches validated access tokens, so that repeated API calls with
+    the same token do not need any database queries to authenticate
+
+    The requesting application's maximum tier is stored on the request as
+    `application_maximum_tier` (None if the application has no profile).
+    """
+
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if token:
+            entry = get_token_cache().get(token_cache_key(token))
+            if entry and not entry["access_token"].is_expired():
+                access_token = entry["access_token"]
+                request.application_maximum_tier = entry["maximum_tier"]
+                return access_token.user, access_token
+
+        result = super().authenticate(request)
+        if result:
+            user, access_token = result
+            # Only cache tokens which came from the Authorization header, since those are the
+            # only ones we look up
+            if access_token.token == token:
+                entry = cache_access_token(access_token)
+                request.application_maximum_tier = entry["maximum_tier"]
+        return result
@@ -0,0 +1,84 @@
+from hashlib import sha256
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+VERSION_KEY = "api-response:version"
+HITS_KEY = "api-response:hits"
+MISSES_KEY = "api-response:misses"
+
+
+def get_response_cache():
+    return caches[settings.API_RESPONSE_CACHE]
+
+
+def get_response_version():
+    """
+    Return the current version of the data served by the API
+
+    The version is a random value rather than a counter, so that if it is evicted from the cache
+    the new version can't match one which was used before.
+    """
+    cache = get_response_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_responses():
+    """Invalidate all cached API responses by moving on to a new data version"""
+    get_response_cache().set(VERSION_KEY, uuid4().hex, None)
+    # Another request may cache a response from before the change until it has been committed, so
+    # invalidate again once it has been
+    transaction.on_commit(lambda: get_response_cache().set(VERSION_KEY, uuid4().hex, None))
+
+
+def response_cache_key(request, maximum_tier):
+    """
+    Cache key for an API response
+
+    This is made up of the requested path and query string, the requesting user, the maximum tier
+    of the requesting application, the accepted media type and the current data version.
+    """
+    parts = [
+        request.get_full_path(),
+        str(request.user.pk),
+        str(maximum_tier),
+        request.accepted_media_type,
+        get_response_version(),
+    ]
+    return "api-response:" + sha256("\n".join(parts).encode()).hexdigest()
+
+
+def _increment(key):
+    cache = get_response_cache()
+    # `add` is a no-op if the counter already exists, so this is safe with concurrent requests
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between `add` and `incr`
+        cache.add(key, 1, None)
+
+
+def record_hit():
+    _increment(HITS_KEY)
+
+
+def record_miss():
+    _increment(MISSES_KEY)
+
+
+def get_response_cache_stats():
+    """Return the number of API responses served from and missing from the cache"""
+    values = get_response_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": values.get(HITS_KEY, 0), "misses": values.get(MISSES_KEY, 0)}
+
+
+def reset_response_cache_stats():
+    get_response_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -2,13 +2,18 @@ from django import forms
 from oauth2_provider.models import Application
 from sentry_sdk import capture_message
 
-from haven.api.models import ApplicationProfile
+from haven.api.models import ApplicationProfile, WebhookEndpoint
 
 
 class ApplicationCreateOrUpdateForm(forms.ModelForm):
     """A custom form for use in OAuth application management views"""
 
     maximum_tier = forms.IntegerField(initial=4, min_value=0, max_value=4)
+    webhook_url = forms.URLField(
+        required=False,
+        max_length=2048,
+        help_text="URL to send signed notifications of classification and access changes to",
+    )
 
     class Meta:
         model = Application
@@ -34,4 +39,12 @@ class ApplicationCreateOrUpdateForm(forms.ModelForm):
             capture_message(
                 f"Unable to save maximum tier to profile for application '{application.name}'"
             )
+        # Save or remove the application's webhook endpoint
+        webhook_url = self.cleaned_data.get("webhook_url")
+        if webhook_url:
+            WebhookEndpoint.objects.update_or_create(
+                application=application, defaults={"url": webhook_url}
+            )
+        else:
+            WebhookEndpoint.objects.filter(application=application).delete()
         return application
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from haven.api.caching import (
+    get_response_cache_stats,
+    reset_response_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    help = "Show the number of API responses served from the response cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters after showing them"
+        )
+
+    def handle(self, *args, **options):
+        stats = get_response_cache_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total if total else 0
+        self.stdout.write(f"Hits: {stats['hits']}")
+        self.stdout.write(f"Misses: {stats['misses']}")
+        self.stdout.write(f"Hit ratio: {ratio:.1%}")
+        if options["reset"]:
+            reset_response_cache_stats()
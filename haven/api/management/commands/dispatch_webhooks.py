@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from haven.api.webhooks import dispatch_pending_deliveries
+
+
+class Command(BaseCommand):
+    help = "Deliver pending webhook callbacks to registered OAuth applications"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Deliver whatever is currently due and exit, rather than polling forever",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.WEBHOOK_POLL_INTERVAL_SECONDS,
+            help="Seconds to wait between polls when there is nothing to deliver",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            delivered, failed = dispatch_pending_deliveries()
+            if delivered or failed:
+                self.stdout.write(f"Delivered {delivered} events, {failed} failed")
+            if options["once"]:
+                break
+            if not (delivered or failed):
+                time.sleep(options["interval"])
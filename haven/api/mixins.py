@@ -1,3 +1,15 @@
+from django.conf import settings
+from django.http import HttpResponse
+
+from haven.api.caching import (
+    get_response_cache,
+    record_hit,
+    record_miss,
+    response_cache_key,
+)
+from haven.api.utils import get_maximum_tier_filter
+
+
 class ExtraFilterKwargsMixin:
     """
     Mixin for use in API views which are nested under another detail view url path
@@ -16,3 +28,42 @@ class ExtraFilterKwargsMixin:
             if filter_kwarg in self.kwargs:
                 extra_filters = {filter_kwarg: self.kwargs[filter_kwarg]}
         return extra_filters
+
+
+class CachedResponseMixin:
+    """
+    Mixin for read only API views which caches rendered JSON responses
+
+    Responses are cached per user and per maximum tier of the requesting application, and are
+    invalidated whenever the projects, work packages, datasets or memberships they are built from
+    change (see `haven.api.signals`). Cache hits are served without running the accessibility
+    queries. The `X-Cache` response header records whether the response was served from the
+    cache.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return super().get(request, *args, **kwargs)
+
+        maximum_tier = get_maximum_tier_filter(request, "tier").get("tier")
+        key = response_cache_key(request, maximum_tier)
+        cached = get_response_cache().get(key)
+        if cached is not None:
+            record_hit()
+            return self.cached_response(cached, "HIT")
+
+        record_miss()
+        response = super().get(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        content = request.accepted_renderer.render(
+            response.data, request.accepted_media_type, self.get_renderer_context()
+        )
+        cached = {"content": content, "content_type": request.accepted_media_type}
+        get_response_cache().set(key, cached, settings.API_RESPONSE_CACHE_SECONDS)
+        return self.cached_response(cached, "MISS")
+
+    def cached_response(self, cached, status):
+        response = HttpResponse(cached["content"], content_type=cached["content_type"])
+        response["X-Cache"] = status
+        return response
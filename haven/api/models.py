@@ -1,8 +1,17 @@
+import secrets
+from uuid import uuid4
+
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 from oauth2_provider.models import Application
 
 
+def generate_webhook_secret():
+    """Generate a random secret used to sign webhook callbacks"""
+    return secrets.token_hex(32)
+
+
 class ApplicationProfile(models.Model):
     """Model to track extra information about an Oauth Client Application"""
 
@@ -15,3 +24,81 @@ class ApplicationProfile(models.Model):
 
     def __str__(self):
         return self.application.name
+
+
+class WebhookEndpoint(models.Model):
+    """URL which an Oauth Client Application receives change notifications on"""
+
+    application = models.OneToOneField(
+        Application, on_delete=models.CASCADE, related_name="webhook"
+    )
+    url = models.URLField(max_length=2048)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret, editable=False)
+    active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.application.name}: {self.url}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A change notification for downstream systems
+
+    Events are written in the same transaction as the change they describe, so a notification is
+    only ever sent for a change which has actually been committed.
+    """
+
+    WORK_PACKAGE_CLASSIFIED = "work_package.classified"
+    PARTICIPANT_REMOVED = "participant.removed"
+    WORK_PACKAGE_PARTICIPANT_REMOVED = "work_package_participant.removed"
+    EVENT_TYPE_CHOICES = (
+        (WORK_PACKAGE_CLASSIFIED, "Work package classified"),
+        (PARTICIPANT_REMOVED, "Participant removed from project"),
+        (WORK_PACKAGE_PARTICIPANT_REMOVED, "Participant removed from work package"),
+    )
+
+    uuid = models.UUIDField(default=uuid4, unique=True, editable=False)
+    event_type = models.CharField(max_length=64, choices=EVENT_TYPE_CHOICES)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} ({self.uuid})"
+
+    def as_dict(self):
+        return {
+            "id": str(self.uuid),
+            "type": self.event_type,
+            "created_at": str(self.created_at),
+            "data": self.payload,
+        }
+
+
+class OutboxDelivery(models.Model):
+    """Tracks delivery of a single `OutboxEvent` to a single `WebhookEndpoint`"""
+
+    STATUS_PENDING = "pending"
+    STATUS_DELIVERED = "delivered"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_DELIVERED, "Delivered"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    event = models.ForeignKey(OutboxEvent, on_delete=models.CASCADE, related_name="deliveries")
+    endpoint = models.ForeignKey(
+        WebhookEndpoint, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ("event", "endpoint")
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.event} -> {self.endpoint} ({self.status})"
@@ -0,0 +1,36 @@
+"""Responses of the work package policies API view, rendered once per tier"""
+from collections import namedtuple
+from hashlib import sha256
+
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from haven.api.serializers import TierPoliciesSerializer
+from haven.data.caching import ProcessCache
+from haven.projects import policy_bundles
+
+
+PolicyPayload = namedtuple("PolicyPayload", ["content", "etag"])
+
+# tier -> PolicyPayload
+_payloads = ProcessCache(generation_key=policy_bundles.GENERATION_KEY)
+
+
+def get_policy_payload(tier):
+    """Return the rendered JSON of a tier's policies, grouped by policy group, and its ETag"""
+    payloads = _payloads.values
+    if tier not in payloads:
+        groups = {}
+        for assignment in policy_bundles.get_policy_bundle(tier):
+            group = assignment.policy.group
+            if group.id not in groups:
+                groups[group.id] = {
+                    "name": group.name,
+                    "description": group.description,
+                    "policies": [],
+                }
+            groups[group.id]["policies"].append(assignment.policy)
+        data = TierPoliciesSerializer({"tier": tier, "groups": list(groups.values())}).data
+        content = JSONRenderer().render(data)
+        payloads[tier] = PolicyPayload(content, quote_etag(sha256(content).hexdigest()))
+    return payloads[tier]
@@ -159,3 +159,28 @@ class WorkPackageSerializer(serializers.ModelSerializer):
             "created_at",
             "created_by",
         ]
+
+
+class PolicySerializer(serializers.Serializer):
+    """Class for converting a policy of a tier into a JSON representation."""
+
+    name = serializers.CharField(read_only=True)
+    description = serializers.CharField(read_only=True)
+
+
+class PolicyGroupSerializer(serializers.Serializer):
+    """Class for converting a policy group and its policies into a JSON representation."""
+
+    name = serializers.CharField(read_only=True)
+    description = serializers.CharField(read_only=True)
+    policies = PolicySerializer(many=True, read_only=True)
+
+
+class TierPoliciesSerializer(serializers.Serializer):
+    """
+    Class for converting the policies of a tier, grouped by policy group, into a JSON
+    representation. To be used with `haven.api.policies.get_policy_payload`.
+    """
+
+    tier = serializers.IntegerField(read_only=True)
+    groups = PolicyGroupSerializer(many=True, read_only=True)
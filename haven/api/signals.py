@@ -0,0 +1,115 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from oauth2_provider.models import AccessToken
+
+from haven.api.authentication import (
+    invalidate_access_tokens,
+    invalidate_application_tokens,
+)
+from haven.api.caching import invalidate_responses
+from haven.api.models import ApplicationProfile, OutboxEvent
+from haven.api.webhooks import record_event
+from haven.data.models import Dataset
+from haven.projects.models import (
+    Participant,
+    Project,
+    ProjectDataset,
+    WorkPackage,
+    WorkPackageDataset,
+    WorkPackageParticipant,
+)
+from haven.projects.signals import work_package_classified
+
+
+@receiver(work_package_classified, sender=WorkPackage)
+def work_package_classified_event(sender, work_package, **kwargs):
+    record_event(
+        OutboxEvent.WORK_PACKAGE_CLASSIFIED,
+        {
+            "project": str(work_package.project.uuid),
+            "work_package": str(work_package.uuid),
+            "tier": work_package.tier,
+        },
+        tier=work_package.tier,
+    )
+
+
+@receiver(post_delete, sender=Participant)
+def participant_removed_event(sender, instance, **kwargs):
+    record_event(
+        OutboxEvent.PARTICIPANT_REMOVED,
+        {
+            "project": str(instance.project.uuid),
+            "user": str(instance.user.uuid),
+            "role": instance.role,
+        },
+    )
+
+
+@receiver(post_delete, sender=WorkPackageParticipant)
+def work_package_participant_removed_event(sender, instance, **kwargs):
+    # Work package participants are deleted before the participant or work package they belong
+    # to when cascading, so both are still available here
+    participant = instance.participant
+    work_package = instance.work_package
+    record_event(
+        OutboxEvent.WORK_PACKAGE_PARTICIPANT_REMOVED,
+        {
+            "project": str(work_package.project.uuid),
+            "work_package": str(work_package.uuid),
+            "user": str(participant.user.uuid),
+        },
+        tier=work_package.tier,
+    )
+
+
+@receiver(pre_save, sender=AccessToken)
+@receiver(post_delete, sender=AccessToken)
+def access_token_changed(sender, instance, **kwargs):
+    # Refreshing a token can change the token string of an existing row, so invalidate the old
+    # value as well as the new one
+    tokens = {instance.token}
+    if instance.pk:
+        tokens.update(AccessToken.objects.filter(pk=instance.pk).values_list("token", flat=True))
+    invalidate_access_tokens(tokens)
+
+
+@receiver(post_save, sender=ApplicationProfile)
+@receiver(post_delete, sender=ApplicationProfile)
+def application_profile_changed(sender, instance, **kwargs):
+    # Cached tokens hold the application's maximum tier
+    invalidate_application_tokens(instance.application_id)
+
+
+# Models which the API responses are built from, either directly or through the accessibility
+# checks on the requesting user's memberships
+API_RESPONSE_MODELS = [
+    Dataset,
+    Participant,
+    Project,
+    ProjectDataset,
+    WorkPackage,
+    WorkPackageDataset,
+    WorkPackageParticipant,
+]
+
+
+def api_data_changed(sender, **kwargs):
+    invalidate_responses()
+
+
+for model in API_RESPONSE_MODELS:
+    post_save.connect(api_data_changed, sender=model, dispatch_uid=f"api_response_{model.__name__}")
+    post_delete.connect(
+        api_data_changed, sender=model, dispatch_uid=f"api_response_{model.__name__}"
+    )
+    # Adding to or removing from a many to many relation doesn't send `post_save` or `post_delete`
+    # for the intermediate model
+    m2m_changed.connect(
+        api_data_changed, sender=model, dispatch_uid=f"api_response_{model.__name__}"
+    )
@@ -41,6 +41,11 @@ urlpatterns = [
         views.WorkPackageDetailAPIView.as_view(),
         name="project_work_package_detail",
     ),
+    path(
+        "projects/<slug:project__uuid>/work_packages/<slug:uuid>/policies",
+        views.WorkPackagePoliciesAPIView.as_view(),
+        name="project_work_package_policies",
+    ),
     path(
         # Notice the plural `projects__uuid` rather than `project__uuid`
         # Work packages have a fk to project whereas datasets have a M2M relation with projects
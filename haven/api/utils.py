@@ -36,6 +36,12 @@ def get_maximum_tier_filter(request, filter_key="work_packages__tier__lte"):
     request
     """
     max_tier_filter = {}
+    # `CachedOAuth2Authentication` stores the maximum tier on the request, which saves looking up
+    # the application and its profile again
+    if hasattr(request, "application_maximum_tier"):
+        if request.application_maximum_tier is not None:
+            max_tier_filter[filter_key] = request.application_maximum_tier
+        return max_tier_filter
     application = Application.objects.filter(id=request._auth.application_id).last()
     if application:
         application_profile = ApplicationProfile.objects.filter(application=application).last()
@@ -1,15 +1,21 @@
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from oauth2_provider.contrib.rest_framework import TokenHasScope
 from oauth2_provider.views import ApplicationRegistration, ApplicationUpdate
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 
 from haven.api.forms import ApplicationCreateOrUpdateForm
-from haven.api.mixins import ExtraFilterKwargsMixin
+from haven.api.mixins import CachedResponseMixin, ExtraFilterKwargsMixin
+from haven.api.policies import get_policy_payload
 from haven.api.serializers import (
     DatasetExpirySerializer,
     DatasetSerializer,
     ProjectSerializer,
+    TierPoliciesSerializer,
     WorkPackageSerializer,
 )
 from haven.api.utils import (
@@ -19,7 +25,7 @@ from haven.api.utils import (
 )
 
 
-class DatasetListAPIView(ExtraFilterKwargsMixin, generics.ListAPIView):
+class DatasetListAPIView(CachedResponseMixin, ExtraFilterKwargsMixin, generics.ListAPIView):
     """API view to return a list of datasets that the requesting user has access to"""
 
     serializer_class = DatasetSerializer
@@ -32,7 +38,7 @@ class DatasetListAPIView(ExtraFilterKwargsMixin, generics.ListAPIView):
         return get_accessible_datasets(self.request, extra_filters=self.get_filter_kwargs())
 
 
-class DatasetDetailAPIView(ExtraFilterKwargsMixin, generics.RetrieveAPIView):
+class DatasetDetailAPIView(CachedResponseMixin, ExtraFilterKwargsMixin, generics.RetrieveAPIView):
     """API view to return the details of a dataset that the requesting user has access to"""
 
     serializer_class = DatasetSerializer
@@ -64,7 +70,7 @@ class DatasetExpiryAPIView(generics.RetrieveAPIView):
         return get_accessible_datasets(self.request)
 
 
-class ProjectListAPIView(ExtraFilterKwargsMixin, generics.ListAPIView):
+class ProjectListAPIView(CachedResponseMixin, ExtraFilterKwargsMixin, generics.ListAPIView):
     """API view to return a list of projects that the requesting user has access to"""
 
     serializer_class = ProjectSerializer
@@ -76,7 +82,7 @@ class ProjectListAPIView(ExtraFilterKwargsMixin, generics.ListAPIView):
         return get_accessible_projects(self.request, extra_filters=self.get_filter_kwargs())
 
 
-class ProjectDetailAPIView(ExtraFilterKwargsMixin, generics.RetrieveAPIView):
+class ProjectDetailAPIView(CachedResponseMixin, ExtraFilterKwargsMixin, generics.RetrieveAPIView):
     """API view to return the details of a project that the requesting user has access to"""
 
     serializer_class = ProjectSerializer
@@ -90,7 +96,7 @@ class ProjectDetailAPIView(ExtraFilterKwargsMixin, generics.RetrieveAPIView):
         return get_accessible_projects(self.request, extra_filters=self.get_filter_kwargs())
 
 
-class WorkPackageListAPIView(ExtraFilterKwargsMixin, generics.ListAPIView):
+class WorkPackageListAPIView(CachedResponseMixin, ExtraFilterKwargsMixin, generics.ListAPIView):
     """API view to return a list of work packages that the requesting user has access to"""
 
     serializer_class = WorkPackageSerializer
@@ -103,7 +109,9 @@ class WorkPackageListAPIView(ExtraFilterKwargsMixin, generics.ListAPIView):
         return get_accessible_work_packages(self.request, extra_filters=self.get_filter_kwargs())
 
 
-class WorkPackageDetailAPIView(ExtraFilterKwargsMixin, generics.RetrieveAPIView):
+class WorkPackageDetailAPIView(
+    CachedResponseMixin, ExtraFilterKwargsMixin, generics.RetrieveAPIView
+):
     """API view to return the details of a work package that the requesting user has access to"""
 
     serializer_class = WorkPackageSerializer
@@ -118,6 +126,41 @@ class WorkPackageDetailAPIView(ExtraFilterKwargsMixin, generics.RetrieveAPIView)
         return get_accessible_work_packages(self.request, extra_filters=self.get_filter_kwargs())
 
 
+class WorkPackagePoliciesAPIView(ExtraFilterKwargsMixin, generics.GenericAPIView):
+    """
+    API view to return the policies of a work package's tier, if the requesting user has access
+    to the work package
+
+    The response for each tier is rendered once and sent with a strong ETag, so clients can
+    revalidate it with `If-None-Match`. A tier's policies only change through migrations, so
+    clients may also keep it for `API_POLICY_CACHE_SECONDS` without asking again.
+    """
+
+    serializer_class = TierPoliciesSerializer
+    required_scopes = ["read"]
+    permission_classes = [IsAuthenticated, TokenHasScope]
+    lookup_field = "uuid"
+    lookup_url_kwarg = "uuid"
+    filter_kwargs = ["project__uuid"]
+
+    def get_queryset(self):
+        """Return all work packages accessible by requesting OAuth user"""
+        return get_accessible_work_packages(self.request, extra_filters=self.get_filter_kwargs())
+
+    def get(self, request, *args, **kwargs):
+        work_package = self.get_object()
+        payload = get_policy_payload(work_package.tier)
+
+        etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if "*" in etags or payload.etag in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(payload.content, content_type="application/json")
+        response["ETag"] = payload.etag
+        patch_cache_control(response, private=True, max_age=settings.API_POLICY_CACHE_SECONDS)
+        return response
+
+
 # To see original `ApplicationRegistration` view see:
 # https://github.com/jazzband/django-oauth-toolkit/blob/master/oauth2_provider/views/application.py
 class CustomApplicationRegistration(ApplicationRegistration):
@@ -145,5 +188,9 @@ class CustomClientApplicationUpdate(ApplicationUpdate):
         # e.g. in a DB which existed before this model was introduced
         except ObjectDoesNotExist:
             pass
+        try:
+            initial["webhook_url"] = self.object.webhook.url
+        except ObjectDoesNotExist:
+            pass
 
         return initial
@@ -0,0 +1,158 @@
+import hashlib
+import hmac
+import json
+import logging
+from datetime import timedelta
+from itertools import groupby
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from haven.api.models import OutboxDelivery, OutboxEvent, WebhookEndpoint
+
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Haven-Signature"
+TIMESTAMP_HEADER = "X-Haven-Timestamp"
+
+
+def record_event(event_type, payload, tier=None):
+    """
+    Write an event to the outbox, along with a pending delivery for each active webhook endpoint
+
+    This should be called inside the transaction which makes the change being notified about.
+
+    :param event_type: One of the `OutboxEvent` event type constants
+    :param payload: JSON serialisable dict describing the change
+    :param tier: Tier of the work package concerned, if any. Applications whose maximum tier is
+        lower than this will not be notified, in line with what they can see through the API
+    :return: `OutboxEvent` object
+    """
+    event = OutboxEvent.objects.create(event_type=event_type, payload=payload)
+    endpoints = WebhookEndpoint.objects.filter(active=True)
+    if tier is not None:
+        endpoints = endpoints.exclude(application__profile__maximum_tier__lt=tier)
+    OutboxDelivery.objects.bulk_create(
+        [OutboxDelivery(event=event, endpoint=endpoint) for endpoint in endpoints]
+    )
+    return event
+
+
+def sign_payload(secret, timestamp, body):
+    """
+    Return the signature sent with a webhook callback
+
+    Receivers should compute the HMAC-SHA256 of `<timestamp>.<body>` using the secret shown on the
+    application detail page and compare it with the `X-Haven-Signature` header.
+    """
+    message = f"{timestamp}.".encode() + body
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def send_events(endpoint, events):
+    """
+    POST a batch of events to a webhook endpoint
+
+    :return: None if the endpoint accepted the events, or a description of the error otherwise
+    """
+    body = json.dumps({"events": [event.as_dict() for event in events]}).encode()
+    timestamp = str(int(timezone.now().timestamp()))
+    headers = {
+        "Content-Type": "application/json",
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: sign_payload(endpoint.secret, timestamp, body),
+    }
+    try:
+        response = requests.post(
+            endpoint.url, data=body, headers=headers, timeout=settings.WEBHOOK_TIMEOUT_SECONDS
+        )
+    except requests.RequestException as e:
+        return str(e)
+    if not 200 <= response.status_code < 300:
+        return f"HTTP {response.status_code}"
+    return None
+
+
+def claim_due_deliveries(limit):
+    """
+    Return pending deliveries which are due, pushing back their next attempt so that other
+    dispatchers running at the same time will not pick them up as well
+
+    Deliveries to inactive endpoints are left pending, and are sent if the endpoint is made active
+    again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxDelivery.objects.select_for_update(skip_locked=True)
+            .filter(
+                status=OutboxDelivery.STATUS_PENDING,
+                next_attempt_at__lte=now,
+                endpoint__active=True,
+            )
+            .order_by("id")
+            .values_list("id", flat=True)[:limit]
+        )
+        lease = now + timedelta(seconds=settings.WEBHOOK_TIMEOUT_SECONDS * 2)
+        OutboxDelivery.objects.filter(id__in=ids).update(next_attempt_at=lease)
+    return list(
+        OutboxDelivery.objects.filter(id__in=ids)
+        .select_related("event", "endpoint")
+        .order_by("endpoint_id", "id")
+    )
+
+
+def dispatch_pending_deliveries(limit=None):
+    """
+    Deliver due webhook events, sending up to `WEBHOOK_BATCH_SIZE` events per request
+
+    Failed deliveries are retried with exponential backoff, and marked as failed once
+    `WEBHOOK_MAX_ATTEMPTS` attempts have been made.
+
+    :param limit: Maximum number of deliveries to attempt
+    :return: Tuple of (number delivered, number failed on this attempt)
+    """
+    limit = limit or settings.WEBHOOK_BATCH_SIZE * 10
+    deliveries = claim_due_deliveries(limit)
+    delivered = failed = 0
+    for endpoint, endpoint_deliveries in groupby(deliveries, key=lambda d: d.endpoint):
+        endpoint_deliveries = list(endpoint_deliveries)
+        for start in range(0, len(endpoint_deliveries), settings.WEBHOOK_BATCH_SIZE):
+            end = start + settings.WEBHOOK_BATCH_SIZE
+            batch = endpoint_deliveries[start:end]
+            error = send_events(endpoint, [d.event for d in batch])
+            if error is None:
+                _mark_delivered(batch)
+                delivered += len(batch)
+            else:
+                logger.warning(f"Webhook delivery to {endpoint.url} failed: {error}")
+                _mark_failed(batch, error)
+                failed += len(batch)
+    return delivered, failed
+
+
+def _mark_delivered(batch):
+    OutboxDelivery.objects.filter(id__in=[d.id for d in batch]).update(
+        status=OutboxDelivery.STATUS_DELIVERED,
+        delivered_at=timezone.now(),
+        last_error="",
+    )
+
+
+def _mark_failed(batch, error):
+    now = timezone.now()
+    for delivery in batch:
+        delivery.attempts += 1
+        delivery.last_error = error
+        if delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            delivery.status = OutboxDelivery.STATUS_FAILED
+        else:
+            delay = settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (delivery.attempts - 1)
+            delivery.next_attempt_at = now + timedelta(seconds=delay)
+    OutboxDelivery.objects.bulk_update(
+        batch, ["attempts", "last_error", "status", "next_attempt_at"]
+    )
@@ -0,0 +1,198 @@
+"""Benchmarking of the main views and API endpoints against the data in the database"""
+import math
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application
+
+from haven.api.caching import invalidate_responses
+from haven.data.models import Dataset
+from haven.identity.models import User
+from haven.identity.roles import UserRole
+from haven.projects.models import (
+    ClassificationOpinion,
+    Participant,
+    Project,
+    WorkPackage,
+    WorkPackageStatus,
+)
+from haven.projects.roles import ProjectRole
+
+
+PROJECT = {"uuid": "project"}
+WORK_PACKAGE = {"project__uuid": "project", "uuid": "work_package"}
+
+# Endpoint name: (route, who requests it, URL keyword arguments taken from the `Targets`)
+ENDPOINTS = {
+    "project_list": ("projects:list", "manager", {}),
+    "programme_list": ("projects:programmes", "manager", {}),
+    "project_detail": ("projects:detail", "manager", PROJECT),
+    "project_history": ("projects:history", "manager", PROJECT),
+    "work_package_detail": ("projects:work_package_detail", "manager", WORK_PACKAGE),
+    "classify_results": ("projects:classify_results", "manager", WORK_PACKAGE),
+    "user_list": ("identity:list", "manager", {}),
+    "api_project_list": ("api:project_list", "api", {}),
+    "api_project_detail": ("api:project_detail", "api", PROJECT),
+    "api_work_package_list": ("api:work_package_list", "api", {}),
+    "api_dataset_list": ("api:dataset_list", "api", {}),
+    "api_work_package_dataset_list": (
+        "api:work_package_dataset_list",
+        "api",
+        {"work_packages__uuid": "work_package"},
+    ),
+}
+
+# Models whose row counts are recorded alongside the results, as results are only comparable
+# between databases of a similar size
+COUNTED_MODELS = [User, Project, WorkPackage, Dataset, ClassificationOpinion]
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Targets:
+    """The objects and clients the benchmarked endpoints are requested with"""
+
+    def __init__(self):
+        project = (
+            Project.objects.filter(archived=False)
+            .annotate(work_package_count=Count("work_packages"))
+            .order_by("-work_package_count", "pk")
+            .first()
+        )
+        if project is None:
+            raise ValueError("There are no projects to benchmark against")
+        work_package = (
+            project.work_packages.filter(status=WorkPackageStatus.CLASSIFIED.value)
+            .order_by("pk")
+            .first()
+        ) or project.work_packages.order_by("pk").first()
+        self.project = project.uuid
+        self.work_package = work_package.uuid if work_package else None
+
+        manager = User.objects.create_user(
+            username="benchmark-manager@example.com", role=UserRole.SYSTEM_MANAGER.value
+        )
+        self.manager = Client()
+        self.manager.force_login(manager)
+
+        investigator = (
+            Participant.objects.filter(project=project, role=ProjectRole.INVESTIGATOR.value)
+            .select_related("user")
+            .first()
+        )
+        application = Application.objects.create(
+            name="Benchmark",
+            user=manager,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+        token = AccessToken.objects.create(
+            token="benchmark-token",
+            user=investigator.user if investigator else manager,
+            application=application,
+            scope="read",
+            expires=timezone.now() + timedelta(days=1),
+        )
+        self.api = Client(HTTP_AUTHORIZATION=f"Bearer {token.token}")
+
+
+def measure(client, url, requests, warmup, cached=False):
+    """
+    Request `url` repeatedly, returning statistics of latency and queries per request
+
+    Unless `cached` is set, cached API responses are invalidated before each request so that
+    every response is built from scratch.
+    """
+    for _ in range(warmup):
+        client.get(url)
+
+    durations = []
+    queries = []
+    statuses = set()
+    cache_hits = 0
+    for _ in range(requests):
+        if not cached:
+            invalidate_responses()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            durations.append((time.perf_counter() - start) * 1000)
+        queries.append(len(context.captured_queries))
+        statuses.add(response.status_code)
+        cache_hits += response.get("X-Cache") == "HIT"
+
+    return {
+        "url": url,
+        "statuses": sorted(statuses),
+        "p50_ms": round(percentile(durations, 50), 2),
+        "p95_ms": round(percentile(durations, 95), 2),
+        "p99_ms": round(percentile(durations, 99), 2),
+        "mean_ms": round(statistics.mean(durations), 2),
+        "queries_mean": round(statistics.mean(queries), 2),
+        "queries_max": max(queries),
+        "cache_hits": cache_hits,
+    }
+
+
+def run_benchmark(requests=20, warmup=2, endpoints=None, cached=False):
+    """
+    Benchmark the named endpoints (by default all of `ENDPOINTS`)
+
+    Returns a JSON serializable dictionary of results.
+    """
+    endpoints = endpoints or list(ENDPOINTS)
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        with transaction.atomic():
+            targets = Targets()
+            for name in endpoints:
+                route, user, kwargs = ENDPOINTS[name]
+                url = reverse(route, kwargs={k: getattr(targets, v) for k, v in kwargs.items()})
+                results[name] = measure(getattr(targets, user), url, requests, warmup, cached)
+            transaction.set_rollback(True)
+
+    return {
+        "created_at": timezone.now().isoformat(),
+        "database": connection.vendor,
+        "rows": {model._meta.label: model.objects.count() for model in COUNTED_MODELS},
+        "requests": requests,
+        "cached": cached,
+        "endpoints": results,
+    }
+
+
+COMPARED_METRICS = ["p50_ms", "p95_ms", "p99_ms", "queries_mean"]
+
+
+def compare(baseline, results):
+    """
+    Compare benchmark results with an earlier run
+
+    Returns a list of (endpoint, metric, baseline value, new value, percentage change) for each
+    endpoint benchmarked in both runs.
+    """
+    rows = []
+    for name, endpoint in results["endpoints"].items():
+        previous = baseline["endpoints"].get(name)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous[metric], endpoint[metric]
+            change = (after - before) / before * 100 if before else 0
+            rows.append((name, metric, before, after, round(change, 1)))
+    return rows
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from haven.core.benchmark import ENDPOINTS, compare, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark the latency and queries of the main views and API endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=20, help="Number of requests to each endpoint"
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=2,
+            help="Number of requests to each endpoint before measuring",
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            choices=list(ENDPOINTS),
+            help="Endpoint to benchmark (may be repeated, default all)",
+        )
+        parser.add_argument(
+            "--cached",
+            action="store_true",
+            help="Let API requests be served from the response cache",
+        )
+        parser.add_argument(
+            "--output", default="benchmark.json", help="File to write the results to as JSON"
+        )
+        parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        try:
+            results = run_benchmark(
+                requests=options["requests"],
+                warmup=options["warmup"],
+                endpoints=options["endpoint"],
+                cached=options["cached"],
+            )
+        except ValueError as e:
+            raise CommandError(e) from e
+
+        with open(options["output"], "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+        for name, result in results["endpoints"].items():
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                f"p99 {result['p99_ms']}ms, {result['queries_mean']} queries"
+            )
+        if baseline:
+            self.stdout.write(f"Compared with {options['baseline']}:")
+            for name, metric, before, after, change in compare(baseline, results):
+                self.stdout.write(f"{name} {metric}: {before} -> {after} ({change:+}%)")
+        self.stdout.write(f"Results written to {options['output']}")
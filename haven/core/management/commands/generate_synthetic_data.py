@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from haven.core.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = "Generate production-scale volumes of synthetic users, projects and work packages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000, help="Number of users")
+        parser.add_argument("--projects", type=int, default=2000, help="Number of projects")
+        parser.add_argument(
+            "--work-packages", type=int, default=20000, help="Number of work packages"
+        )
+        parser.add_argument("--datasets", type=int, default=4000, help="Number of datasets")
+        parser.add_argument(
+            "--seed", type=int, help="Random seed, to generate the same shape of data again"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Number of rows to insert at a time"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            generator = SyntheticData(
+                users=options["users"],
+                projects=options["projects"],
+                work_packages=options["work_packages"],
+                datasets=options["datasets"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                log=self.stdout.write,
+            )
+            counts = generator.generate()
+        except ValueError as e:
+            raise CommandError(e) from e
+
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f"{label}: {count}")
@@ -0,0 +1,26 @@
+"""Cached sanitized HTML of often rendered text, such as classification questions and guidance"""
+from functools import lru_cache
+
+import bleach
+from django_bleach.utils import get_bleach_default_options
+
+
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def clean_html(value):
+    """Return `value` sanitized as the `bleach` template filter would"""
+    return bleach.clean(value, **get_bleach_default_options())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def clean_html_no_links(value):
+    """Return `value` sanitized, with the text of any links kept but the links themselves removed"""
+    kwargs = dict(get_bleach_default_options())
+    value = bleach.clean(value, **kwargs)
+
+    kwargs["tags"] = [t for t in kwargs["tags"] if t != "a"]
+    kwargs["strip"] = True
+    value = bleach.clean(value, **kwargs)
+    return value
@@ -0,0 +1,431 @@
+"""Generation of large volumes of realistic looking data, for reproducing production-scale load"""
+import random
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Max
+from django.utils.text import slugify
+from model_bakery.recipe import seq
+from taggit.models import Tag, TaggedItem
+
+from haven.api.caching import invalidate_responses
+from haven.core import recipes
+from haven.data import question_history
+from haven.data.classification import insert_initial_questions
+from haven.data.models import (
+    ClassificationGuidance,
+    ClassificationQuestion,
+    ClassificationQuestionSet,
+    Dataset,
+)
+from haven.data.question_graph import get_default_question_graph
+from haven.data.tiers import Tier
+from haven.identity.models import User
+from haven.identity.roles import UserRole
+from haven.projects.models import (
+    ClassificationOpinion,
+    ClassificationOpinionQuestion,
+    Participant,
+    Project,
+    ProjectDataset,
+    WorkPackage,
+    WorkPackageDataset,
+    WorkPackageParticipant,
+    WorkPackageParticipantApproval,
+    WorkPackageStatus,
+)
+from haven.projects.programmes import refresh_all_programme_summaries
+from haven.projects.roles import ProjectRole
+
+
+# Roles every project has one participant in, all of whom take part in every work package
+PROJECT_ROLES = [
+    ProjectRole.INVESTIGATOR,
+    ProjectRole.DATA_PROVIDER_REPRESENTATIVE,
+    ProjectRole.REFEREE,
+    ProjectRole.PROJECT_MANAGER,
+]
+CLASSIFYING_ROLES = [
+    ProjectRole.INVESTIGATOR,
+    ProjectRole.DATA_PROVIDER_REPRESENTATIVE,
+    ProjectRole.REFEREE,
+]
+
+# Proportion of work packages in each status
+STATUS_WEIGHTS = {
+    WorkPackageStatus.NEW: 0.2,
+    WorkPackageStatus.UNDERWAY: 0.2,
+    WorkPackageStatus.CLASSIFIED: 0.6,
+}
+
+# Projects are generated this many at a time, each batch in its own transaction
+PROJECT_BATCH_SIZE = 100
+
+
+def spread(total, parts):
+    """Split `total` into `parts` counts which differ by at most one"""
+    base, remainder = divmod(total, parts)
+    return [base + 1 if i < remainder else base for i in range(parts)]
+
+
+def bulk_create(model, objects, key, batch_size):
+    """
+    Insert `objects`, making sure each has its primary key set afterwards
+
+    Not every database returns the keys of rows inserted in bulk, so where they're missing the
+    new rows are looked up by `key`, a tuple of field attribute names which identify each object.
+    """
+    previous = model.objects.aggregate(last=Max("pk"))["last"] or 0
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    if objects and objects[0].pk is None:
+        pks = {
+            tuple(row[1:]): row[0]
+            for row in model.objects.filter(pk__gt=previous).values_list("pk", *key)
+        }
+        for obj in objects:
+            obj.pk = pks[tuple(getattr(obj, field) for field in key)]
+    return objects
+
+
+def answer_at_random(graph, rng):
+    """
+    Answer the questions of a compiled question graph at random until reaching a tier
+
+    Returns the tier and a list of (QuestionNode, answer) pairs.
+    """
+    question = graph.start
+    answers = []
+    while not isinstance(question, int):
+        answer = rng.random() < 0.5
+        answers.append((question, answer))
+        question = graph.next(question, answer)
+    return question, answers
+
+
+class SyntheticData:
+    """
+    Generator of users, projects and everything in them
+
+    Datasets and work packages are spread evenly over the projects, and each project has a
+    programme, an investigator, a data provider representative, a referee, a project manager and a
+    few researchers. Work packages are new, underway or classified, with answered classification
+    opinions and, for higher tiers, approvals for their referees and researchers.
+    """
+
+    def __init__(
+        self,
+        users,
+        projects,
+        work_packages,
+        datasets,
+        seed=None,
+        batch_size=1000,
+        log=lambda message: None,
+    ):
+        if users < len(PROJECT_ROLES) + 1:
+            raise ValueError(f"At least {len(PROJECT_ROLES) + 1} users are needed")
+        self.user_count = users
+        self.project_count = projects
+        self.work_package_count = work_packages
+        self.dataset_count = datasets
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log
+        # Names must be unique, and may already have been used by an earlier run
+        self.run = uuid4().hex[:8]
+        self.counts = {}
+
+    def count(self, model, objects):
+        label = model._meta.label
+        self.counts[label] = self.counts.get(label, 0) + len(objects)
+        return objects
+
+    def generate(self):
+        """Generate everything, returning the number of rows created for each model"""
+        if not ClassificationQuestion.objects.exists():
+            insert_initial_questions(
+                ClassificationQuestion,
+                ClassificationGuidance,
+                ClassificationQuestionSet,
+                question_set_exists=ClassificationQuestionSet.objects.filter(
+                    name="turing"
+                ).exists(),
+            )
+        self.questions = get_default_question_graph()
+        if self.questions.start is None:
+            raise ValueError(f"Question set {self.questions.name} has no classification questions")
+        self.versions = question_history.get_latest_versions(self.questions.questions)
+
+        with transaction.atomic():
+            self.create_users()
+            self.create_programmes()
+        self.log(f"Created {self.user_count} users")
+
+        datasets = spread(self.dataset_count, self.project_count)
+        work_packages = spread(self.work_package_count, self.project_count)
+        for start in range(0, self.project_count, PROJECT_BATCH_SIZE):
+            end = min(start + PROJECT_BATCH_SIZE, self.project_count)
+            with transaction.atomic():
+                self.create_projects(datasets[start:end], work_packages[start:end])
+            self.log(f"Created {end} of {self.project_count} projects")
+
+        refresh_all_programme_summaries()
+        invalidate_responses()
+        return self.counts
+
+    def create_users(self):
+        self.users = recipes.user.prepare(
+            _quantity=self.user_count,
+            username=seq(f"synthetic-{self.run}-"),
+            email=seq(f"synthetic-{self.run}-", suffix="@example.com"),
+            # Synthetic users can't log in
+            password=make_password(None),
+            role=UserRole.NONE.value,
+        )
+        # A few users manage programmes, and create the projects
+        for user in self.users[:: max(self.user_count // 50, 1)]:
+            user.role = UserRole.PROGRAMME_MANAGER.value
+        self.managers = [u for u in self.users if u.role == UserRole.PROGRAMME_MANAGER.value]
+        self.count(
+            User,
+            bulk_create(User, self.users, ("uuid",), self.batch_size),
+        )
+
+    def create_programmes(self):
+        self.programmes = [
+            Tag(name=f"Programme {self.run} {i}", slug=slugify(f"programme {self.run} {i}"))
+            for i in range(max(self.project_count // 50, 1))
+        ]
+        self.count(Tag, bulk_create(Tag, self.programmes, ("slug",), self.batch_size))
+
+    def create_projects(self, dataset_counts, work_package_counts):
+        rng = self.rng
+        offset = self.counts.get(Project._meta.label, 0)
+        projects = recipes.project.prepare(_quantity=len(dataset_counts))
+        for i, project in enumerate(projects, start=offset + 1):
+            project.name = f"Synthetic project {self.run} {i}"
+            project.created_by = rng.choice(self.managers)
+            project.archived = rng.random() < 0.1
+        self.count(Project, bulk_create(Project, projects, ("uuid",), self.batch_size))
+
+        project_type = ContentType.objects.get_for_model(Project)
+        self.count(
+            TaggedItem,
+            TaggedItem.objects.bulk_create(
+                [
+                    TaggedItem(
+                        content_type=project_type,
+                        object_id=project.pk,
+                        tag=rng.choice(self.programmes),
+                    )
+                    for project in projects
+                ],
+                batch_size=self.batch_size,
+            ),
+        )
+
+        participants = {}
+        for project in projects:
+            users = rng.sample(self.users, len(PROJECT_ROLES) + rng.randint(1, 6))
+            roles = PROJECT_ROLES + [ProjectRole.RESEARCHER] * (len(users) - len(PROJECT_ROLES))
+            participants[project] = [
+                Participant(
+                    project=project, user=user, role=role.value, created_by=project.created_by
+                )
+                for user, role in zip(users, roles)
+            ]
+        self.count(
+            Participant,
+            bulk_create(
+                Participant,
+                [p for ps in participants.values() for p in ps],
+                ("user_id", "project_id"),
+                self.batch_size,
+            ),
+        )
+
+        datasets = {}
+        for project, count in zip(projects, dataset_counts):
+            representative = participants[project][1].user
+            datasets[project] = recipes.dataset.prepare(
+                _quantity=max(count, 1),
+                default_representative=representative,
+                created_by=project.created_by,
+            )
+        self.count(
+            Dataset,
+            bulk_create(
+                Dataset,
+                [d for ds in datasets.values() for d in ds],
+                ("uuid",),
+                self.batch_size,
+            ),
+        )
+        self.count(
+            ProjectDataset,
+            ProjectDataset.objects.bulk_create(
+                [
+                    ProjectDataset(
+                        project=project,
+                        dataset=dataset,
+                        representative=dataset.default_representative,
+                        created_by=project.created_by,
+                    )
+                    for project, project_datasets in datasets.items()
+                    for dataset in project_datasets
+                ],
+                batch_size=self.batch_size,
+            ),
+        )
+
+        self.create_work_packages(projects, work_package_counts, participants, datasets)
+
+    def create_work_packages(self, projects, counts, participants, datasets):
+        rng = self.rng
+        work_packages = []
+        for project, count in zip(projects, counts):
+            for work_package in recipes.work_package.prepare(
+                _quantity=count, project=project, created_by=project.created_by
+            ):
+                work_package.status = rng.choices(
+                    list(STATUS_WEIGHTS), weights=STATUS_WEIGHTS.values()
+                )[0].value
+                work_packages.append(work_package)
+        self.count(WorkPackage, bulk_create(WorkPackage, work_packages, ("uuid",), self.batch_size))
+
+        work_package_participants = []
+        work_package_datasets = []
+        opinions = []
+        answers = []
+        for work_package in work_packages:
+            project_participants = participants[work_package.project]
+            first_researcher = len(PROJECT_ROLES)
+            researchers = project_participants[first_researcher:]
+            members = project_participants[: len(CLASSIFYING_ROLES)] + rng.sample(
+                researchers, rng.randint(0, len(researchers))
+            )
+            for participant in members:
+                work_package_participants.append(
+                    WorkPackageParticipant(
+                        work_package=work_package,
+                        participant=participant,
+                        created_by=work_package.created_by,
+                    )
+                )
+            project_datasets = datasets[work_package.project]
+            for dataset in rng.sample(project_datasets, rng.randint(1, len(project_datasets))):
+                work_package_datasets.append(
+                    WorkPackageDataset(
+                        work_package=work_package,
+                        dataset=dataset,
+                        created_by=work_package.created_by,
+                    )
+                )
+
+            if work_package.status == WorkPackageStatus.CLASSIFIED.value:
+                # Everyone agreed, so the work package has their tier
+                tier, path = answer_at_random(self.questions, rng)
+                work_package.tier = tier
+                classifiers = [(participant, tier, path) for participant in members[:3]]
+            elif work_package.status == WorkPackageStatus.UNDERWAY.value:
+                classifiers = [
+                    (participant, *answer_at_random(self.questions, rng))
+                    for participant in rng.sample(members[:3], rng.randint(0, 3))
+                ]
+            else:
+                classifiers = []
+            for participant, tier, path in classifiers:
+                opinion = ClassificationOpinion(
+                    work_package=work_package,
+                    created_by=participant.user,
+                    role=participant.role,
+                    tier=tier,
+                )
+                opinions.append(opinion)
+                answers.append((opinion, path))
+
+        WorkPackage.objects.bulk_update(
+            [wp for wp in work_packages if wp.tier is not None],
+            ["tier"],
+            batch_size=self.batch_size,
+        )
+        self.count(
+            WorkPackageParticipant,
+            bulk_create(
+                WorkPackageParticipant,
+                work_package_participants,
+                ("participant_id", "work_package_id"),
+                self.batch_size,
+            ),
+        )
+        self.count(
+            ClassificationOpinion,
+            bulk_create(
+                ClassificationOpinion,
+                opinions,
+                ("created_by_id", "work_package_id"),
+                self.batch_size,
+            ),
+        )
+
+        # The data provider representative's opinion covers the datasets they represent
+        representative_opinions = {
+            opinion.work_package: opinion
+            for opinion in opinions
+            if opinion.role == ProjectRole.DATA_PROVIDER_REPRESENTATIVE.value
+        }
+        for work_package_dataset in work_package_datasets:
+            work_package_dataset.opinion = representative_opinions.get(
+                work_package_dataset.work_package
+            )
+        self.count(
+            WorkPackageDataset,
+            WorkPackageDataset.objects.bulk_create(
+                work_package_datasets, batch_size=self.batch_size
+            ),
+        )
+        self.count(
+            ClassificationOpinionQuestion,
+            ClassificationOpinionQuestion.objects.bulk_create(
+                [
+                    ClassificationOpinionQuestion(
+                        opinion=opinion,
+                        order=order,
+                        question_id=question.id,
+                        question_version=self.versions[question.id],
+                        answer=answer,
+                    )
+                    for opinion, path in answers
+                    for order, (question, answer) in enumerate(path)
+                ],
+                batch_size=self.batch_size,
+            ),
+        )
+
+        # Referees and researchers need approving for every dataset in higher tier work packages
+        needs_approval = ProjectRole.non_approved_roles()
+        datasets_by_work_package = {}
+        for work_package_dataset in work_package_datasets:
+            datasets_by_work_package.setdefault(work_package_dataset.work_package, []).append(
+                work_package_dataset.dataset
+            )
+        self.count(
+            WorkPackageParticipantApproval,
+            WorkPackageParticipantApproval.objects.bulk_create(
+                [
+                    WorkPackageParticipantApproval(
+                        work_package_participant=work_package_participant,
+                        dataset=dataset,
+                        created_by=dataset.default_representative,
+                    )
+                    for work_package_participant in work_package_participants
+                    if work_package_participant.work_package.tier is not None
+                    and work_package_participant.work_package.tier >= Tier.THREE
+                    and work_package_participant.participant.role in needs_approval
+                    for dataset in datasets_by_work_package[work_package_participant.work_package]
+                ],
+                batch_size=self.batch_size,
+            ),
+        )
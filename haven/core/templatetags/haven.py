@@ -7,8 +7,11 @@ from django.contrib.auth.mixins import (
 )
 from django.template import defaulttags
 from django.urls import resolve
+from django.utils.safestring import mark_safe
 from sourcerevision.loader import get_revision
 
+from haven.core.sanitize import clean_html
+
 
 register = template.Library()
 
@@ -106,3 +109,14 @@ def webapp_title():
     """
 
     return settings.WEBAPP_TITLE
+
+
+@register.filter
+def sanitize(value):
+    """
+    Template filter that sanitizes HTML like django_bleach's `bleach` filter, but caches the
+    result for each value. Use for text that is rendered often and rarely changes.
+    """
+    if value is None:
+        return None
+    return mark_safe(clean_html(value))
@@ -1,4 +1,8 @@
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.db import connections
 
 
 class TextTable:
@@ -158,3 +162,24 @@ class BooleanTextTable(TextTable):
 
     def coerce(self, value):
         return value in self.truthy
+
+
+def map_chunks(function, items, chunk_size, workers=1):
+    """
+    Call `function` with each chunk of up to `chunk_size` of `items`, yielding the results in order
+
+    With more than one worker (and chunk) the chunks are shared between a pool of forked
+    processes, so `function` must be picklable, e.g. a module-level function or a `partial` of one.
+    """
+    chunks = []
+    for start in range(0, len(items), chunk_size):
+        end = start + chunk_size
+        chunks.append(items[start:end])
+    if workers <= 1 or len(chunks) <= 1:
+        yield from map(function, chunks)
+        return
+
+    # Forked workers must open their own database connections rather than share ours
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("fork")) as pool:
+        yield from pool.map(function, chunks)
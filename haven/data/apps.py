@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DataConfig(AppConfig):
-    name = "data"
+    name = "haven.data"
+
+    def ready(self):
+        from haven.data import caching
+        from haven.data.models import (
+            ClassificationGuidance,
+            ClassificationQuestion,
+            ClassificationQuestionSet,
+        )
+
+        # Empty the process caches of anything derived from the questions and guidance
+        for sender in [ClassificationQuestion, ClassificationQuestionSet, ClassificationGuidance]:
+            for signal in [post_save, post_delete]:
+                signal.connect(
+                    caching.classification_changed,
+                    sender=sender,
+                    dispatch_uid="classification_caches",
+                )
@@ -0,0 +1,68 @@
+"""Process-level caches of rarely changing data, emptied when their generation moves on"""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+GENERATION_KEY = "classification:generation"
+
+_process_caches = []
+
+
+def get_generation(key=GENERATION_KEY):
+    """Return the current generation of the classification questions and guidance (by default)"""
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_generation(key=GENERATION_KEY):
+    """Empty every process cache of the generation, in this and any other process"""
+    cache.set(key, uuid4().hex, None)
+    # Another request may fill a cache from the data before the change until it has been
+    # committed, so invalidate again once it has been
+    transaction.on_commit(lambda: cache.set(key, uuid4().hex, None))
+
+
+def classification_changed(sender, **kwargs):
+    invalidate_generation()
+
+
+class ProcessCache:
+    """
+    A dictionary kept for the life of the process
+
+    Unless `generational` is False, the dictionary is emptied whenever the generation changes.
+    Use that only for values which can never change once they are in the database.
+    `generation_key` is the cache key of the generation, which by default is that of the
+    classification questions and guidance.
+    """
+
+    def __init__(self, generational=True, generation_key=GENERATION_KEY):
+        self.generational = generational
+        self.generation_key = generation_key
+        self._values = {}
+        self._generation = None
+        _process_caches.append(self)
+
+    @property
+    def values(self):
+        if self.generational:
+            generation = get_generation(self.generation_key)
+            if generation != self._generation:
+                self._values = {}
+                self._generation = generation
+        return self._values
+
+    def clear(self):
+        self._values = {}
+        self._generation = None
+
+
+def clear_process_caches():
+    """Empty every process cache in this process"""
+    for process_cache in _process_caches:
+        process_cache.clear()
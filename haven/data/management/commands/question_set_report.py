@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from haven.data.models import ClassificationQuestionSet
+from haven.data.question_graph import get_question_graph
+
+
+class Command(BaseCommand):
+    help = "Report the tiers each classification question set can reach, and by how many paths"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names", nargs="*", help="Names of the question sets to report on (default all)"
+        )
+
+    def handle(self, *args, **options):
+        question_sets = ClassificationQuestionSet.objects.order_by("name")
+        if options["names"]:
+            question_sets = question_sets.filter(name__in=options["names"])
+
+        for question_set_id, name in question_sets.values_list("id", "name"):
+            graph = get_question_graph(question_set_id)
+            self.stdout.write(f"{name}")
+            self.stdout.write(f"  Questions: {len(graph.ordered)}")
+            self.stdout.write(f"  Longest path: {graph.depth} questions")
+            self.stdout.write(f"  Paths: {len(graph.paths)}")
+            for tier, count in graph.tier_path_counts.items():
+                self.stdout.write(f"    Tier {tier}: {count}")
+            unreachable = graph.unreachable_questions
+            if unreachable:
+                names = ", ".join(q.name for q in unreachable)
+                self.stdout.write(f"  Unreachable questions: {names}")
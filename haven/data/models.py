@@ -6,10 +6,15 @@ from django.db import models
 from simple_history.models import HistoricalRecords
 
 from haven.data import tiers
+from haven.data.caching import ProcessCache
 from haven.data.managers import ClassificationQuestionQuerySet
 from haven.identity.models import User
 
 
+# Name of the default question set -> its id
+_default_question_set_ids = ProcessCache()
+
+
 class Dataset(models.Model):
     name = models.CharField(max_length=256)
     description = models.TextField()
@@ -33,8 +38,13 @@ class ClassificationQuestionSet(models.Model):
 
     @classmethod
     def get_default_id(cls):
-        q_set, created = cls.objects.get_or_create(name=settings.DEFAULT_QUESTION_SET_NAME)
-        return q_set.id
+        # Called for every Project instantiated, so the id is kept until the question sets change
+        default_ids = _default_question_set_ids.values
+        name = settings.DEFAULT_QUESTION_SET_NAME
+        if name not in default_ids:
+            q_set, created = cls.objects.get_or_create(name=name)
+            default_ids[name] = q_set.id
+        return default_ids[name]
 
 
 class ClassificationQuestion(models.Model):
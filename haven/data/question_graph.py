@@ -0,0 +1,237 @@
+"""Compiled, immutable graphs of the classification questions in each question set"""
+from collections import Counter, defaultdict, namedtuple
+from functools import cached_property
+
+from django.core.exceptions import ValidationError
+
+from haven.data.caching import ProcessCache
+from haven.data.models import ClassificationQuestion, ClassificationQuestionSet
+
+
+class QuestionNode(
+    namedtuple(
+        "QuestionNode",
+        [
+            "id",
+            "name",
+            "question",
+            "question_set_id",
+            "yes_question_id",
+            "no_question_id",
+            "yes_tier",
+            "no_tier",
+            "hidden",
+        ],
+    )
+):
+    """An immutable snapshot of a ClassificationQuestion"""
+
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+
+# The tier a path of answers leads to, and the ids of the questions it answers
+QuestionPath = namedtuple("QuestionPath", ["tier", "question_ids"])
+
+# question set id -> QuestionGraph
+_graphs = ProcessCache()
+
+
+def answer_bits(answers):
+    """
+    Encode a sequence of answers as a string of "1" for yes and "0" for no
+
+    Returns None if any answer isn't a bool.
+    """
+    bits = []
+    for answer in answers:
+        if answer is True:
+            bits.append("1")
+        elif answer is False:
+            bits.append("0")
+        else:
+            return None
+    return "".join(bits)
+
+
+class QuestionGraph:
+    """
+    The questions of a question set, and how answering each of them leads to the next
+
+    Questions are ordered as `ClassificationQuestionQuerySet.get_ordered_questions` orders them,
+    so the starting question is the same. `depth` is the largest number of questions that can be
+    asked before reaching a tier.
+    """
+
+    def __init__(self, question_set_id, name, questions):
+        self.question_set_id = question_set_id
+        self.name = name
+        self.questions = {q.id: q for q in questions}
+        self.questions_by_name = {q.name: q for q in questions}
+        self.ordered = self._order(questions)
+        self.start = self.ordered[0] if self.ordered else None
+
+        # The most questions asked from each question on, working back from the last questions
+        self.depths = {}
+        for q in reversed(self.ordered):
+            self.depths[q.id] = 1 + max(
+                self.depths.get(q.yes_question_id, 0), self.depths.get(q.no_question_id, 0)
+            )
+        self.depth = self.depths[self.start.id] if self.start else 0
+
+    @classmethod
+    def load(cls, question_set_id):
+        name = ClassificationQuestionSet.objects.values_list("name", flat=True).get(
+            pk=question_set_id
+        )
+        questions = ClassificationQuestion.objects.filter(question_set_id=question_set_id)
+        return cls(
+            question_set_id,
+            name,
+            [QuestionNode(*values) for values in questions.values_list(*QuestionNode._fields)],
+        )
+
+    def _order(self, questions):
+        """
+        Order the questions so that no question depends on a question after it
+
+        Fails if there are any cycles in the questions.
+        """
+        incoming = defaultdict(list)
+        ordered = []
+        for q in questions:
+            if q.hidden:
+                continue
+            incoming.setdefault(q, [])
+            for next_id in [q.yes_question_id, q.no_question_id]:
+                if next_id:
+                    incoming[self.questions[next_id]].append(q)
+        for q, incoming_questions in incoming.items():
+            if not incoming_questions:
+                ordered.append(q)
+        i = 0
+        while i < len(ordered):
+            q = ordered[i]
+            incoming.pop(q)
+            for next_id in [q.yes_question_id, q.no_question_id]:
+                if next_id:
+                    other_q = self.questions[next_id]
+                    incoming[other_q].remove(q)
+                    if not incoming[other_q]:
+                        ordered.append(other_q)
+            i += 1
+
+        assert not incoming
+        return ordered
+
+    def get(self, question_id):
+        """Return the question with the given id, raising KeyError if it isn't in the set"""
+        return self.questions[question_id]
+
+    def get_by_name(self, name):
+        """Return the question with the given name, raising KeyError if it isn't in the set"""
+        return self.questions_by_name[name]
+
+    def next(self, question, answer):
+        """Return the question that follows answering `question`, or the tier it leads to"""
+        if answer:
+            next_id, tier = question.yes_question_id, question.yes_tier
+        else:
+            next_id, tier = question.no_question_id, question.no_tier
+        if next_id:
+            return self.questions[next_id]
+        return tier
+
+    def validate_path(self, answers):
+        """
+        Check that a list of (question id, answer) pairs follows the graph to a tier
+
+        The path must start at the starting question, answer each question that the previous
+        answer leads to, and stop at a tier.
+
+        Returns the tier and a list of (QuestionNode, answer) pairs, or raises ValidationError.
+        """
+        # A valid path is found in the lookup table, otherwise walk the answers to find the fault
+        answers = list(answers)
+        path = self.paths.get(answer_bits(answer for _, answer in answers))
+        if path and path.question_ids == tuple(question_id for question_id, _ in answers):
+            return path.tier, [
+                (self.questions[question_id], answer) for question_id, answer in answers
+            ]
+
+        if len(answers) > self.depth:
+            raise ValidationError(
+                f"Too many answers: no path through the questions is longer than {self.depth}"
+            )
+        path = []
+        question = self.start
+        for question_id, answer in answers:
+            if isinstance(question, int) or question is None:
+                raise ValidationError("Answers continue after the classification is complete")
+            if question_id != question.id:
+                raise ValidationError(f"Expected an answer to question {question.id}")
+            if not isinstance(answer, bool):
+                raise ValidationError(f"Answer to question {question.id} must be true or false")
+            path.append((question, answer))
+            question = self.next(question, answer)
+
+        if not isinstance(question, int):
+            raise ValidationError("Answers stop before the classification is complete")
+        return question, path
+
+    @cached_property
+    def paths(self):
+        """
+        Every path of answers from the starting question to a tier
+
+        A dictionary of QuestionPath keyed by the answers along the path, as a string of "1" for
+        yes and "0" for no (see `answer_bits`). As each answer decides the next question, the
+        answers alone identify the path. Compiled the first time it is needed.
+        """
+        paths = {}
+        if not self.start:
+            return paths
+        stack = [(self.start, "", ())]
+        while stack:
+            question, bits, question_ids = stack.pop()
+            question_ids += (question.id,)
+            for answer, bit in [(True, "1"), (False, "0")]:
+                following = self.next(question, answer)
+                if isinstance(following, int):
+                    paths[bits + bit] = QuestionPath(following, question_ids)
+                elif following is not None:
+                    stack.append((following, bits + bit, question_ids))
+        return paths
+
+    def get_tier(self, answers):
+        """Return the tier a sequence of answers leads to, or None if it doesn't lead to one"""
+        path = self.paths.get(answer_bits(answers))
+        return path.tier if path else None
+
+    @property
+    def tier_path_counts(self):
+        """The number of paths leading to each reachable tier, in tier order"""
+        counts = Counter(path.tier for path in self.paths.values())
+        return dict(sorted(counts.items()))
+
+    @property
+    def unreachable_questions(self):
+        """Visible questions which no path from the starting question asks"""
+        asked = {question_id for path in self.paths.values() for question_id in path.question_ids}
+        return [q for q in self.ordered if q.id not in asked]
+
+
+def get_question_graph(question_set_id):
+    """Return the compiled graph of the given question set"""
+    graphs = _graphs.values
+    if question_set_id not in graphs:
+        graphs[question_set_id] = QuestionGraph.load(question_set_id)
+    return graphs[question_set_id]
+
+
+def get_default_question_graph():
+    """Return the compiled graph of the default question set"""
+    return get_question_graph(ClassificationQuestionSet.get_default_id())
@@ -0,0 +1,91 @@
+"""Process-level caches of classification question history"""
+from collections import namedtuple
+
+from haven.data.caching import ProcessCache
+from haven.data.models import ClassificationQuestion
+
+
+QuestionVersion = namedtuple(
+    "QuestionVersion",
+    [
+        "history_id",
+        "id",
+        "name",
+        "question_set_id",
+        "question",
+        "yes_question_id",
+        "no_question_id",
+        "yes_tier",
+        "no_tier",
+        "hidden",
+    ],
+)
+
+# history_id -> QuestionVersion
+_versions = ProcessCache(generational=False)
+# question id -> history_id of its latest version
+_latest = ProcessCache()
+
+
+def get_question_versions(history_ids):
+    """
+    Return the historical questions with the given history ids
+
+    Returns a dictionary of QuestionVersion keyed by history id. Ids that don't match a
+    historical question are left out.
+    """
+    versions = _versions.values
+    missing = set(history_ids) - versions.keys()
+    if missing:
+        fields = QuestionVersion._fields
+        for values in ClassificationQuestion.history.filter(history_id__in=missing).values_list(
+            *fields
+        ):
+            version = QuestionVersion(*values)
+            versions[version.history_id] = version
+    return {
+        history_id: versions[history_id] for history_id in history_ids if history_id in versions
+    }
+
+
+def get_question_version(history_id):
+    """Return the historical question with the given history id"""
+    try:
+        return get_question_versions([history_id])[history_id]
+    except KeyError:
+        raise ClassificationQuestion.history.model.DoesNotExist(
+            f"No historical question with history_id {history_id}"
+        ) from None
+
+
+def get_latest_versions(question_ids):
+    """
+    Return the history id of the latest version of each of the given questions
+
+    Returns a dictionary of history ids keyed by question id. Questions without any history are
+    left out.
+    """
+    latest = _latest.values
+    missing = set(question_ids) - latest.keys()
+    if missing:
+        # Ordered as `history.latest()` picks the latest version, so the last one for each
+        # question wins
+        history = (
+            ClassificationQuestion.history.filter(id__in=missing)
+            .order_by("history_date", "history_id")
+            .values_list("id", "history_id")
+        )
+        latest.update(history)
+    return {
+        question_id: latest[question_id] for question_id in question_ids if question_id in latest
+    }
+
+
+def get_latest_version(question_id):
+    """Return the history id of the latest version of the given question"""
+    try:
+        return get_latest_versions([question_id])[question_id]
+    except KeyError:
+        raise ClassificationQuestion.history.model.DoesNotExist(
+            f"Question {question_id} has no history"
+        ) from None
@@ -0,0 +1 @@
+default_app_config = "haven.identity.apps.IdentityConfig"
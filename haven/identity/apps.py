@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class IdentityConfig(AppConfig):
-    name = "identity"
+    name = "haven.identity"
+
+    def ready(self):
+        from haven.identity import search
+
+        # Index users for searching, in whichever way suits the database
+        post_migrate.connect(
+            search.create_search_index, sender=self, dispatch_uid="user_search_index"
+        )
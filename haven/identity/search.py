@@ -0,0 +1,140 @@
+"""Searching for users by name, username or email, using trigram indexes where possible"""
+import logging
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ["first_name", "last_name", "username", "email"]
+
+# Shortest term the trigram indexes can find
+MIN_INDEXED_LENGTH = 3
+
+USER_TABLE = "identity_user"
+SQLITE_SEARCH_TABLE = "identity_user_search"
+
+POSTGRESQL_INDEX_SQL = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS {USER_TABLE}_{field}_trgm "
+    f'ON {USER_TABLE} USING gin (UPPER("{field}"::text) gin_trgm_ops)'
+    for field in SEARCH_FIELDS
+]
+
+_columns = ", ".join(SEARCH_FIELDS)
+_new_values = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+_old_values = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+_insert_new = (
+    f"INSERT INTO {SQLITE_SEARCH_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});"
+)
+_delete_old = (
+    f"INSERT INTO {SQLITE_SEARCH_TABLE}({SQLITE_SEARCH_TABLE}, rowid, {_columns}) "
+    f"VALUES ('delete', old.id, {_old_values});"
+)
+SQLITE_INDEX_SQL = [
+    f"CREATE VIRTUAL TABLE {SQLITE_SEARCH_TABLE} USING fts5({_columns}, "
+    f"content='{USER_TABLE}', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER {SQLITE_SEARCH_TABLE}_insert AFTER INSERT ON {USER_TABLE} "
+    f"BEGIN {_insert_new} END",
+    f"CREATE TRIGGER {SQLITE_SEARCH_TABLE}_delete AFTER DELETE ON {USER_TABLE} "
+    f"BEGIN {_delete_old} END",
+    f"CREATE TRIGGER {SQLITE_SEARCH_TABLE}_update AFTER UPDATE OF {_columns} ON {USER_TABLE} "
+    f"BEGIN {_delete_old} {_insert_new} END",
+    f"INSERT INTO {SQLITE_SEARCH_TABLE}({SQLITE_SEARCH_TABLE}) VALUES ('rebuild')",
+]
+
+# database alias -> whether it has the SQLite search table
+_sqlite_search_tables = {}
+
+
+def has_sqlite_search_table(connection):
+    if connection.alias not in _sqlite_search_tables:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        _sqlite_search_tables[connection.alias] = SQLITE_SEARCH_TABLE in tables
+    return _sqlite_search_tables[connection.alias]
+
+
+def create_search_index(using="default", **kwargs):
+    """
+    Create the indexes used to search for users, if they don't already exist
+
+    Connected to `post_migrate`. If the indexes can't be created, such as on SQLite versions
+    without the FTS5 trigram tokenizer (before 3.34), or on PostgreSQL without permission to
+    create the trigram extension, a warning is logged and users are searched without them.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        statements = POSTGRESQL_INDEX_SQL
+    elif connection.vendor == "sqlite":
+        _sqlite_search_tables.pop(using, None)
+        if has_sqlite_search_table(connection):
+            return
+        statements = SQLITE_INDEX_SQL
+    else:
+        return
+
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    except DatabaseError as e:
+        logger.warning(f"Users will be searched without an index, which couldn't be created: {e}")
+        return
+    if connection.vendor == "sqlite":
+        _sqlite_search_tables[using] = True
+
+
+def _any_field(lookup, term):
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f"{field}__{lookup}": term})
+    return condition
+
+
+def term_filter(term, connection):
+    """Condition for a search term appearing in any of a user's searched fields"""
+    if (
+        connection.vendor == "sqlite"
+        and len(term) >= MIN_INDEXED_LENGTH
+        and has_sqlite_search_table(connection)
+    ):
+        # A quoted string matches wherever its trigrams appear consecutively, in any case
+        phrase = '"' + term.replace('"', '""') + '"'
+        return Q(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s",
+                [phrase],
+            )
+        )
+    return _any_field("icontains", term)
+
+
+def search_rank(terms):
+    """Rank of a user, scoring 2 for each term equal to a field and 1 for each starting one"""
+    rank = Value(0, output_field=IntegerField())
+    for term in terms:
+        rank += Case(
+            When(_any_field("iexact", term), then=Value(2)),
+            When(_any_field("istartswith", term), then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    return rank
+
+
+def search_users(queryset, query):
+    """
+    Filter a queryset of users to those matching every whitespace-separated term of `query`,
+    most relevant first
+    """
+    terms = query.split()
+    if not terms:
+        return queryset
+    connection = connections[queryset.db]
+    for term in terms:
+        queryset = queryset.filter(term_filter(term, connection))
+    return queryset.annotate(search_rank=search_rank(terms)).order_by(
+        "-search_rank", "last_name", "first_name", "username"
+    )
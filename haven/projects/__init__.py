@@ -0,0 +1 @@
+default_app_config = "haven.projects.apps.ProjectsConfig"
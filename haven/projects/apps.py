@@ -1,5 +1,50 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class ProjectsConfig(AppConfig):
-    name = "projects"
+    name = "haven.projects"
+
+    def ready(self):
+        from easyaudit.models import CRUDEvent
+
+        from haven.projects import policy_bundles, programmes, tiers
+        from haven.projects.audit import link_event_to_projects
+        from haven.projects.models import (
+            ClassificationOpinion,
+            Policy,
+            PolicyAssignment,
+            PolicyGroup,
+            Project,
+            WorkPackage,
+            WorkPackageDataset,
+        )
+
+        post_save.connect(
+            link_event_to_projects, sender=CRUDEvent, dispatch_uid="project_audit_links"
+        )
+
+        # Keep programme summaries up to date
+        receivers = [
+            (Project.programmes.through, programmes.tagged_item_changed),
+            (Project, programmes.project_changed),
+            (WorkPackage, programmes.work_package_changed),
+        ]
+        for sender, receiver in receivers:
+            post_save.connect(receiver, sender=sender, dispatch_uid="programme_summary")
+            post_delete.connect(receiver, sender=sender, dispatch_uid="programme_summary")
+
+        # Recalculate the tier of closed work packages when classifications or datasets are
+        # removed (additions are handled by `WorkPackage.classify_as` and `add_dataset`, once
+        # everything they write is saved)
+        for sender in [ClassificationOpinion, WorkPackageDataset]:
+            post_delete.connect(
+                tiers.classification_deleted, sender=sender, dispatch_uid="tier_inputs"
+            )
+
+        # Empty the process caches of each tier's policies
+        for sender in [PolicyGroup, Policy, PolicyAssignment]:
+            for signal in [post_save, post_delete]:
+                signal.connect(
+                    policy_bundles.policies_changed, sender=sender, dispatch_uid="policy_bundles"
+                )
@@ -0,0 +1,82 @@
+import json
+import zlib
+
+from django.db import transaction
+from easyaudit.models import CRUDEvent
+
+from haven.projects.models import ArchivedAuditEvent, ProjectAuditEvent
+
+
+def get_partition(datetime):
+    """Archive partition which an event recorded at `datetime` belongs to"""
+    return datetime.strftime("%Y-%m")
+
+
+def compress_details(event):
+    details = {
+        "object_json_repr": event.object_json_repr,
+        "changed_fields": event.changed_fields,
+    }
+    return zlib.compress(json.dumps(details).encode())
+
+
+def archive_event(event):
+    return ArchivedAuditEvent(
+        id=event.id,
+        partition=get_partition(event.datetime),
+        datetime=event.datetime,
+        event_type=event.event_type,
+        content_type_id=event.content_type_id,
+        object_id=event.object_id,
+        object_repr=event.object_repr,
+        user_id=event.user_id,
+        user_pk_as_string=event.user_pk_as_string,
+        payload=compress_details(event),
+    )
+
+
+@transaction.atomic
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to `batch_size` of the oldest audit log entries recorded before `cutoff` to the
+    archive, returning the number moved
+
+    Each batch is moved in a single transaction, so if archiving is interrupted every entry is
+    either still in the audit log or fully archived.
+    """
+    events = list(
+        CRUDEvent.objects.select_for_update(skip_locked=True)
+        .filter(datetime__lt=cutoff)
+        .order_by("id")[:batch_size]
+    )
+    if not events:
+        return 0
+
+    ArchivedAuditEvent.objects.bulk_create(
+        [archive_event(event) for event in events], ignore_conflicts=True
+    )
+    ArchivedProject = ArchivedAuditEvent.projects.through
+    ArchivedProject.objects.bulk_create(
+        [
+            ArchivedProject(archivedauditevent_id=event_id, project_id=project_id)
+            for event_id, project_id in ProjectAuditEvent.objects.filter(
+                event__in=events
+            ).values_list("event_id", "project_id")
+        ],
+        ignore_conflicts=True,
+    )
+    CRUDEvent.objects.filter(id__in=[event.id for event in events]).delete()
+    return len(events)
+
+
+def archive_audit_log(cutoff, batch_size):
+    """
+    Move all audit log entries recorded before `cutoff` to the archive, one batch at a time
+
+    Yields the number of entries moved in each batch.
+    """
+    while True:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            break
+        yield archived
@@ -0,0 +1,102 @@
+import json
+
+from django.contrib.contenttypes.models import ContentType
+from easyaudit.models import CRUDEvent
+
+from haven.data.models import Dataset
+from haven.projects.models import (
+    ClassificationOpinion,
+    ClassificationOpinionQuestion,
+    Participant,
+    Project,
+    ProjectAuditEvent,
+    ProjectDataset,
+    WorkPackage,
+    WorkPackageDataset,
+    WorkPackageParticipant,
+    WorkPackageParticipantApproval,
+)
+
+
+# Lookup path from each audited model to the project(s) it belongs to
+PROJECT_LOOKUPS = {
+    Project: "pk",
+    Participant: "project",
+    ProjectDataset: "project",
+    WorkPackage: "project",
+    WorkPackageDataset: "work_package__project",
+    WorkPackageParticipant: "work_package__project",
+    WorkPackageParticipantApproval: "work_package_participant__work_package__project",
+    ClassificationOpinion: "work_package__project",
+    ClassificationOpinionQuestion: "opinion__work_package__project",
+    Dataset: "projects",
+}
+
+
+def get_serialized_fields(object_json_repr):
+    """Return the serialized field values from a `CRUDEvent`'s JSON representation"""
+    try:
+        return json.loads(object_json_repr)[0]["fields"]
+    except (TypeError, ValueError, LookupError):
+        return {}
+
+
+def get_last_serialized_fields(model, pk):
+    """Return the field values of an object as at the last time it was audited"""
+    event = (
+        CRUDEvent.objects.filter(
+            content_type=ContentType.objects.get_for_model(model), object_id=str(pk)
+        )
+        .order_by("-datetime", "-id")
+        .first()
+    )
+    return get_serialized_fields(event.object_json_repr) if event else {}
+
+
+def get_project_ids(model, pk, fields=None):
+    """
+    Return the ids of the projects which an object belongs to
+
+    If the object has since been deleted, the first step of the lookup is followed using the
+    object's serialized fields (from `fields` or, if not given, from its latest audit log entry)
+    instead.
+    """
+    lookup = PROJECT_LOOKUPS[model]
+    if lookup == "pk":
+        return {int(pk)}
+
+    project_ids = set(model.objects.filter(pk=pk).values_list(lookup, flat=True)) - {None}
+    if project_ids or model.objects.filter(pk=pk).exists():
+        return project_ids
+
+    field_name, _, _ = lookup.partition("__")
+    if fields is None:
+        fields = get_last_serialized_fields(model, pk)
+    parent_pk = fields.get(field_name)
+    if parent_pk is None:
+        return set()
+    return get_project_ids(model._meta.get_field(field_name).related_model, parent_pk)
+
+
+def get_event_project_ids(event):
+    """Return the ids of the existing projects which a `CRUDEvent` is relevant to"""
+    model = event.content_type.model_class()
+    if model not in PROJECT_LOOKUPS:
+        return set()
+    fields = get_serialized_fields(event.object_json_repr)
+    project_ids = get_project_ids(model, event.object_id, fields)
+    # The project may itself have been deleted
+    return set(Project.objects.filter(pk__in=project_ids).values_list("pk", flat=True))
+
+
+def build_project_links(event):
+    return [
+        ProjectAuditEvent(project_id=project_id, event=event)
+        for project_id in get_event_project_ids(event)
+    ]
+
+
+def link_event_to_projects(sender, instance, created, raw, **kwargs):
+    """Signal receiver which links each new `CRUDEvent` to the projects it is relevant to"""
+    if created and not raw:
+        ProjectAuditEvent.objects.bulk_create(build_project_links(instance), ignore_conflicts=True)
@@ -0,0 +1,169 @@
+import csv
+import heapq
+import json
+
+from django.db.models import Q
+
+
+HISTORY_EXPORT_FIELDS = [
+    "id",
+    "datetime",
+    "event_type",
+    "user",
+    "object_repr",
+    "object_json_repr",
+    "changed_fields",
+]
+
+
+def sort_key(event):
+    return (event.datetime, event.pk)
+
+
+def newer_than(anchor):
+    return Q(datetime__gt=anchor["datetime"]) | Q(datetime=anchor["datetime"], pk__gt=anchor["pk"])
+
+
+def older_than(anchor):
+    return Q(datetime__lt=anchor["datetime"]) | Q(datetime=anchor["datetime"], pk__lt=anchor["pk"])
+
+
+def get_history_page(histories, size, after=None, before=None):
+    """
+    Return a page of audit history using keyset pagination
+
+    `histories` is a list of querysets of events (e.g. live and archived events) with distinct
+    ids, which are paged through together newest first. `after` and `before` are the ids of
+    events on the current page; passing `after` returns the page of older events following that
+    event, and passing `before` returns the page of newer events preceding it. Ids which aren't in
+    any of the histories are ignored.
+
+    Returns a tuple of the events, the id to pass as `before` for newer events and the id to
+    pass as `after` for older events (either of which is None if there are no more events).
+    """
+    cursor = after or before
+    anchor = None
+    if cursor:
+        anchor = next(
+            (
+                anchor
+                for history in histories
+                for anchor in history.filter(pk=cursor).values("datetime", "pk")[:1]
+            ),
+            None,
+        )
+    if anchor is None:
+        after = before = None
+
+    if before:
+        events = sorted(
+            (
+                event
+                for history in histories
+                for event in history.filter(newer_than(anchor)).order_by("datetime", "pk")[
+                    : size + 1
+                ]
+            ),
+            key=sort_key,
+        )
+        if len(events) <= size:
+            # Back at the start, so show a full first page
+            return get_history_page(histories, size)
+        has_newer = True
+        events = events[:size][::-1]
+        has_older = True
+    else:
+        events = sorted(
+            (
+                event
+                for history in histories
+                for event in (history.filter(older_than(anchor)) if after else history).order_by(
+                    "-datetime", "-pk"
+                )[: size + 1]
+            ),
+            key=sort_key,
+            reverse=True,
+        )
+        has_older = len(events) > size
+        events = events[:size]
+        has_newer = bool(after)
+
+    newer_cursor = events[0].pk if events and has_newer else None
+    older_cursor = events[-1].pk if events and has_older else None
+    return events, newer_cursor, older_cursor
+
+
+def iter_chunks(history, chunk_size):
+    """Iterate over a queryset of events oldest first, fetching `chunk_size` events at a time"""
+    history = history.select_related("user").order_by("datetime", "pk")
+    last = None
+    while True:
+        events = history
+        if last is not None:
+            events = events.filter(newer_than({"datetime": last.datetime, "pk": last.pk}))
+        chunk = list(events[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            break
+        last = chunk[-1]
+
+
+def iter_history(histories, chunk_size):
+    """
+    Iterate over the events in `histories` oldest first
+
+    Each history is read in chunks with keyset queries, so memory use is bounded by the chunk
+    size however long the history is.
+    """
+    return heapq.merge(*(iter_chunks(history, chunk_size) for history in histories), key=sort_key)
+
+
+def serialize_event(event):
+    return {
+        "id": event.pk,
+        "datetime": event.datetime.isoformat(),
+        "event_type": event.get_event_type_display(),
+        "user": str(event.user) if event.user else None,
+        "object_repr": event.object_repr,
+        "object_json_repr": event.object_json_repr,
+        "changed_fields": event.changed_fields,
+    }
+
+
+# Characters which make spreadsheet applications treat a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def escape_csv_value(value):
+    """Prefix a string which a spreadsheet would read as a formula with `'`"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class Echo:
+    """File-like object which returns what is written to it, for streaming CSV rows"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(events):
+    """Generate lines of CSV for the given audit events"""
+    writer = csv.DictWriter(Echo(), fieldnames=HISTORY_EXPORT_FIELDS)
+    yield writer.writeheader()
+    for event in events:
+        row = serialize_event(event)
+        yield writer.writerow({field: escape_csv_value(value) for field, value in row.items()})
+
+
+def export_jsonl(events):
+    """Generate lines of JSON for the given audit events"""
+    for event in events:
+        yield json.dumps(serialize_event(event)) + "\n"
+
+
+HISTORY_EXPORT_FORMATS = {
+    "csv": ("text/csv", export_csv),
+    "jsonl": ("application/jsonl", export_jsonl),
+}
@@ -0,0 +1,143 @@
+"""Replaying stored classifications against a candidate question set"""
+from collections import defaultdict, namedtuple
+from functools import partial
+
+from haven.core.utils import map_chunks
+from haven.data.question_graph import get_question_graph
+from haven.projects.models import (
+    ClassificationOpinion,
+    ClassificationOpinionQuestion,
+    WorkPackage,
+)
+
+
+class OpinionReplay(
+    namedtuple(
+        "OpinionReplay",
+        ["opinion_id", "work_package_id", "username", "tier", "new_tier", "unanswered"],
+    )
+):
+    """
+    The tier a classification reached, and the tier its answers reach in a candidate question set
+
+    `new_tier` is None if the answers reach a question which wasn't answered, named `unanswered`.
+    """
+
+    __slots__ = ()
+
+    @property
+    def changed(self):
+        return self.new_tier != self.tier
+
+
+WorkPackageImpact = namedtuple(
+    "WorkPackageImpact",
+    ["work_package_id", "project", "name", "tier", "new_tier", "changes"],
+)
+
+
+def replay_answers(graph, answers):
+    """
+    Follow a dictionary of answers keyed by question name through a QuestionGraph
+
+    Returns the tier reached and None, or None and the name of the first question reached which
+    has no answer.
+    """
+    question = graph.start
+    while question is not None and not isinstance(question, int):
+        answer = answers.get(question.name)
+        if answer is None:
+            return None, question.name
+        question = graph.next(question, answer)
+    return question, None
+
+
+def replay_chunk(question_set_id, opinion_ids):
+    """
+    Replay the answers of a chunk of classifications against a question set
+
+    Returns an OpinionReplay for each classification.
+    """
+    graph = get_question_graph(question_set_id)
+    rows = (
+        ClassificationOpinionQuestion.objects.filter(opinion_id__in=opinion_ids)
+        .order_by("opinion_id", "order")
+        .values_list(
+            "opinion_id",
+            "opinion__work_package_id",
+            "opinion__created_by__username",
+            "opinion__tier",
+            "question__name",
+            "answer",
+        )
+    )
+    opinions = {}
+    for opinion_id, work_package_id, username, tier, name, answer in rows:
+        if opinion_id not in opinions:
+            opinions[opinion_id] = (work_package_id, username, tier, {})
+        opinions[opinion_id][3][name] = answer
+
+    replayed = {}
+    replays = []
+    for opinion_id, (work_package_id, username, tier, answers) in opinions.items():
+        key = frozenset(answers.items())
+        if key not in replayed:
+            replayed[key] = replay_answers(graph, answers)
+        replays.append(OpinionReplay(opinion_id, work_package_id, username, tier, *replayed[key]))
+    return replays
+
+
+def replay_all_opinions(question_set_id, chunk_size=1000, workers=1):
+    """
+    Replay every classification with recorded answers against a question set
+
+    With more than one worker the chunks are shared between a pool of processes. Yields a list of
+    OpinionReplay for each chunk.
+    """
+    # Load the graph before forking, so each worker starts with it
+    get_question_graph(question_set_id)
+    ids = list(
+        ClassificationOpinion.objects.filter(questions__isnull=False)
+        .distinct()
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    yield from map_chunks(partial(replay_chunk, question_set_id), ids, chunk_size, workers)
+
+
+def get_work_package_impact(replays):
+    """
+    Summarise replayed classifications by work package
+
+    Returns a WorkPackageImpact for each work package with any classification that would change,
+    ordered by project and name. Its `new_tier` is the tier its replayed classifications agree
+    on, or None if they disagree or any of them needs another answer, and its `changes` are the
+    OpinionReplay of the classifications that would change.
+    """
+    by_work_package = defaultdict(list)
+    for replay in replays:
+        by_work_package[replay.work_package_id].append(replay)
+    affected = {
+        work_package_id: work_package_replays
+        for work_package_id, work_package_replays in by_work_package.items()
+        if any(replay.changed for replay in work_package_replays)
+    }
+
+    impact = []
+    rows = WorkPackage.objects.filter(pk__in=affected).values_list(
+        "pk", "project__name", "name", "tier"
+    )
+    for work_package_id, project, name, tier in rows:
+        work_package_replays = affected[work_package_id]
+        new_tiers = {replay.new_tier for replay in work_package_replays}
+        impact.append(
+            WorkPackageImpact(
+                work_package_id,
+                project,
+                name,
+                tier,
+                new_tiers.pop() if len(new_tiers) == 1 else None,
+                [replay for replay in work_package_replays if replay.changed],
+            )
+        )
+    return sorted(impact, key=lambda i: (i.project, i.name))
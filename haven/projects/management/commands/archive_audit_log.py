@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from haven.projects.archive import archive_audit_log
+
+
+class Command(BaseCommand):
+    help = "Move old audit log entries to the compressed audit archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.AUDIT_ARCHIVE_AFTER_DAYS,
+            help="Archive entries recorded more than this many days ago",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.AUDIT_ARCHIVE_BATCH_SIZE,
+            help="Number of entries to archive in each transaction",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        # Each batch is committed as it goes, so an interrupted run can simply be started again
+        total = sum(archive_audit_log(cutoff, options["batch_size"]))
+        self.stdout.write(f"Archived {total} audit log entries recorded before {cutoff}")
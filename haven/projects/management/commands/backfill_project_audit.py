@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from easyaudit.models import CRUDEvent
+
+from haven.projects.audit import build_project_links
+from haven.projects.models import ProjectAuditEvent
+
+
+class Command(BaseCommand):
+    help = "Link existing audit log entries to the projects they are relevant to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of audit log entries to process at a time",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        events = CRUDEvent.objects.select_related("content_type").order_by("id")
+        last_id = 0
+        linked = 0
+        # Links which already exist are skipped, so this can safely be run more than once or
+        # resumed after being interrupted
+        while True:
+            batch = list(events.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            links = [link for event in batch for link in build_project_links(event)]
+            ProjectAuditEvent.objects.bulk_create(links, ignore_conflicts=True)
+            linked += len(links)
+            last_id = batch[-1].id
+
+        self.stdout.write(f"Linked {linked} audit log entries to projects")
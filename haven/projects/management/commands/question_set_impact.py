@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from haven.data.models import ClassificationQuestionSet
+from haven.projects.impact import get_work_package_impact, replay_all_opinions
+
+
+def describe_tier(tier):
+    return "undecided" if tier is None else f"tier {tier}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay every classification against a candidate question set, and report the work "
+        "packages whose classifications would reach a different tier"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="Name of the candidate question set")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of classifications to replay in each chunk",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes to replay chunks of classifications in",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            question_set = ClassificationQuestionSet.objects.get(name=options["name"])
+        except ClassificationQuestionSet.DoesNotExist:
+            raise CommandError(f"No question set named {options['name']}")
+
+        replays = [
+            replay
+            for chunk in replay_all_opinions(
+                question_set.id, options["chunk_size"], options["workers"]
+            )
+            for replay in chunk
+        ]
+        impact = get_work_package_impact(replays)
+        changed = sum(len(work_package.changes) for work_package in impact)
+        self.stdout.write(
+            f"Replayed {len(replays)} classifications against {question_set.name}: "
+            f"{changed} would change, in {len(impact)} work packages"
+        )
+        for work_package in impact:
+            self.stdout.write(
+                f"{work_package.project} / {work_package.name}: "
+                f"{describe_tier(work_package.tier)} -> {describe_tier(work_package.new_tier)}"
+            )
+            for replay in work_package.changes:
+                if replay.unanswered:
+                    outcome = f"needs an answer to {replay.unanswered}"
+                else:
+                    outcome = describe_tier(replay.new_tier)
+                self.stdout.write(f"  {replay.username}: tier {replay.tier} -> {outcome}")
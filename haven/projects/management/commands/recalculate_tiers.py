@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from haven.projects.tiers import recalculate_all_tiers
+
+
+class Command(BaseCommand):
+    help = "Calculate the tier of every work package whose classification is closed without one"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Number of work packages to recalculate in each transaction",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes to recalculate chunks of work packages in",
+        )
+
+    def handle(self, *args, **options):
+        # Each chunk is committed as it goes, so an interrupted run can simply be started again
+        total = sum(recalculate_all_tiers(options["chunk_size"], options["workers"]))
+        self.stdout.write(f"Assigned a tier to {total} work packages")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from haven.projects.programmes import refresh_all_programme_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the project and work package counts shown on the programme list"
+
+    def handle(self, *args, **options):
+        refresh_all_programme_summaries()
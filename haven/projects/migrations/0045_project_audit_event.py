@@ -0,0 +1,26 @@
+# Generated by Django 3.1.13 on 2026-10-19 00:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('easyaudit', '0016_alter_crudevent_event_type'),
+        ('projects', '0044_auto_20220531_1303'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectAuditEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_links', to='easyaudit.crudevent')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_links', to='projects.project')),
+            ],
+            options={
+                'unique_together': {('project', 'event')},
+            },
+        ),
+    ]
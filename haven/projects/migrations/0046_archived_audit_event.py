@@ -0,0 +1,37 @@
+# Generated by Django 3.1.13 on 2026-10-19 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0045_project_audit_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAuditEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('partition', models.CharField(help_text='Month the event was recorded in', max_length=7)),
+                ('datetime', models.DateTimeField()),
+                ('event_type', models.SmallIntegerField(choices=[(1, 'Create'), (2, 'Update'), (3, 'Delete'), (4, 'Many-to-Many Change'), (5, 'Reverse Many-to-Many Change'), (6, 'Many-to-Many Add'), (7, 'Reverse Many-to-Many Add'), (8, 'Many-to-Many Remove'), (9, 'Reverse Many-to-Many Remove'), (10, 'Many-to-Many Clear'), (11, 'Reverse Many-to-Many Clear')])),
+                ('object_id', models.CharField(max_length=255)),
+                ('object_repr', models.TextField(blank=True, null=True)),
+                ('user_pk_as_string', models.CharField(blank=True, max_length=255, null=True)),
+                ('payload', models.BinaryField()),
+                ('content_type', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+                ('projects', models.ManyToManyField(related_name='archived_audit_events', to='projects.Project')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedauditevent',
+            index=models.Index(fields=['partition', 'datetime'], name='projects_ar_partiti_98bad7_idx'),
+        ),
+    ]
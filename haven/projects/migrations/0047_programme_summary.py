@@ -0,0 +1,66 @@
+# Generated by Django 3.1.13 on 2026-10-19 00:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter, defaultdict
+
+
+def create_summaries(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    TaggedItem = apps.get_model("taggit", "TaggedItem")
+    Project = apps.get_model("projects", "Project")
+    WorkPackage = apps.get_model("projects", "WorkPackage")
+    ProgrammeSummary = apps.get_model("projects", "ProgrammeSummary")
+
+    content_type = ContentType.objects.filter(app_label="projects", model="project").first()
+    if content_type is None:
+        return
+    archived = dict(Project.objects.values_list("id", "archived"))
+    tiers = defaultdict(Counter)
+    for project_id, tier in WorkPackage.objects.filter(tier__isnull=False).values_list(
+        "project_id", "tier"
+    ):
+        tiers[project_id][str(tier)] += 1
+
+    summaries = {}
+    for tag_id, project_id in TaggedItem.objects.filter(content_type=content_type).values_list(
+        "tag_id", "object_id"
+    ):
+        if project_id not in archived:
+            continue
+        summary = summaries.setdefault(
+            tag_id, ProgrammeSummary(tag_id=tag_id, work_package_tiers={})
+        )
+        if archived[project_id]:
+            summary.archived_projects += 1
+        else:
+            summary.active_projects += 1
+            for tier, count in tiers[project_id].items():
+                summary.work_package_tiers[tier] = summary.work_package_tiers.get(tier, 0) + count
+    ProgrammeSummary.objects.bulk_create(summaries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taggit', '0003_taggeditem_add_unique_index'),
+        ('projects', '0046_archived_audit_event'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgrammeSummary',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='programme_summary', serialize=False, to='taggit.tag')),
+                ('active_projects', models.PositiveIntegerField(default=0)),
+                ('archived_projects', models.PositiveIntegerField(default=0)),
+                ('work_package_tiers', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='programmesummary',
+            index=models.Index(fields=['-active_projects', 'tag'], name='projects_pr_active__6b1efb_idx'),
+        ),
+        migrations.RunPython(create_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.13 on 2026-10-19 01:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0047_programme_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationDraft',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(default=dict)),
+                ('is_modification', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('work_package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='classification_drafts', to='projects.workpackage')),
+            ],
+            options={
+                'unique_together': {('user', 'work_package')},
+            },
+        ),
+    ]
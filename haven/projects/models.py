@@ -1,3 +1,5 @@
+import json
+import zlib
 from enum import Enum
 from uuid import uuid4
 
@@ -6,10 +8,13 @@ from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.db.models import BooleanField, Case, Q, Value, When
 from django.urls import reverse
+from django.utils.functional import cached_property
 from easyaudit.models import CRUDEvent
 from taggit.managers import TaggableManager
+from taggit.models import Tag
 
 from haven.core.utils import BooleanTextTable
+from haven.data import question_history
 from haven.data.models import (
     ClassificationQuestion,
     ClassificationQuestionSet,
@@ -239,14 +244,10 @@ class Project(CreatedByModel):
         return not datasets.exists()
 
     def get_audit_history(self):
-        this_object = Q(content_type=ContentType.objects.get_for_model(self), object_id=self.pk)
-        # This is a bit of a hack - if the model uses a different field name for example, it
-        # won't be picked up, it doesn't catch transitive relationships,
-        # and it relies on how the json has been formatted
-        # A more robust approach would involve basing decisions on the content type, and possibly
-        # storing the data as actual JSON and using the JSON operators, but that's database-specific
-        related = Q(object_json_repr__regex=f'"project": {self.pk}[,}}]')
-        return CRUDEvent.objects.filter(this_object | related)
+        return CRUDEvent.objects.filter(project_links__project=self)
+
+    def get_archived_audit_history(self):
+        return self.archived_audit_events.all()
 
 
 class WorkPackageStatus(Enum):
@@ -356,6 +357,10 @@ class WorkPackage(CreatedByModel):
         representative = project_dataset.representative
         if not self.get_work_package_participant(representative).exists():
             self.add_user(representative, created_by)
+
+        from haven.projects.tiers import tier_inputs_changed
+
+        tier_inputs_changed(self)
         return wpd
 
     @transaction.atomic
@@ -402,6 +407,7 @@ class WorkPackage(CreatedByModel):
     def can_close_classification(self):
         return self._can("close_classification") and self.is_classification_ready
 
+    @transaction.atomic
     def close_classification(self):
         self.status = WorkPackageStatus.CLASSIFIED.value
         self.calculate_tier()
@@ -535,12 +541,9 @@ class WorkPackage(CreatedByModel):
         it passes the relevant classification criteria (all required users have
         classified the project, and they all agree on the tier)
         """
-        if self.has_tier:
-            return
+        from haven.projects.tiers import calculate_tier
 
-        if self.is_classification_ready and not self.tier_conflict:
-            self.tier = self.classifications.first().tier
-            self.save()
+        calculate_tier(self, force=True)
 
     def classify_as(self, tier, by_user, questions=None):
         """
@@ -548,8 +551,9 @@ class WorkPackage(CreatedByModel):
 
         :param tier: Tier the user thinks the project is
         :param by_user: User object
-        :param questions: Sequence of (ClassificationQuestion, bool) items
-            representing the user's classification answers
+        :param questions: Sequence of (question, bool) items representing the user's
+            classification answers, where each question is a ClassificationQuestion or a
+            QuestionNode
 
         :return: `ClassificationOpinion` object
         """
@@ -578,15 +582,23 @@ class WorkPackage(CreatedByModel):
                 wpd.save()
 
         if questions:
+            versions = question_history.get_latest_versions([q[0].id for q in questions])
             for i, q in enumerate(questions):
+                if q[0].id not in versions:
+                    raise ClassificationQuestion.history.model.DoesNotExist(
+                        f"Question {q[0].id} has no history"
+                    )
                 ClassificationOpinionQuestion.objects.create(
                     opinion=classification,
                     order=i,
-                    question=q[0],
-                    question_version=q[0].history.latest().history_id,
+                    question_id=q[0].id,
+                    question_version=versions[q[0].id],
                     answer=q[1],
                 )
 
+        from haven.projects.tiers import tier_inputs_changed
+
+        tier_inputs_changed(self)
         return classification
 
     def classification_for(self, user):
@@ -624,7 +636,7 @@ class WorkPackage(CreatedByModel):
         q = None
         for d in self.get_work_package_datasets(representative=approver):
             # Find anyone who is not approved for this dataset
-            q2 = ~Q(approvals__dataset=d.dataset)
+            q2 = ~Q(approvals__dataset=d.dataset_id)
             if q is None:
                 q = q2
             else:
@@ -704,10 +716,12 @@ class WorkPackage(CreatedByModel):
         return self.classification_for(user).exists()
 
     def get_policies(self):
+        from haven.projects.policy_bundles import get_policy_bundle
+
         if not self.has_tier:
             return []
 
-        return PolicyAssignment.objects.filter(tier=self.tier)
+        return get_policy_bundle(self.tier)
 
     def get_absolute_url(self):
         return reverse("projects:work_package_detail", args=[self.project.uuid, self.uuid])
@@ -772,7 +786,8 @@ class ClassificationOpinion(CreatedByModel):
 
     @property
     def datasets(self):
-        return [wpd.dataset for wpd in WorkPackageDataset.objects.filter(opinion=self)]
+        opinion_datasets = WorkPackageDataset.objects.filter(opinion=self).select_related("dataset")
+        return [wpd.dataset for wpd in opinion_datasets]
 
 
 class ClassificationOpinionQuestion(models.Model):
@@ -786,7 +801,53 @@ class ClassificationOpinionQuestion(models.Model):
 
     @property
     def question_at_time(self):
-        return self.question.history.get(history_id=self.question_version)
+        return question_history.get_question_version(self.question_version)
+
+
+class ClassificationDraft(models.Model):
+    """
+    A user's answers so far while classifying a work package
+
+    Answers are keyed by question id. They always follow a single path from the starting question,
+    so their order is the order that path visits them in, and doesn't need to be stored.
+    """
+
+    work_package = models.ForeignKey(
+        WorkPackage, related_name="classification_drafts", on_delete=models.CASCADE
+    )
+    user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    # Answers to each question, keyed by question id (as a string, since these are JSON keys)
+    answers = models.JSONField(default=dict)
+    # Whether the user is modifying an existing classification
+    is_modification = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "work_package")
+
+    def __str__(self):
+        return f"{self.user}: {self.work_package} ({len(self.answers)} answers)"
+
+    def get_answer(self, question_id):
+        """Return the answer to the question with the given id, or None if it wasn't answered"""
+        return self.answers.get(str(question_id))
+
+    def walk(self, graph, until=None):
+        """
+        Follow the answers from the starting question of `graph`
+
+        Stops at `until`, at the first unanswered question, or at a tier. Returns a list of
+        (QuestionNode, answer) pairs, and the question or tier it stopped at.
+        """
+        path = []
+        question = graph.start
+        while question is not None and not isinstance(question, int) and question != until:
+            answer = self.get_answer(question.id)
+            if answer is None:
+                break
+            path.append((question, answer))
+            question = graph.next(question, answer)
+        return path, question
 
 
 class PolicyGroup(models.Model):
@@ -836,6 +897,7 @@ class WorkPackageParticipant(CreatedByModel):
     class Meta(CreatedByModel.Meta):
         unique_together = ("participant", "work_package")
 
+    @transaction.atomic
     def approve(self, approver):
         approver_participant = approver.get_participant(self.work_package.project)
 
@@ -854,7 +916,9 @@ class WorkPackageParticipant(CreatedByModel):
                     created_by=approver,
                 )
 
-        self.work_package.calculate_tier()
+        from haven.projects.tiers import calculate_tier
+
+        calculate_tier(self.work_package)
 
 
 class WorkPackageParticipantApproval(CreatedByModel):
@@ -862,3 +926,99 @@ class WorkPackageParticipantApproval(CreatedByModel):
         WorkPackageParticipant, on_delete=models.CASCADE, related_name="approvals"
     )
     dataset = models.ForeignKey(Dataset, related_name="+", on_delete=models.CASCADE)
+
+
+class ProjectAuditEvent(models.Model):
+    """
+    Links an audit log entry to a project it is relevant to
+
+    Links are written as each `CRUDEvent` is created (see `haven.projects.audit`), including for
+    objects which only relate to the project indirectly such as dataset approvals, so that a
+    project's history can be read with an indexed join rather than by scanning the audit log.
+    """
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="audit_links")
+    event = models.ForeignKey(CRUDEvent, on_delete=models.CASCADE, related_name="project_links")
+
+    class Meta:
+        unique_together = ("project", "event")
+
+
+class ArchivedAuditEvent(models.Model):
+    """
+    An audit log entry which has been moved out of the `CRUDEvent` table (see
+    `haven.projects.archive`)
+
+    Entries keep the id of the `CRUDEvent` they were archived from, so live and archived history
+    can be paged through together. They are partitioned by the month they were recorded in, and
+    the bulky JSON representation and changed fields are stored compressed.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    partition = models.CharField(max_length=7, help_text="Month the event was recorded in")
+    datetime = models.DateTimeField()
+    event_type = models.SmallIntegerField(choices=CRUDEvent.TYPES)
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, db_constraint=False, related_name="+"
+    )
+    object_id = models.CharField(max_length=255)
+    object_repr = models.TextField(null=True, blank=True)
+    user = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        related_name="+",
+    )
+    user_pk_as_string = models.CharField(max_length=255, null=True, blank=True)
+    payload = models.BinaryField()
+    projects = models.ManyToManyField(Project, related_name="archived_audit_events")
+
+    class Meta:
+        indexes = [models.Index(fields=["partition", "datetime"])]
+
+    @cached_property
+    def details(self):
+        return json.loads(zlib.decompress(self.payload))
+
+    @property
+    def object_json_repr(self):
+        return self.details["object_json_repr"]
+
+    @property
+    def changed_fields(self):
+        return self.details["changed_fields"]
+
+
+class ProgrammeSummary(models.Model):
+    """
+    Project and work package counts for a programme, so that the programme list doesn't need to
+    aggregate over every project
+
+    Summaries are kept up to date as projects, their programmes and their work packages change
+    (see `haven.projects.programmes`).
+    """
+
+    tag = models.OneToOneField(
+        Tag, on_delete=models.CASCADE, primary_key=True, related_name="programme_summary"
+    )
+    active_projects = models.PositiveIntegerField(default=0)
+    archived_projects = models.PositiveIntegerField(default=0)
+    # Number of work packages in active projects with each tier, keyed by tier
+    work_package_tiers = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [models.Index(fields=["-active_projects", "tag"])]
+
+    def __str__(self):
+        return str(self.tag)
+
+    @property
+    def total_projects(self):
+        return self.active_projects + self.archived_projects
+
+    @property
+    def work_package_tier_counts(self):
+        """List of (tier name, number of work packages) for every tier, in tier order"""
+        return [(name, self.work_package_tiers.get(str(tier), 0)) for tier, name in TIER_CHOICES]
@@ -0,0 +1,47 @@
+"""The policies of each tier, cached as immutable bundles until any policy changes"""
+from collections import namedtuple
+
+from haven.data.caching import ProcessCache, invalidate_generation
+from haven.projects.models import PolicyAssignment
+
+
+GENERATION_KEY = "policies:generation"
+
+PolicyGroupEntry = namedtuple("PolicyGroupEntry", ["id", "name", "description"])
+PolicyEntry = namedtuple("PolicyEntry", ["id", "name", "description", "group"])
+PolicyAssignmentEntry = namedtuple("PolicyAssignmentEntry", ["id", "tier", "policy"])
+
+# "bundles" -> {tier: tuple of PolicyAssignmentEntry}
+_bundles = ProcessCache(generation_key=GENERATION_KEY)
+
+
+def load_policy_bundles():
+    """Return the policies of every tier, as a dictionary of bundles keyed by tier"""
+    bundles = {}
+    groups = {}
+    assignments = PolicyAssignment.objects.select_related("policy__group").order_by("pk")
+    for assignment in assignments:
+        policy = assignment.policy
+        if policy.group_id not in groups:
+            groups[policy.group_id] = PolicyGroupEntry(
+                policy.group_id, policy.group.name, policy.group.description
+            )
+        entry = PolicyAssignmentEntry(
+            assignment.pk,
+            assignment.tier,
+            PolicyEntry(policy.pk, policy.name, policy.description, groups[policy.group_id]),
+        )
+        bundles.setdefault(assignment.tier, []).append(entry)
+    return {tier: tuple(bundle) for tier, bundle in bundles.items()}
+
+
+def get_policy_bundle(tier):
+    """Return the policies of a tier, as a tuple of PolicyAssignmentEntry"""
+    values = _bundles.values
+    if "bundles" not in values:
+        values["bundles"] = load_policy_bundles()
+    return values["bundles"].get(tier, ())
+
+
+def policies_changed(sender, **kwargs):
+    invalidate_generation(GENERATION_KEY)
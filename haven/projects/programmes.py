@@ -0,0 +1,84 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Q
+
+from haven.projects.models import ProgrammeSummary, Project, WorkPackage
+
+
+def refresh_programme_summaries(tag_ids):
+    """
+    Recalculate the summaries of the given programmes
+
+    Only the projects and work packages in these programmes are counted, so this is cheap enough
+    to call whenever one of them changes. Summaries of programmes without any projects are
+    removed.
+    """
+    tag_ids = set(tag_ids)
+    if not tag_ids:
+        return
+
+    summaries = {
+        tag_id: ProgrammeSummary(tag_id=tag_id, work_package_tiers={}) for tag_id in tag_ids
+    }
+    project_counts = (
+        Project.objects.filter(programmes__id__in=tag_ids)
+        .values("programmes__id")
+        .annotate(
+            active=Count("pk", filter=Q(archived=False)),
+            archived=Count("pk", filter=Q(archived=True)),
+        )
+    )
+    for row in project_counts:
+        summary = summaries[row["programmes__id"]]
+        summary.active_projects = row["active"]
+        summary.archived_projects = row["archived"]
+
+    tier_counts = (
+        WorkPackage.objects.filter(
+            project__programmes__id__in=tag_ids, project__archived=False, tier__isnull=False
+        )
+        .values("project__programmes__id", "tier")
+        .annotate(count=Count("pk"))
+    )
+    for row in tier_counts:
+        summaries[row["project__programmes__id"]].work_package_tiers[str(row["tier"])] = row[
+            "count"
+        ]
+
+    empty = [tag_id for tag_id, summary in summaries.items() if not summary.total_projects]
+    ProgrammeSummary.objects.filter(tag_id__in=empty).delete()
+    for tag_id, summary in summaries.items():
+        if summary.total_projects:
+            ProgrammeSummary.objects.update_or_create(
+                tag_id=tag_id,
+                defaults={
+                    "active_projects": summary.active_projects,
+                    "archived_projects": summary.archived_projects,
+                    "work_package_tiers": summary.work_package_tiers,
+                },
+            )
+
+
+def refresh_all_programme_summaries():
+    """Rebuild the summaries of every programme"""
+    tag_ids = set(Project.programmes.through.objects.values_list("tag_id", flat=True).distinct())
+    ProgrammeSummary.objects.exclude(tag_id__in=tag_ids).delete()
+    refresh_programme_summaries(tag_ids)
+
+
+def get_project_tag_ids(project_id):
+    return Project.programmes.through.objects.filter(
+        content_type=ContentType.objects.get_for_model(Project), object_id=project_id
+    ).values_list("tag_id", flat=True)
+
+
+def tagged_item_changed(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(Project).id:
+        refresh_programme_summaries([instance.tag_id])
+
+
+def project_changed(sender, instance, **kwargs):
+    refresh_programme_summaries(get_project_tag_ids(instance.pk))
+
+
+def work_package_changed(sender, instance, **kwargs):
+    refresh_programme_summaries(get_project_tag_ids(instance.project_id))
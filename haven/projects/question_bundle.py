@@ -0,0 +1,115 @@
+"""The guidance shown with each classification question, and question bundles for the browser"""
+import re
+from collections import namedtuple
+
+from haven.core.sanitize import clean_html, clean_html_no_links
+from haven.data.caching import ProcessCache
+from haven.data.models import ClassificationGuidance
+
+
+# Links to guidance. Some form of HTML parser might be better, but we're looking for a very
+# limited pattern so is hopefully unnecessary
+GUIDANCE_LINK = re.compile('href="#([^"]+)"')
+
+GuidanceEntry = namedtuple("GuidanceEntry", ["name", "guidance"])
+QuestionGuidance = namedtuple("QuestionGuidance", ["explanation", "guidance"])
+
+# question set id -> {question id: QuestionGuidance}
+_question_guidance = ProcessCache()
+# question set id -> bundle
+_bundles = ProcessCache()
+
+
+def get_question_guidance(question, all_guidance):
+    """
+    Return the explanation of a question, and a list of the guidance it links to
+
+    `all_guidance` is a dictionary of every GuidanceEntry (or ClassificationGuidance) keyed by
+    name. The list includes guidance linked to from the question, its explanation, and any
+    guidance they link to in turn.
+    """
+    matches = [m for m in GUIDANCE_LINK.finditer(question.question)]
+
+    explanation = all_guidance.get(question.name)
+    if explanation:
+        matches.extend([m for m in GUIDANCE_LINK.finditer(explanation.guidance)])
+
+    guidance = []
+    while matches:
+        match = matches.pop(0)
+        name = match.group(1)
+        g = all_guidance.get(name)
+        if g and g not in guidance:
+            guidance.append(g)
+            matches.extend([m for m in GUIDANCE_LINK.finditer(g.guidance)])
+    return explanation, guidance
+
+
+def get_guidance_closures(graph):
+    """
+    Return the guidance shown with each question of a QuestionGraph
+
+    Returns a dictionary of QuestionGuidance keyed by question id, each with the question's
+    explanation (or None) and the list of guidance it links to, as GuidanceEntry tuples.
+    """
+    closures = _question_guidance.values
+    if graph.question_set_id in closures:
+        return closures[graph.question_set_id]
+
+    all_guidance = {
+        name: GuidanceEntry(name, text)
+        for name, text in ClassificationGuidance.objects.values_list("name", "guidance")
+    }
+    question_guidance = {}
+    for question in graph.questions.values():
+        explanation, guidance = get_question_guidance(question, all_guidance)
+        question_guidance[question.id] = QuestionGuidance(explanation, tuple(guidance))
+    closures[graph.question_set_id] = question_guidance
+    return question_guidance
+
+
+def _next(graph, question, answer):
+    following = graph.next(question, answer)
+    if isinstance(following, int):
+        return {"tier": following}
+    if following is None:
+        return None
+    return {"question": following.id}
+
+
+def get_question_bundle(graph):
+    """
+    Return the questions of a QuestionGraph, and their guidance, as a JSON-serializable dict
+
+    Questions are keyed by id. Each has its sanitized text, a summary without links for showing
+    as the next question, what answering yes or no leads to (another question or a tier), and
+    the names of its explanation and guidance. Guidance is keyed by name.
+    """
+    bundles = _bundles.values
+    if graph.question_set_id in bundles:
+        return bundles[graph.question_set_id]
+
+    question_guidance = get_guidance_closures(graph)
+    questions = {}
+    used_guidance = {}
+    for question in graph.ordered:
+        explanation, guidance = question_guidance[question.id]
+        for g in [explanation, *guidance]:
+            if g:
+                used_guidance[g.name] = g
+        questions[question.id] = {
+            "question": clean_html(question.question),
+            "summary": clean_html_no_links(question.question),
+            "yes": _next(graph, question, True),
+            "no": _next(graph, question, False),
+            "explanation": explanation.name if explanation else None,
+            "guidance": [g.name for g in guidance],
+        }
+
+    bundle = {
+        "start": graph.start.id if graph.start else None,
+        "questions": questions,
+        "guidance": {name: clean_html(g.guidance) for name, g in used_guidance.items()},
+    }
+    bundles[graph.question_set_id] = bundle
+    return bundle
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+
+# Sent with `sender=WorkPackage` and `work_package=<instance>` when a work package is assigned a
+# tier. Receivers are called inside the transaction that saves the tier, so anything they write is
+# committed or rolled back together with the classification.
+work_package_classified = Signal()
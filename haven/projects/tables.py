@@ -1,20 +1,17 @@
 from operator import attrgetter
 
-import bleach
 import django_tables2 as tables
+from django.db.models import prefetch_related_objects
 from django.urls import reverse
 from django.utils.html import format_html
-from django_bleach.utils import get_bleach_default_options
 
+from haven.core.sanitize import clean_html_no_links
+from haven.data import question_history
 
-def bleach_no_links(value):
-    kwargs = dict(get_bleach_default_options())
-    value = bleach.clean(value, **kwargs)
 
-    kwargs["tags"] = [t for t in kwargs["tags"] if t != "a"]
-    kwargs["strip"] = True
-    value = bleach.clean(value, **kwargs)
-    return value
+def bleach_no_links(value):
+    """Sanitize `value` and strip its links, caching the result (see `haven.core.sanitize`)"""
+    return clean_html_no_links(value)
 
 
 class ParticipantTable(tables.Table):
@@ -51,11 +48,12 @@ class WorkPackageParticipantTable(tables.Table):
         orderable = False
         empty_text = "No participants to display"
 
-    def __init__(self, *args, work_package=None, user=None, **kwargs):
+    def __init__(self, *args, work_package=None, user=None, permissions=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.work_package = work_package
         self.user = user
+        self.permissions = permissions
 
     def before_render(self, request):
         if self.work_package is None:
@@ -64,7 +62,7 @@ class WorkPackageParticipantTable(tables.Table):
         elif self.user is None:
             self.columns.hide("approved_by_you")
         else:
-            perms = self.user.project_permissions(self.work_package.project)
+            perms = self.permissions or self.user.project_permissions(self.work_package.project)
             if not perms.can_approve_participants:
                 self.columns.hide("approved_by_you")
 
@@ -109,12 +107,33 @@ class HistoryTable(tables.Table):
     event_type = tables.Column("Type")
     user = tables.Column("User")
     object_repr = tables.Column("Subject")
-    object_json_repr = tables.Column("Details")
-    changed_fields = tables.Column("Changes")
+    # The JSON fields can be very large, so they are loaded when expanded rather than up front
+    object_json_repr = tables.Column("Details", accessor="pk")
+    changed_fields = tables.Column("Changes", accessor="pk")
 
     class Meta:
         orderable = False
 
+    def __init__(self, *args, project=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.project = project
+
+    def render_lazy_detail(self, record, field):
+        url = reverse("projects:history_event", args=[self.project.uuid, record.pk])
+        return format_html(
+            '<details class="history-detail" data-url="{}" data-field="{}">'
+            "<summary>Show</summary><pre></pre></details>",
+            url,
+            field,
+        )
+
+    def render_object_json_repr(self, record):
+        return self.render_lazy_detail(record, "object_json_repr")
+
+    def render_changed_fields(self, record):
+        return self.render_lazy_detail(record, "changed_fields")
+
 
 class PolicyTable(tables.Table):
     group = tables.Column("Policy", accessor="policy__group__description")
@@ -132,15 +151,18 @@ class ClassificationOpinionQuestionTable(tables.Table):
 
     def __init__(self, classifications, *args, current_user=None, **kwargs):
         all_questions = self._get_all_questions(classifications)
+        question_text = self._get_question_text(all_questions)
         columns = []
         unique_questions = {}
 
         for questions in all_questions:
             column_name, column = self._create_column(questions[0].opinion)
             columns.append((column_name, column))
-            self._populate_column_data(column_name, questions, unique_questions, current_user)
+            self._populate_column_data(
+                column_name, questions, question_text, unique_questions, current_user
+            )
 
-        data = self._get_sorted_data(all_questions, unique_questions)
+        data = self._get_sorted_data(all_questions, question_text, unique_questions)
 
         super().__init__(
             data,
@@ -151,13 +173,31 @@ class ClassificationOpinionQuestionTable(tables.Table):
 
     @staticmethod
     def _get_all_questions(classifications):
+        classifications = sorted(classifications, key=attrgetter("created_at"))
+        # Only fetches what the caller hasn't already selected or prefetched
+        prefetch_related_objects(classifications, "created_by", "questions")
         all_questions = []
-        for classification in sorted(classifications, key=attrgetter("created_at")):
+        for classification in classifications:
             q = list(classification.questions.all())
             if q:
                 all_questions.append(q)
         return all_questions
 
+    @staticmethod
+    def _get_question_text(all_questions):
+        """
+        Look up the wording of every answered question at the time it was answered
+
+        Returns a dictionary of question text keyed by historical question id
+        """
+        versions = {
+            question.question_version for questions in all_questions for question in questions
+        }
+        return {
+            history_id: version.question
+            for history_id, version in question_history.get_question_versions(versions).items()
+        }
+
     @classmethod
     def _create_column(cls, classification):
         user = classification.created_by
@@ -173,9 +213,17 @@ class ClassificationOpinionQuestionTable(tables.Table):
         return (column_name, column)
 
     @staticmethod
-    def _populate_column_data(column_name, questions, unique_questions, current_user):
+    def _populate_column_data(
+        column_name, questions, question_text, unique_questions, current_user
+    ):
+        opinion = questions[0].opinion
+        modify_args = None
+        if current_user == opinion.created_by:
+            work_package = opinion.work_package
+            modify_args = [work_package.project.uuid, work_package.uuid]
+
         for question in questions:
-            key = question.question_at_time.question
+            key = question_text[question.question_version]
             row = unique_questions.setdefault(
                 key,
                 {
@@ -183,38 +231,44 @@ class ClassificationOpinionQuestionTable(tables.Table):
                 },
             )
             row[column_name] = question.answer
-            if current_user == question.opinion.created_by:
-                args = [
-                    question.opinion.work_package.project.uuid,
-                    question.opinion.work_package.uuid,
-                    question.question.id,
-                ]
-                url = reverse("projects:classify_data", args=args)
+            if modify_args:
+                url = reverse("projects:classify_data", args=[*modify_args, question.question_id])
                 url += "?modify=1"
                 row["modify_url"] = url
 
     @staticmethod
-    def _get_sorted_data(all_questions, unique_questions):
+    def _get_sorted_data(all_questions, question_text, unique_questions):
         # There's no perfect way to sort the data, e.g. if user A was asked Q1 then Q2 and user
         # B was asked Q2 then Q1.
         # The code below ensures that the first user's questions are shown in order, then any
         # missing questions for the next user are inserted at the appropriate point /if possible/,
         # and at the end otherwise, and so on for all users.
-        data = []
+        # Rather than searching and inserting into a list, each question placed so far records
+        # the questions to be shown immediately before it, and the list is built once at the end.
+        top_level = []
+        placed_before = {}
         for questions in all_questions:
             pending = []
             for question in sorted(questions, key=attrgetter("order")):
-                key = question.question_at_time.question
-                row = unique_questions[key]
-                try:
-                    i = data.index(row)
-                    for p in pending:
-                        data.insert(i, p)
-                        i += 1
+                key = question_text[question.question_version]
+                if key in placed_before:
+                    placed_before[key].extend(pending)
+                    placed_before.update((p, []) for p in pending)
                     pending = []
-                except ValueError:
-                    pending.append(row)
-            data.extend(pending)
+                else:
+                    pending.append(key)
+            placed_before.update((p, []) for p in pending)
+            top_level.extend(pending)
+
+        data = []
+
+        def place(key):
+            for earlier in placed_before[key]:
+                place(earlier)
+            data.append(unique_questions[key])
+
+        for key in top_level:
+            place(key)
         return data
 
     def render_question(self, value):
@@ -0,0 +1,213 @@
+"""Calculating the tier of work packages from their classifications"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Subquery
+
+from haven.core.utils import map_chunks
+from haven.projects.models import (
+    ClassificationOpinion,
+    WorkPackage,
+    WorkPackageDataset,
+    WorkPackageParticipant,
+    WorkPackageParticipantApproval,
+    WorkPackageStatus,
+)
+from haven.projects.signals import work_package_classified
+
+
+TierConsensus = namedtuple("TierConsensus", ["opinions", "tiers", "tier", "last_opinion"])
+
+TierInputs = namedtuple(
+    "TierInputs",
+    [
+        "consensus",
+        "datasets",
+        "dataset_opinions",
+        "participants",
+        "last_participant",
+        "approvals",
+        "last_approval",
+    ],
+)
+
+NO_OPINIONS = TierConsensus(0, 0, None, None)
+
+
+def inputs_key(work_package_id):
+    return f"work_package_tier_inputs:{work_package_id}"
+
+
+def get_tier_consensus(work_package_ids):
+    """
+    Summarise the classifications of each work package, in a single query
+
+    Returns a TierConsensus for each work package id, with the number of classifications, the
+    number of different tiers they give, the lowest of those tiers, and the latest
+    classification's id. Work packages are in agreement if `tiers` is 1.
+    """
+    consensus = {work_package_id: NO_OPINIONS for work_package_id in work_package_ids}
+    rows = (
+        ClassificationOpinion.objects.filter(work_package_id__in=work_package_ids)
+        .values("work_package_id")
+        .annotate(
+            opinions=Count("pk"),
+            tiers=Count("tier", distinct=True),
+            tier=Min("tier"),
+            last_opinion=Max("pk"),
+        )
+        .values_list("work_package_id", "opinions", "tiers", "tier", "last_opinion")
+    )
+    for work_package_id, *values in rows:
+        consensus[work_package_id] = TierConsensus(*values)
+    return consensus
+
+
+def _aggregate(queryset, work_package_field, aggregate):
+    """Subquery of an aggregate over the rows of `queryset` belonging to each work package"""
+    return Subquery(
+        queryset.filter(**{work_package_field: OuterRef("pk")})
+        .values(work_package_field)
+        .annotate(value=aggregate)
+        .values("value"),
+        output_field=IntegerField(),
+    )
+
+
+def get_tier_inputs(work_packages, consensus):
+    """
+    Summarise everything the readiness of each work package depends on, in a single query
+
+    Returns a TierInputs for each work package, keyed by id.
+    """
+    approvals = WorkPackageParticipantApproval.objects.all()
+    approval_field = "work_package_participant__work_package"
+    rows = (
+        WorkPackage.objects.filter(pk__in=[work_package.pk for work_package in work_packages])
+        .annotate(
+            dataset_count=_aggregate(WorkPackageDataset.objects.all(), "work_package", Count("pk")),
+            dataset_opinions=_aggregate(
+                WorkPackageDataset.objects.all(), "work_package", Count("opinion")
+            ),
+            participant_count=_aggregate(
+                WorkPackageParticipant.objects.all(), "work_package", Count("pk")
+            ),
+            last_participant=_aggregate(
+                WorkPackageParticipant.objects.all(), "work_package", Max("pk")
+            ),
+            approvals=_aggregate(approvals, approval_field, Count("pk")),
+            last_approval=_aggregate(approvals, approval_field, Max("pk")),
+        )
+        .values_list(
+            "pk",
+            "dataset_count",
+            "dataset_opinions",
+            "participant_count",
+            "last_participant",
+            "approvals",
+            "last_approval",
+        )
+    )
+    return {pk: TierInputs(consensus[pk], *values) for pk, *values in rows}
+
+
+def calculate_tiers(work_packages, force=False):
+    """
+    Calculate the tier of each of the given work packages that doesn't have one yet
+
+    Work packages whose classifications disagree are skipped after a single query. Unless `force`
+    is True, so are work packages which weren't ready the last time they were checked and whose
+    inputs haven't changed since.
+
+    Returns the work packages that were assigned a tier.
+    """
+    work_packages = [work_package for work_package in work_packages if not work_package.has_tier]
+    if not work_packages:
+        return []
+    consensus = get_tier_consensus([work_package.pk for work_package in work_packages])
+    candidates = [
+        work_package for work_package in work_packages if consensus[work_package.pk].tiers == 1
+    ]
+    if not candidates:
+        return []
+
+    inputs = get_tier_inputs(candidates, consensus)
+    checked = cache.get_many([inputs_key(work_package.pk) for work_package in candidates])
+    classified = []
+    not_ready = {}
+    for work_package in candidates:
+        key = inputs_key(work_package.pk)
+        work_package_inputs = inputs[work_package.pk]
+        if not force and checked.get(key) == work_package_inputs:
+            continue
+        if not work_package.is_classification_ready:
+            not_ready[key] = work_package_inputs
+            continue
+
+        work_package.tier = work_package_inputs.consensus.tier
+        work_package.save()
+        work_package_classified.send(sender=WorkPackage, work_package=work_package)
+        classified.append(work_package)
+    cache.set_many(not_ready)
+    cache.delete_many([inputs_key(work_package.pk) for work_package in classified])
+    return classified
+
+
+def calculate_tier(work_package, force=False):
+    """Calculate the tier of a work package, returning whether it was assigned one"""
+    return bool(calculate_tiers([work_package], force=force))
+
+
+def tier_inputs_changed(work_package):
+    """
+    Recalculate the tier of a work package after its classifications, datasets or approvals
+    change
+
+    Only work packages whose classification has been closed without reaching a tier are
+    recalculated; the others are calculated when their classification is closed.
+    """
+    if work_package.status == WorkPackageStatus.CLASSIFIED.value and not work_package.has_tier:
+        calculate_tier(work_package)
+
+
+def classification_deleted(sender, instance, **kwargs):
+    work_package = WorkPackage.objects.filter(
+        pk=instance.work_package_id, status=WorkPackageStatus.CLASSIFIED.value, tier__isnull=True
+    ).first()
+    if work_package:
+        calculate_tier(work_package)
+
+
+def get_unclassified_work_packages():
+    """Work packages whose classification is closed but which have no tier"""
+    return WorkPackage.objects.filter(
+        status=WorkPackageStatus.CLASSIFIED.value,
+        tier__isnull=True,
+        classifications__isnull=False,
+    ).distinct()
+
+
+def recalculate_chunk(work_package_ids):
+    """
+    Recalculate the tiers of a chunk of work packages in a single transaction
+
+    Returns the number of work packages that were assigned a tier.
+    """
+    with transaction.atomic():
+        work_packages = WorkPackage.objects.filter(pk__in=work_package_ids).select_related(
+            "project"
+        )
+        return len(calculate_tiers(work_packages, force=True))
+
+
+def recalculate_all_tiers(chunk_size=100, workers=1):
+    """
+    Recalculate the tier of every work package whose classification is closed without a tier
+
+    Work packages are recalculated in chunks, each in its own transaction, so an interrupted run
+    can simply be started again. With more than one worker the chunks are shared between a pool
+    of processes. Yields the number of work packages assigned a tier by each chunk.
+    """
+    ids = list(get_unclassified_work_packages().order_by("pk").values_list("pk", flat=True))
+    yield from map_chunks(recalculate_chunk, ids, chunk_size, workers)
@@ -12,6 +12,16 @@ urlpatterns = [
     path("<slug:uuid>", views.ProjectDetail.as_view(), name="detail"),
     path("<slug:uuid>/edit", views.ProjectEdit.as_view(), name="edit"),
     path("<slug:uuid>/history", views.ProjectHistory.as_view(), name="history"),
+    path(
+        "<slug:uuid>/history/<int:event_id>",
+        views.ProjectHistoryEvent.as_view(),
+        name="history_event",
+    ),
+    path(
+        "<slug:uuid>/history/export.<slug:format>",
+        views.ProjectHistoryExport.as_view(),
+        name="history_export",
+    ),
     path("<slug:uuid>/archive", views.ProjectArchive.as_view(), name="archive"),
     path(
         "<slug:uuid>/participants/edit",
@@ -79,6 +89,11 @@ urlpatterns = [
         views.WorkPackageClassifyData.as_view(),
         name="classify_data",
     ),
+    path(
+        "<slug:project__uuid>/work_packages/<slug:uuid>/classify_all",
+        views.WorkPackageClassifyAll.as_view(),
+        name="classify_all",
+    ),
     path(
         "<slug:project__uuid>/work_packages/<slug:uuid>/classify_results",
         views.WorkPackageClassifyResults.as_view(),
@@ -0,0 +1,103 @@
+from haven.data.tiers import Tier
+from haven.projects.models import (
+    ProjectDataset,
+    WorkPackageParticipantApproval,
+)
+from haven.projects.roles import ProjectRole
+
+
+class WorkPackageDetailData:
+    """
+    Everything the work package detail page shows, loaded in a fixed number of queries
+
+    The participants, datasets, approvals and opinions of the work package are each fetched once
+    with the related objects the tables display, and the approval status of every participant is
+    worked out from them in Python. The results match `WorkPackage.get_participants_with_approval`,
+    `WorkPackage.show_approve_participants` and `WorkPackage.has_user_classified`, which make
+    further queries for every dataset and participant.
+    """
+
+    def __init__(self, work_package, user):
+        self.work_package = work_package
+        self.user = user
+        project = work_package.project
+
+        self.participant = user.get_participant(project)
+        self.permissions = user.project_permissions(project, participant=self.participant)
+
+        self.datasets = list(work_package.work_package_datasets.select_related("dataset"))
+        self.dataset_ids = {wpd.dataset_id for wpd in self.datasets}
+
+        self.participants = list(
+            work_package.work_package_participants.select_related("participant__user")
+        )
+        # Low-tier work packages don't require anyone to be approved
+        self.low_tier = work_package.has_tier and work_package.tier <= Tier.TWO
+        self.approvals = {wpp.pk: set() for wpp in self.participants}
+        if not self.low_tier and self.dataset_ids:
+            approvals = WorkPackageParticipantApproval.objects.filter(
+                work_package_participant__work_package=work_package
+            ).values_list("work_package_participant_id", "dataset_id")
+            for work_package_participant_id, dataset_id in approvals:
+                self.approvals[work_package_participant_id].add(dataset_id)
+
+        self.can_approve = bool(self.participant and self.permissions.can_approve_participants)
+        self.approver_dataset_ids = set()
+        if self.can_approve and not self.low_tier and self.dataset_ids:
+            self.approver_dataset_ids = set(
+                ProjectDataset.objects.filter(
+                    project=project, representative=user, dataset_id__in=self.dataset_ids
+                ).values_list("dataset_id", flat=True)
+            )
+        self._annotate_approvals()
+
+        classifications = work_package.classifications.select_related("created_by")
+        if work_package.has_tier:
+            classifications = classifications.prefetch_related("questions")
+        self.classifications = list(classifications)
+
+        self.policies = work_package.get_policies()
+
+    def get_participants_to_approve(self, dataset_ids):
+        """
+        Find the work package participants not yet approved for at least one of `dataset_ids`
+
+        Returns a set of WorkPackageParticipant primary keys
+        """
+        if self.low_tier or not dataset_ids:
+            return set()
+        non_approved_roles = ProjectRole.non_approved_roles()
+        return {
+            wpp.pk
+            for wpp in self.participants
+            if wpp.participant.role in non_approved_roles
+            and not dataset_ids <= self.approvals[wpp.pk]
+        }
+
+    def _approved(self, wpp, participants_to_approve):
+        if self.low_tier:
+            return True
+        if wpp.participant.role in ProjectRole.approved_roles():
+            return True
+        if wpp.pk in participants_to_approve:
+            return False
+        return bool(self.dataset_ids)
+
+    def _annotate_approvals(self):
+        """Set `approved` (and `approved_by_you` for approvers) on each work package participant"""
+        to_approve = self.get_participants_to_approve(self.dataset_ids)
+        to_approve_by_user = self.get_participants_to_approve(self.approver_dataset_ids)
+        for wpp in self.participants:
+            wpp.approved = self._approved(wpp, to_approve)
+            if self.can_approve:
+                wpp.approved_by_you = self._approved(wpp, to_approve_by_user)
+
+    @property
+    def has_classified(self):
+        return any(c.created_by_id == self.user.pk for c in self.classifications)
+
+    @property
+    def show_approve_participants(self):
+        if not self.work_package.can_approve_participants or not self.can_approve:
+            return False
+        return bool(self.get_participants_to_approve(self.approver_dataset_ids))
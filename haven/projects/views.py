@@ -1,28 +1,33 @@
+import json
 import logging
-import re
 from collections import defaultdict
 
 from braces.views import UserFormKwargsMixin
 from dal import autocomplete
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import ValidationError
 from django.db.models import F, FilteredRelation, Q
-from django.http import Http404, HttpResponseRedirect
+from django.http import (
+    Http404,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
 from django.urls import reverse
-from django.views.generic import DetailView, ListView
+from django.views.generic import DetailView, ListView, View
 from django.views.generic.base import TemplateView
 from django.views.generic.detail import SingleObjectMixin
 from django.views.generic.edit import CreateView, FormMixin, UpdateView
 from taggit.models import Tag
 
-from haven.data.models import (
-    ClassificationGuidance,
-    ClassificationQuestion,
-    Dataset,
-)
+from haven.data import question_history
+from haven.data.models import Dataset
+from haven.data.question_graph import get_question_graph
 from haven.identity.mixins import UserPermissionRequiredMixin
 from haven.identity.models import User
+from haven.identity.search import search_users
 from haven.projects.forms import (
     DatasetsForWorkPackageInlineFormSet,
     ParticipantForm,
@@ -49,14 +54,25 @@ from haven.projects.forms import (
     WorkPackageDeleteForm,
     WorkPackageEditForm,
 )
+from haven.projects.history import (
+    HISTORY_EXPORT_FORMATS,
+    get_history_page,
+    iter_history,
+)
 from haven.projects.models import (
+    ClassificationDraft,
     ClassificationOpinion,
     Participant,
+    ProgrammeSummary,
     Project,
     ProjectDataset,
     WorkPackage,
     WorkPackageParticipant,
 )
+from haven.projects.question_bundle import (
+    get_guidance_closures,
+    get_question_bundle,
+)
 from haven.projects.roles import ProjectRole
 from haven.projects.tables import (
     ClassificationOpinionQuestionTable,
@@ -69,6 +85,7 @@ from haven.projects.tables import (
     WorkPackageTable,
     bleach_no_links,
 )
+from haven.projects.view_models import WorkPackageDetailData
 
 
 class ProjectMixin:
@@ -167,11 +184,11 @@ class SingleWorkPackageMixin(WorkPackageMixin, SingleObjectMixin):
 
 class ProgrammeList(LoginRequiredMixin, ListView):
     context_object_name = "programmes"
-    model = Tag
+    model = ProgrammeSummary
     template_name = "projects/programme_list.html"
 
     def get_queryset(self):
-        return Project.programmes.most_common()
+        return ProgrammeSummary.objects.select_related("tag").order_by("-active_projects", "tag")
 
 
 class ProjectCreate(
@@ -210,6 +227,7 @@ class ProjectCreate(
 class ProjectList(LoginRequiredMixin, ListView):
     context_object_name = "projects"
     model = Project
+    paginate_by = 25
 
     def dispatch(self, *args, **kwargs):
         programme = self.request.GET.get("programme")
@@ -219,10 +237,18 @@ class ProjectList(LoginRequiredMixin, ListView):
                 self.programme = Tag.objects.get(slug=programme)
             except Tag.DoesNotExist:
                 raise Http404("No programme found matching the query")
+        self.role = self.request.GET.get("role")
+        if self.role and not ProjectRole.is_valid_assignable_participant_role(self.role):
+            raise Http404("No role found matching the query")
         return super().dispatch(*args, **kwargs)
 
     def get_context_data(self, **kwargs):
         kwargs["programme"] = self.programme
+        kwargs["role"] = self.role
+        kwargs["role_choices"] = ProjectRole.choices()
+        # Filters to keep when moving between pages
+        kwargs["filter_query"] = self.request.GET.copy()
+        kwargs["filter_query"].pop("page", None)
         return super().get_context_data(**kwargs)
 
     def get_queryset(self):
@@ -230,7 +256,7 @@ class ProjectList(LoginRequiredMixin, ListView):
         if self.programme:
             qs = qs.filter(programmes__in=[self.programme])
         # Store the user's project role on each participant
-        return (
+        qs = (
             qs.get_visible_projects(self.request.user)
             .annotate(
                 you=FilteredRelation(
@@ -239,7 +265,11 @@ class ProjectList(LoginRequiredMixin, ListView):
             )
             .annotate(your_role=F("you__role"))
             .annotate(add_time=F("you__created_at"))
-            .order_by(F("add_time").desc(nulls_last=True), "-created_at")
+        )
+        if self.role:
+            qs = qs.filter(your_role=self.role)
+        return qs.prefetch_related("programmes").order_by(
+            F("add_time").desc(nulls_last=True), "-created_at", "-pk"
         )
 
 
@@ -247,14 +277,18 @@ class ProjectDetail(LoginRequiredMixin, SingleProjectMixin, DetailView):
     def get_context_data(self, **kwargs):
         project = self.get_object()
         kwargs["participant"] = self.request.user.get_participant(project)
-        participants = project.participants.all()
+        # Load everything the tables display up front. Rows fetched through the project's related
+        # managers already have `project` set, so building their URLs doesn't reload it
+        participants = project.participants.select_related("user", "created_by")
         kwargs["participants_table"] = ParticipantTable(
             participants,
             show_edit_links=self.get_project_permissions().can_edit_participants,
         )
-        work_packages = project.work_packages.order_by("created_at").all()
+        work_packages = project.work_packages.order_by("created_at")
         kwargs["work_packages_table"] = WorkPackageTable(work_packages)
-        datasets = project.project_datasets.order_by("created_at").all()
+        datasets = project.project_datasets.select_related("dataset", "representative").order_by(
+            "created_at"
+        )
         kwargs["datasets_table"] = ProjectDatasetTable(datasets)
         return super().get_context_data(**kwargs)
 
@@ -303,18 +337,84 @@ class ProjectArchive(
         return reverse("projects:list")
 
 
-class ProjectHistory(LoginRequiredMixin, UserPassesTestMixin, SingleProjectMixin, DetailView):
+class ProjectHistoryMixin(SingleProjectMixin):
+    def get_histories(self):
+        """Return querysets of the project's live and archived audit events"""
+        project = self.get_project()
+        return [project.get_audit_history(), project.get_archived_audit_history()]
+
+
+class ProjectHistory(LoginRequiredMixin, UserPassesTestMixin, ProjectHistoryMixin, DetailView):
     template_name = "projects/project_history.html"
+    paginate_by = 50
 
     def test_func(self):
         return self.get_project_permissions().can_view_project_history
 
+    def get_cursor(self, name):
+        try:
+            return int(self.request.GET[name])
+        except (KeyError, ValueError):
+            return None
+
     def get_context_data(self, **kwargs):
-        history = self.get_object().get_audit_history()
-        kwargs["history_table"] = HistoryTable(history)
+        live, archived = self.get_histories()
+        histories = [
+            live.select_related("user").defer("object_json_repr", "changed_fields"),
+            archived.select_related("user").defer("payload"),
+        ]
+        events, newer, older = get_history_page(
+            histories,
+            self.paginate_by,
+            after=self.get_cursor("after"),
+            before=self.get_cursor("before"),
+        )
+        kwargs["history_table"] = HistoryTable(events, project=self.object)
+        kwargs["newer_cursor"] = newer
+        kwargs["older_cursor"] = older
+        kwargs["export_formats"] = HISTORY_EXPORT_FORMATS.keys()
         return super().get_context_data(**kwargs)
 
 
+class ProjectHistoryEvent(LoginRequiredMixin, UserPassesTestMixin, ProjectHistoryMixin, View):
+    """Returns the JSON details of a single event in a project's history"""
+
+    def test_func(self):
+        return self.get_project_permissions().can_view_project_history
+
+    def get(self, request, *args, **kwargs):
+        for history in self.get_histories():
+            event = history.filter(pk=self.kwargs["event_id"]).first()
+            if event is not None:
+                return JsonResponse(
+                    {
+                        "object_json_repr": event.object_json_repr,
+                        "changed_fields": event.changed_fields,
+                    }
+                )
+        raise Http404("No event found matching the query")
+
+
+class ProjectHistoryExport(LoginRequiredMixin, UserPassesTestMixin, ProjectHistoryMixin, View):
+    """Streams a project's full history as CSV or JSON lines"""
+
+    chunk_size = 500
+
+    def test_func(self):
+        return self.get_project_permissions().can_view_project_history
+
+    def get(self, request, *args, **kwargs):
+        try:
+            content_type, export = HISTORY_EXPORT_FORMATS[self.kwargs["format"]]
+        except KeyError:
+            raise Http404("Unknown export format")
+        events = iter_history(self.get_histories(), self.chunk_size)
+        response = StreamingHttpResponse(export(events), content_type=content_type)
+        filename = f"{self.get_project().uuid}-history.{self.kwargs['format']}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
 class ProjectAddUser(
     LoginRequiredMixin,
     UserPassesTestMixin,
@@ -781,34 +881,44 @@ class WorkPackageDelete(
 class WorkPackageDetail(LoginRequiredMixin, SingleWorkPackageMixin, DetailView):
     template_name = "projects/work_package_detail.html"
 
+    def get_work_package(self):
+        # Reuse the work package `get` loaded rather than fetching it again for the context
+        if getattr(self, "object", None) is not None:
+            return self.object
+        return super().get_work_package()
+
+    def get_detail_data(self):
+        if getattr(self, "_detail_data", None) is None:
+            self._detail_data = WorkPackageDetailData(self.get_object(), self.request.user)
+        return self._detail_data
+
+    def get_project_permissions(self):
+        return self.get_detail_data().permissions
+
     def get_context_data(self, **kwargs):
-        work_package = self.get_object()
-        kwargs["participant"] = self.request.user.get_participant(work_package.project)
+        data = self.get_detail_data()
+        work_package = data.work_package
+        kwargs["participant"] = data.participant
         context = SingleWorkPackageMixin.get_context_data(self, **kwargs)
 
-        datasets = work_package.work_package_datasets.all()
-        context["datasets_table"] = WorkPackageDatasetTable(datasets)
-
-        participants = work_package.get_participants_with_approval(self.request.user)
+        context["datasets_table"] = WorkPackageDatasetTable(data.datasets)
         context["participants_table"] = WorkPackageParticipantTable(
-            participants, work_package=work_package, user=self.request.user
+            data.participants,
+            work_package=work_package,
+            user=self.request.user,
+            permissions=data.permissions,
         )
 
         context["can_classify"] = work_package.can_classify_data
-        context["has_classified"] = work_package.has_user_classified(self.request.user)
+        context["has_classified"] = data.has_classified
 
         if work_package.has_tier:
             # Don't show these until we have a tier, to avoid influencing anybody that
             # hasn't classified yet
-            policies = work_package.get_policies()
-            context["policy_table"] = PolicyTable(policies)
+            context["policy_table"] = PolicyTable(data.policies)
+            context["question_table"] = ClassificationOpinionQuestionTable(data.classifications)
 
-            classifications = work_package.classifications.all()
-            context["question_table"] = ClassificationOpinionQuestionTable(classifications)
-
-        context["show_approve_participants"] = work_package.show_approve_participants(
-            self.request.user
-        )
+        context["show_approve_participants"] = data.show_approve_participants
         return context
 
 
@@ -1136,10 +1246,10 @@ class WorkPackageClassifyData(
         answer = None
         if "submit_yes" in self.request.POST:
             self.store_answer(self.question, True)
-            answer = self.question.answer_yes()
+            answer = self.graph.next(self.question, True)
         elif "submit_no" in self.request.POST:
             self.store_answer(self.question, False)
-            answer = self.question.answer_no()
+            answer = self.graph.next(self.question, False)
 
         if answer is not None:
             if isinstance(answer, int):
@@ -1184,10 +1294,8 @@ class WorkPackageClassifyData(
         """
         self.work_package = self.get_work_package()
         self.project = self.work_package.project
-        self.question_set = self.project.question_set.name
-        self.starting_question = ClassificationQuestion.objects.get_starting_question(
-            question_set=self.question_set
-        )
+        self.graph = get_question_graph(self.project.question_set_id)
+        self.starting_question = self.graph.start
         self.previous_question = None
         if "question_pk" not in self.kwargs:
             if self.start_modification:
@@ -1198,7 +1306,10 @@ class WorkPackageClassifyData(
                 self.clear_answers()
             return self.redirect_to_question(self.starting_question)
         else:
-            self.question = ClassificationQuestion.objects.get(pk=self.kwargs["question_pk"])
+            try:
+                self.question = self.graph.get(self.kwargs["question_pk"])
+            except KeyError:
+                raise Http404("No question found matching the query")
             if self.start_modification:
                 response = self.store_previous_answers(self.question)
                 if response:
@@ -1209,32 +1320,20 @@ class WorkPackageClassifyData(
 
     def save_results(self, expected_tier):
         """
-        Get all the answers from the session, and save the classification to the database
+        Get all the answers from the user's draft, and save the classification to the database
         """
-        questions = []
-        question = self.starting_question
-        tier = None
-        # Although we try to make sure the session only contains relevant answers, e.g. calling
+        # Although we try to make sure the draft only contains relevant answers, e.g. calling
         # clear_answers if the user has went back and changed answers, it's possible something
-        # invalid might be in there. Therefore, we don't just copy the session, we follow the
-        # chain from the starting question and only store what matches
-        while True:
-            answer = self.get_answer(question)
-            if answer is None:
-                logging.error(f"No response found in session for question {question.name}")
-                message = "An error occurred storing the results of your classification."
-                return self.redirect_to_question(None, message, message_level=messages.ERROR)
-
-            questions.append((question, answer))
-            if answer:
-                question = question.answer_yes()
-            else:
-                question = question.answer_no()
-
-            if isinstance(question, int):
-                tier = question
-                break
+        # invalid might be in there. Therefore, we follow the chain from the starting question
+        # and only store what matches
+        questions, question = self.get_draft().walk(self.graph)
+        if not isinstance(question, int):
+            name = getattr(question, "name", question)
+            logging.error(f"No response found in draft for question {name}")
+            message = "An error occurred storing the results of your classification."
+            return self.redirect_to_question(None, message, message_level=messages.ERROR)
 
+        tier = question
         if tier != expected_tier:
             logging.error(f"Unexpected tier storing result: expected {expected_tier}, was {tier}")
             message = "An error occurred storing the results of your classification."
@@ -1254,31 +1353,11 @@ class WorkPackageClassifyData(
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Use a regex to identify links to guidance
-        # Some form of HTML parser might be better, but we're looking for a very limited
-        # pattern so is hopefully unnecessary
-        pattern = re.compile('href="#([^"]+)"')
-        all_guidance = {g.name: g for g in ClassificationGuidance.objects.all()}
-
-        explanation = None
-        guidance = []
-        matches = [m for m in pattern.finditer(self.question.question)]
-
-        explanation = all_guidance.get(self.question.name)
-        if explanation:
-            matches.extend([m for m in pattern.finditer(explanation.guidance)])
-
-        while matches:
-            match = matches.pop(0)
-            name = match.group(1)
-            g = all_guidance.get(name)
-            if g and g not in guidance:
-                guidance.append(g)
-                matches.extend([m for m in pattern.finditer(g.guidance)])
+        explanation, guidance = get_guidance_closures(self.graph)[self.question.id]
 
         context["question"] = self.question
-        context["answer_yes"] = self.format_answer(self.question.answer_yes())
-        context["answer_no"] = self.format_answer(self.question.answer_no())
+        context["answer_yes"] = self.format_answer(self.graph.next(self.question, True))
+        context["answer_no"] = self.format_answer(self.graph.next(self.question, False))
         context["starting_question"] = self.starting_question
         context["question_number"] = self.get_question_number()
         if self.previous_question:
@@ -1305,88 +1384,78 @@ class WorkPackageClassifyData(
         url = reverse("projects:classify_results", args=args)
         return HttpResponseRedirect(url)
 
-    @property
-    def session_key(self):
-        return f"classification_{self.object.pk}"
+    def get_draft(self):
+        """
+        Return the user's answers so far, as a ClassificationDraft
 
-    @property
-    def session_modification_key(self):
-        return f"classification_modification_{self.object.pk}"
+        The draft is only saved to the database once the user has answered a question.
+        """
+        if not hasattr(self, "_draft"):
+            self._draft = ClassificationDraft.objects.filter(
+                work_package=self.object, user=self.request.user
+            ).first() or ClassificationDraft(work_package=self.object, user=self.request.user)
+        return self._draft
 
     def store_answer(self, question, answer):
         """
-        Store the answer to the given question in the session
+        Store the answer to the given question in the user's draft
         """
-        existing = self.request.session.get(self.session_key)
-        if not existing:
-            existing = []
-        # Cannot append to existing object in session, will not serialize correctly
-        self.request.session[self.session_key] = existing + [[question.name, answer]]
+        draft = self.get_draft()
+        draft.answers[str(question.id)] = answer
+        draft.save()
 
     def get_previous_question(self):
         """
-        Return the ClassificationQuestion representing the last question the user answered
+        Return the QuestionNode representing the last question the user answered
         """
-        answers = self.request.session.get(self.session_key)
-        if answers:
-            name = answers[-1][0]
-            if name:
-                return ClassificationQuestion.objects.get(name=name)
+        path, _ = self.get_draft().walk(self.graph, until=self.question)
+        if path:
+            return path[-1][0]
         return None
 
     def is_modification(self):
         """
         Determine if this is during a modification
         """
-        return self.request.session.get(self.session_modification_key, False)
+        return self.get_draft().is_modification
 
     def get_answer(self, question):
         """
-        Retrieve the answer for the given question from the session
+        Retrieve the answer for the given question from the user's draft
         """
-        answers = self.request.session.get(self.session_key)
-        if answers:
-            for answer in answers:
-                if answer[0] == question.name:
-                    return answer[1]
-        return None
+        return self.get_draft().get_answer(question.id)
 
     def get_question_number(self):
-        answers = self.request.session.get(self.session_key)
-        number = 1
-        if answers:
-            number += len(answers)
-        return number
+        path, _ = self.get_draft().walk(self.graph, until=self.question)
+        return len(path) + 1
 
     def clear_answers(self, after=None):
         """
-        Remove answers from the session
+        Remove answers from the user's draft
 
-        If `after` is None (the default), all answers will be removed.
+        If `after` is None (the default), the draft is removed altogether.
 
-        Otherwise `after` should be a ClassificationQuestion instance. Answers for any
-        questions before (but not including) that question will remain in the session, but
+        Otherwise `after` should be a QuestionNode. Answers for any
+        questions before (but not including) that question will remain in the draft, but
         anything else is removed.
         """
+        draft = self.get_draft()
         if not after:
-            self.request.session.pop(self.session_key, None)
-            self.request.session.pop(self.session_modification_key, None)
+            if draft.pk:
+                draft.delete()
+            del self._draft
             return
 
-        answers = self.request.session.get(self.session_key)
-        if answers:
-            upto = None
-            for i, answer in enumerate(answers):
-                if answer[0] == after.name:
-                    upto = i
-                    break
-
-            if upto is not None:
-                self.request.session[self.session_key] = answers[:upto]
+        path, _ = draft.walk(self.graph, until=after)
+        answers = {str(question.id): answer for question, answer in path}
+        if answers != draft.answers:
+            draft.answers = answers
+            if draft.pk:
+                draft.save()
 
     def store_previous_answers(self, upto):
         """
-        Retrieve the user's previous classification from the database, and store it in the session
+        Retrieve the user's previous classification from the database, and store it in the draft
 
         upto is the question to start the modification process from
 
@@ -1395,32 +1464,32 @@ class WorkPackageClassifyData(
         the user may be redirected to modify an earlier question than the one they actually chose
         to.
         """
-        self.request.session[self.session_key] = []
-        self.request.session[self.session_modification_key] = True
+        draft = self.get_draft()
+        draft.answers = {}
+        draft.is_modification = True
 
         classification = self.object.classification_for(self.request.user).first()
         answered_questions = {}
         if classification:
             for q in classification.questions.all():
-                key = (q.question.id, q.question_version)
+                key = (q.question_id, q.question_version)
                 answered_questions[key] = q.answer
 
         q = self.starting_question
         while q and not isinstance(q, int) and q != upto:
             try:
-                key = (q.id, q.history.latest().history_id)
+                key = (q.id, question_history.get_latest_version(q.id))
                 answer = answered_questions[key]
-                self.store_answer(q, answer)
-                if answer:
-                    q = q.answer_yes()
-                else:
-                    q = q.answer_no()
             except KeyError:
+                draft.save()
                 message = (
                     "Some recorded answers could not be retrieved. Please begin the "
                     "classification process from the question below."
                 )
                 return self.redirect_to_question(q, message)
+            draft.answers[str(q.id)] = answer
+            q = self.graph.next(q, answer)
+        draft.save()
         if q != upto:
             message = (
                 "Recorded answers could not be retrieved. Please begin the classification "
@@ -1429,6 +1498,69 @@ class WorkPackageClassifyData(
             return self.redirect_to_question(self.starting_question, message)
 
 
+class WorkPackageClassifyAll(WorkPackageClassifyData):
+    """
+    Classify a work package by answering every question on a single page
+
+    The page walks the question set in the browser, from a bundle of its questions, and submits
+    the whole path of answers in one request. The path is checked against the question set before
+    the classification is saved. `WorkPackageClassifyData` remains for answering one question at
+    a time.
+    """
+
+    template_name = "projects/work_package_classify_all.html"
+
+    def get(self, *args, **kwargs):
+        response = self.check_already_classified()
+        if response:
+            return response
+
+        self.load_graph()
+        context = self.get_context_data()
+        return self.render_to_response(context)
+
+    def post(self, *args, **kwargs):
+        response = self.check_already_classified()
+        if response:
+            return response
+
+        self.load_graph()
+        try:
+            tier, questions = self.graph.validate_path(self.get_submitted_answers())
+        except ValidationError as e:
+            logging.warning(f"Invalid classification submitted: {e.messages}")
+            message = "Your answers could not be saved. Please answer the questions again."
+            messages.add_message(self.request, messages.ERROR, message)
+            context = self.get_context_data()
+            return self.render_to_response(context, status=400)
+
+        if self.start_modification or self.is_modification():
+            self.object.classification_for(self.request.user).delete()
+        self.object.classify_as(tier, self.request.user, questions)
+        self.clear_answers()
+        return self.redirect_to_results()
+
+    def load_graph(self):
+        self.work_package = self.get_work_package()
+        self.project = self.work_package.project
+        self.graph = get_question_graph(self.project.question_set_id)
+
+    def get_submitted_answers(self):
+        """
+        Return the submitted path of answers, as a list of (question id, answer) pairs
+        """
+        try:
+            answers = json.loads(self.request.POST.get("answers", ""))
+            return [(question_id, answer) for question_id, answer in answers]
+        except (TypeError, ValueError):
+            raise ValidationError("Answers must be a list of [question id, answer] pairs")
+
+    def get_context_data(self, **kwargs):
+        context = super(WorkPackageClassifyData, self).get_context_data(**kwargs)
+        context["bundle"] = get_question_bundle(self.graph)
+        return context
+
+
 class WorkPackageClassifyResults(
     LoginRequiredMixin, UserPassesTestMixin, SingleWorkPackageMixin, DetailView
 ):
@@ -1551,17 +1683,7 @@ class AutocompleteNewParticipant(autocomplete.Select2QuerySetView):
     """
 
     def get_queryset(self):
-
-        qs = self.get_visible_users()
-        if self.q:
-            for term in self.q.split():
-                qs = qs.filter(
-                    Q(first_name__icontains=term)
-                    | Q(last_name__icontains=term)
-                    | Q(username__icontains=term)
-                )
-
-        return qs
+        return search_users(self.get_visible_users(), self.q)
 
     def get_visible_users(self):
         # Filter results depending on user role permissions
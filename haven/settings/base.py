@@ -28,6 +28,12 @@ BASE_URL = env.str("BASE_URL", default="http://localhost:8000/")
 
 DEFAULT_QUESTION_SET_NAME = env.str("DEFAULT_QUESTION_SET_NAME", default="turing")
 
+# CACHES
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/ref/settings/#caches
+# Defaults to a per-process local memory cache, set CACHE_URL to share a cache between processes
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # DATABASES
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
@@ -251,6 +257,14 @@ PHONENUMBER_DEFAULT_REGION = "GB"
 BLEACH_ALLOWED_TAGS = ["a", "em", "li", "ol", "p", "strong", "ul"]
 DJANGO_EASY_AUDIT_WATCH_AUTH_EVENTS = False
 DJANGO_EASY_AUDIT_WATCH_REQUEST_EVENTS = False
+# Bookkeeping for the audit log itself shouldn't be audited, nor should classification answers
+# before they are submitted
+DJANGO_EASY_AUDIT_UNREGISTERED_CLASSES_EXTRA = [
+    "projects.ProjectAuditEvent",
+    "projects.ArchivedAuditEvent",
+    "projects.ArchivedAuditEvent_projects",
+    "projects.ClassificationDraft",
+]
 
 OAUTH2_PROVIDER = {
     "SCOPES": {"read": "Permission to read your projects, work packages and datasets"},
@@ -261,9 +275,7 @@ OAUTH2_PROVIDER = {
 }
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "oauth2_provider.contrib.rest_framework.OAuth2Authentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("haven.api.authentication.CachedOAuth2Authentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 100,
@@ -307,3 +319,34 @@ TIER_4_EXPIRY_SECONDS = env.int(
     "TIER_4_EXPIRY_SECONDS",
     default=24 * 60 * 60,  # 1 day
 )
+
+# Webhook callbacks to OAuth applications, sent by `manage.py dispatch_webhooks`
+# Maximum number of events sent in a single callback request
+WEBHOOK_BATCH_SIZE = env.int("WEBHOOK_BATCH_SIZE", default=50)
+# Number of attempts before a callback is marked as failed
+WEBHOOK_MAX_ATTEMPTS = env.int("WEBHOOK_MAX_ATTEMPTS", default=8)
+# Delay before the first retry, doubled for each subsequent retry
+WEBHOOK_RETRY_BASE_SECONDS = env.int("WEBHOOK_RETRY_BASE_SECONDS", default=30)
+WEBHOOK_TIMEOUT_SECONDS = env.int("WEBHOOK_TIMEOUT_SECONDS", default=10)
+WEBHOOK_POLL_INTERVAL_SECONDS = env.int("WEBHOOK_POLL_INTERVAL_SECONDS", default=5)
+
+# Validated API access tokens are cached so that authenticating doesn't need any database queries
+API_TOKEN_CACHE = env.str("API_TOKEN_CACHE", default="default")
+# Upper limit on how long a token is cached for. Revocations are applied immediately in the current
+# process (and in all processes if the cache is shared), otherwise within this time
+API_TOKEN_CACHE_SECONDS = env.int("API_TOKEN_CACHE_SECONDS", default=300)
+
+# Rendered responses from the read only API views are cached per user and application tier, and
+# invalidated whenever the data they are built from changes
+API_RESPONSE_CACHE = env.str("API_RESPONSE_CACHE", default="default")
+# Upper limit on how long a response is cached for. This also bounds how stale the dataset
+# `expires_at` value can be, which only ever errs on the side of an earlier expiry
+API_RESPONSE_CACHE_SECONDS = env.int("API_RESPONSE_CACHE_SECONDS", default=300)
+# How long clients may keep the policies of a work package's tier without asking again. These only
+# change through migrations, and clients can revalidate them cheaply with their ETag
+API_POLICY_CACHE_SECONDS = env.int("API_POLICY_CACHE_SECONDS", default=86400)
+
+# Audit log entries older than this are moved to the archive by the `archive_audit_log` command
+AUDIT_ARCHIVE_AFTER_DAYS = env.int("AUDIT_ARCHIVE_AFTER_DAYS", default=365)
+# Number of entries archived in each transaction
+AUDIT_ARCHIVE_BATCH_SIZE = env.int("AUDIT_ARCHIVE_BATCH_SIZE", default=1000)
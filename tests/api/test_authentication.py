@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from haven.api.authentication import (
+    CachedOAuth2Authentication,
+    get_token_cache,
+    token_cache_key,
+)
+from haven.api.utils import get_maximum_tier_filter
+
+
+def authenticate(token):
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+    return request, CachedOAuth2Authentication().authenticate(request)
+
+
+@pytest.mark.django_db
+class TestCachedOAuth2Authentication:
+    def test_authenticate_caches_token(
+        self, project_participant, access_token, application_profile, django_assert_num_queries
+    ):
+        token = access_token(project_participant)
+
+        request, (user, auth) = authenticate(token.token)
+        assert user == project_participant
+        assert auth == token
+        assert request.application_maximum_tier == application_profile.maximum_tier
+
+        with django_assert_num_queries(0):
+            request, (user, auth) = authenticate(token.token)
+            assert get_maximum_tier_filter(request, "tier__lte") == {
+                "tier__lte": application_profile.maximum_tier
+            }
+        assert user == project_participant
+        assert auth.application_id == token.application_id
+        assert auth.scope == "read"
+
+    def test_cache_key_does_not_contain_token(self, project_participant, access_token):
+        token = access_token(project_participant)
+        authenticate(token.token)
+
+        assert get_token_cache().get(token_cache_key(token.token))
+        assert token.token not in token_cache_key(token.token)
+
+    def test_no_application_profile(self, project_participant, access_token):
+        token = access_token(project_participant)
+
+        request, _ = authenticate(token.token)
+
+        assert request.application_maximum_tier is None
+        assert get_maximum_tier_filter(request) == {}
+
+    def test_invalid_token(self):
+        _, result = authenticate("not_a_token")
+        assert result is None
+
+    def test_revoked_token_is_rejected(self, project_participant, access_token):
+        token = access_token(project_participant)
+        authenticate(token.token)
+
+        token.revoke()
+
+        _, result = authenticate(token.token)
+        assert result is None
+
+    def test_expired_token_is_rejected(self, project_participant, access_token):
+        token = access_token(project_participant)
+        authenticate(token.token)
+
+        token.expires = timezone.now() - timedelta(seconds=1)
+        token.save()
+
+        _, result = authenticate(token.token)
+        assert result is None
+
+    def test_cache_expires_with_token(self, project_participant, access_token):
+        token = access_token(project_participant)
+        token.expires = timezone.now() + timedelta(seconds=60)
+        token.save()
+
+        authenticate(token.token)
+
+        cache = get_token_cache()
+        expiry = cache._expire_info[cache.make_key(token_cache_key(token.token))]
+        # Allow a little leeway for the time taken between calculating and setting the timeout
+        assert expiry == pytest.approx(token.expires.timestamp(), abs=1)
+
+    def test_profile_change_invalidates_cache(
+        self, project_participant, access_token, application_profile
+    ):
+        token = access_token(project_participant)
+        authenticate(token.token)
+
+        application_profile.maximum_tier = 1
+        application_profile.save()
+
+        request, _ = authenticate(token.token)
+        assert request.application_maximum_tier == 1
+
+    def test_api_view_uses_cached_token(
+        self, as_project_participant_api, classified_work_package, project_participant
+    ):
+        url = reverse("api:work_package_list")
+        response = as_project_participant_api.get(url)
+        assert response.status_code == 200
+
+        response = as_project_participant_api.get(url)
+        assert response.status_code == 200
+        assert response.wsgi_request.user == project_participant
@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+
+from haven.api.caching import get_response_cache_stats
+from haven.core import recipes
+from haven.projects.roles import ProjectRole
+
+
+@pytest.fixture
+def accessible_work_package(project_participant, application_profile, make_accessible_work_package):
+    return make_accessible_work_package(project_participant, tier=1)
+
+
+def results(response):
+    return response.json()["results"]
+
+
+def uuids(response):
+    return {result["uuid"] for result in results(response)}
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+    def test_repeated_request_served_from_cache(
+        self, as_project_participant_api, accessible_work_package
+    ):
+        url = reverse("api:work_package_list")
+
+        first = as_project_participant_api.get(url)
+        assert first.status_code == 200
+        assert first["X-Cache"] == "MISS"
+
+        # Authentication is cached too, so a repeated poll doesn't query the database at all (the
+        # only statements are the savepoint from `ATOMIC_REQUESTS`)
+        with CaptureQueriesContext(connection) as context:
+            second = as_project_participant_api.get(url)
+        assert all("SAVEPOINT" in query["sql"] for query in context.captured_queries)
+        assert second.status_code == 200
+        assert second["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+        assert get_response_cache_stats() == {"hits": 1, "misses": 1}
+
+    def test_cached_per_user(
+        self,
+        DRFClient,
+        as_project_participant_api,
+        accessible_work_package,
+        oauth_application,
+        standard_user,
+    ):
+        url = reverse("api:work_package_list")
+        assert uuids(as_project_participant_api.get(url)) == {str(accessible_work_package.uuid)}
+
+        AccessToken.objects.create(
+            token="other_access_token",
+            user=standard_user,
+            application=oauth_application,
+            scope="read",
+            expires=timezone.now() + timedelta(days=1),
+        )
+        DRFClient.credentials(HTTP_AUTHORIZATION="Bearer other_access_token")
+        response = DRFClient.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert results(response) == []
+
+    def test_cached_per_maximum_tier(
+        self, as_project_participant_api, accessible_work_package, application_profile
+    ):
+        url = reverse("api:work_package_list")
+        assert uuids(as_project_participant_api.get(url))
+
+        application_profile.maximum_tier = 0
+        application_profile.save()
+
+        response = as_project_participant_api.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert results(response) == []
+
+    def test_invalidated_by_membership_change(
+        self,
+        as_project_participant_api,
+        accessible_work_package,
+        project_participant,
+    ):
+        url = reverse("api:work_package_list")
+        as_project_participant_api.get(url)
+
+        participant = project_participant.get_participant(accessible_work_package.project)
+        participant.get_work_package_participant(accessible_work_package).delete()
+
+        response = as_project_participant_api.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert results(response) == []
+
+    def test_invalidated_by_new_participant(
+        self, as_project_participant_api, project_participant, classified_work_package
+    ):
+        url = reverse("api:project_list")
+        assert results(as_project_participant_api.get(url)) == []
+
+        work_package = classified_work_package(0)
+        work_package.project.add_user(
+            project_participant, ProjectRole.RESEARCHER.value, work_package.created_by
+        )
+
+        response = as_project_participant_api.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert uuids(response) == {str(work_package.project.uuid)}
+
+    def test_invalidated_by_dataset_link(
+        self,
+        as_project_participant_api,
+        accessible_work_package,
+        data_provider_representative,
+        investigator,
+    ):
+        url = reverse("api:dataset_list")
+        assert len(results(as_project_participant_api.get(url))) == 1
+
+        dataset = recipes.dataset.make()
+        accessible_work_package.project.add_dataset(
+            dataset, data_provider_representative.user, investigator.user
+        )
+        accessible_work_package.add_dataset(dataset, investigator.user)
+
+        response = as_project_participant_api.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert len(results(response)) == 2
+
+    def test_invalidated_by_tier_change(
+        self, as_project_participant_api, accessible_work_package, application_profile
+    ):
+        application_profile.maximum_tier = 1
+        application_profile.save()
+        url = reverse("api:work_package_list")
+        assert uuids(as_project_participant_api.get(url))
+
+        accessible_work_package.tier = 2
+        accessible_work_package.save()
+
+        response = as_project_participant_api.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert results(response) == []
+
+    def test_errors_not_cached(self, as_project_participant_api, classified_work_package):
+        url = reverse("api:work_package_detail", kwargs={"uuid": classified_work_package(0).uuid})
+
+        assert as_project_participant_api.get(url).status_code == 404
+        assert as_project_participant_api.get(url).status_code == 404
+        assert get_response_cache_stats() == {"hits": 0, "misses": 2}
+
+    def test_stats_command(self, as_project_participant_api, accessible_work_package, capsys):
+        url = reverse("api:project_list")
+        as_project_participant_api.get(url)
+        as_project_participant_api.get(url)
+
+        call_command("api_cache_stats", "--reset")
+
+        out = capsys.readouterr().out
+        assert "Hits: 1" in out
+        assert "Misses: 1" in out
+        assert "Hit ratio: 50.0%" in out
+        assert get_response_cache_stats() == {"hits": 0, "misses": 0}
@@ -10,6 +10,8 @@ from oauth2_provider.models import Application
 from haven.api.models import ApplicationProfile
 from haven.api.utils import WORK_PACKAGE_TIER_EXPIRY_SECONDS_MAP
 from haven.core import recipes
+from haven.projects.models import Policy, PolicyAssignment, PolicyGroup
+from haven.projects.policies import insert_initial_policies
 from haven.projects.roles import ProjectRole
 
 
@@ -1263,6 +1265,131 @@ class TestWorkPackageDetailAPIView:
         assert response.status_code == 404
 
 
+@pytest.mark.django_db
+class TestWorkPackagePoliciesAPIView:
+    @pytest.fixture(autouse=True)
+    def policies(self):
+        if not Policy.objects.exists():
+            insert_initial_policies(PolicyGroup, Policy, PolicyAssignment)
+
+    def url(self, work_package):
+        return reverse(
+            "api:project_work_package_policies",
+            kwargs={"project__uuid": work_package.project.uuid, "uuid": work_package.uuid},
+        )
+
+    def test_get_policies(
+        self,
+        settings,
+        project_participant,
+        as_project_participant_api,
+        make_accessible_work_package,
+    ):
+        """
+        Test that an API user can request the policies of an accessible work package's tier,
+        grouped by policy group, with a strong ETag and a long cache lifetime
+        """
+        work_package = make_accessible_work_package(project_participant, tier=2)
+
+        response = as_project_participant_api.get(self.url(work_package))
+
+        assert response.status_code == 200
+        result = json.loads(response.content.decode())
+        assert result["tier"] == 2
+        expected = [
+            (a.policy.group.name, a.policy.name, a.policy.description)
+            for a in PolicyAssignment.objects.filter(tier=2).order_by("pk")
+        ]
+        assert [
+            (group["name"], policy["name"], policy["description"])
+            for group in result["groups"]
+            for policy in group["policies"]
+        ] == expected
+        assert result["groups"][0]["description"] == "Tier"
+        assert response["ETag"].startswith('"')
+        assert f"max-age={settings.API_POLICY_CACHE_SECONDS}" in response["Cache-Control"]
+        assert "private" in response["Cache-Control"]
+
+    def test_etag_per_tier(
+        self,
+        project_participant,
+        as_project_participant_api,
+        make_accessible_work_package,
+    ):
+        """Test that work packages of the same tier share an ETag, which differs between tiers"""
+        work_packages = [
+            make_accessible_work_package(project_participant, tier=tier) for tier in [0, 0, 1]
+        ]
+
+        etags = [
+            as_project_participant_api.get(self.url(work_package))["ETag"]
+            for work_package in work_packages
+        ]
+
+        assert etags[0] == etags[1]
+        assert etags[0] != etags[2]
+
+    def test_not_modified(
+        self,
+        project_participant,
+        as_project_participant_api,
+        make_accessible_work_package,
+    ):
+        """Test that a request with a matching `If-None-Match` header gets an empty response"""
+        work_package = make_accessible_work_package(project_participant)
+        etag = as_project_participant_api.get(self.url(work_package))["ETag"]
+
+        response = as_project_participant_api.get(self.url(work_package), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response["ETag"] == etag
+
+        response = as_project_participant_api.get(
+            self.url(work_package), HTTP_IF_NONE_MATCH='"other"'
+        )
+        assert response.status_code == 200
+
+    def test_changed_policies(
+        self,
+        project_participant,
+        as_project_participant_api,
+        make_accessible_work_package,
+    ):
+        """Test that the ETag changes when a policy of the tier changes"""
+        work_package = make_accessible_work_package(project_participant)
+        etag = as_project_participant_api.get(self.url(work_package))["ETag"]
+
+        policy = PolicyAssignment.objects.filter(tier=0).first().policy
+        policy.description = "Changed"
+        policy.save()
+
+        response = as_project_participant_api.get(self.url(work_package), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert b"Changed" in response.content
+
+    def test_get_policies_not_accessible(
+        self,
+        as_project_participant_api,
+        classified_work_package,
+    ):
+        """Test that the policies of a work package the user can't access are not returned"""
+        work_package = classified_work_package(0)
+
+        response = as_project_participant_api.get(self.url(work_package))
+
+        assert response.status_code == 404
+
+    def test_get_policies_missing_token(self, DRFClient, classified_work_package):
+        """Test that the policies API returns an error response without an access token"""
+        work_package = classified_work_package(0)
+
+        response = DRFClient.get(self.url(work_package))
+
+        assert response.status_code == 401
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     "url_name,url_pk",
@@ -0,0 +1,230 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from haven.api.models import OutboxDelivery, OutboxEvent, WebhookEndpoint
+from haven.api.webhooks import (
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    dispatch_pending_deliveries,
+    sign_payload,
+)
+from haven.projects.models import WorkPackageParticipant
+
+
+class WebhookStub:
+    """Local HTTP server which records webhook callbacks and replies with a fixed status code"""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append((dict(self.headers), body))
+                self.send_response(stub.status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/callback"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def events(self):
+        return [event for _, body in self.requests for event in json.loads(body)["events"]]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook_stub():
+    stub = WebhookStub()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def webhook_endpoint(oauth_application, webhook_stub):
+    return WebhookEndpoint.objects.create(application=oauth_application, url=webhook_stub.url)
+
+
+@pytest.mark.django_db
+class TestOutbox:
+    def test_classification_writes_event(self, webhook_endpoint, classified_work_package):
+        work_package = classified_work_package(0)
+
+        event = OutboxEvent.objects.get(event_type=OutboxEvent.WORK_PACKAGE_CLASSIFIED)
+        assert event.payload == {
+            "project": str(work_package.project.uuid),
+            "work_package": str(work_package.uuid),
+            "tier": 0,
+        }
+        assert event.deliveries.get().endpoint == webhook_endpoint
+
+    def test_unclassified_does_not_write_event(self, webhook_endpoint, classified_work_package):
+        classified_work_package(None)
+
+        assert not OutboxEvent.objects.filter(event_type=OutboxEvent.WORK_PACKAGE_CLASSIFIED)
+
+    def test_event_above_maximum_tier_not_delivered(
+        self, webhook_endpoint, application_profile, classified_work_package
+    ):
+        application_profile.maximum_tier = 1
+        application_profile.save()
+
+        classified_work_package(2)
+
+        event = OutboxEvent.objects.get(event_type=OutboxEvent.WORK_PACKAGE_CLASSIFIED)
+        assert not event.deliveries.exists()
+
+    def test_participant_removal_writes_events(self, webhook_endpoint, classified_work_package):
+        work_package = classified_work_package(0)
+        participant = work_package.participants.first()
+
+        participant.delete()
+
+        event = OutboxEvent.objects.get(event_type=OutboxEvent.PARTICIPANT_REMOVED)
+        assert event.payload == {
+            "project": str(work_package.project.uuid),
+            "user": str(participant.user.uuid),
+            "role": participant.role,
+        }
+        event = OutboxEvent.objects.get(event_type=OutboxEvent.WORK_PACKAGE_PARTICIPANT_REMOVED)
+        assert event.payload["work_package"] == str(work_package.uuid)
+        assert event.payload["user"] == str(participant.user.uuid)
+
+    def test_work_package_participant_removal_writes_event(
+        self, webhook_endpoint, classified_work_package
+    ):
+        work_package = classified_work_package(0)
+        work_package_participants = WorkPackageParticipant.objects.filter(work_package=work_package)
+        count = work_package_participants.count()
+
+        work_package_participants.delete()
+
+        events = OutboxEvent.objects.filter(event_type=OutboxEvent.WORK_PACKAGE_PARTICIPANT_REMOVED)
+        assert events.count() == count
+
+
+@pytest.mark.django_db
+class TestDispatch:
+    def test_dispatch_delivers_signed_batch(
+        self, settings, webhook_stub, webhook_endpoint, classified_work_package
+    ):
+        settings.WEBHOOK_BATCH_SIZE = 10
+        classified_work_package(0)
+        classified_work_package(1)
+
+        delivered, failed = dispatch_pending_deliveries()
+
+        assert (delivered, failed) == (2, 0)
+        assert len(webhook_stub.requests) == 1
+        headers, body = webhook_stub.requests[0]
+        assert headers[SIGNATURE_HEADER] == sign_payload(
+            webhook_endpoint.secret, headers[TIMESTAMP_HEADER], body
+        )
+        assert [e["data"]["tier"] for e in webhook_stub.events()] == [0, 1]
+        assert not OutboxDelivery.objects.exclude(status=OutboxDelivery.STATUS_DELIVERED)
+
+        # Nothing left to deliver
+        assert dispatch_pending_deliveries() == (0, 0)
+        assert len(webhook_stub.requests) == 1
+
+    def test_dispatch_splits_batches(
+        self, settings, webhook_stub, webhook_endpoint, classified_work_package
+    ):
+        settings.WEBHOOK_BATCH_SIZE = 1
+        classified_work_package(0)
+        classified_work_package(1)
+
+        assert dispatch_pending_deliveries() == (2, 0)
+        assert len(webhook_stub.requests) == 2
+
+    def test_failed_delivery_is_retried(
+        self, settings, webhook_stub, webhook_endpoint, classified_work_package
+    ):
+        settings.WEBHOOK_MAX_ATTEMPTS = 2
+        webhook_stub.status = 500
+        classified_work_package(0)
+
+        assert dispatch_pending_deliveries() == (0, 1)
+        delivery = OutboxDelivery.objects.get()
+        assert delivery.status == OutboxDelivery.STATUS_PENDING
+        assert delivery.attempts == 1
+        assert delivery.last_error == "HTTP 500"
+        assert delivery.next_attempt_at > timezone.now()
+
+        # Not due yet
+        assert dispatch_pending_deliveries() == (0, 0)
+
+        OutboxDelivery.objects.update(next_attempt_at=timezone.now())
+        assert dispatch_pending_deliveries() == (0, 1)
+        delivery.refresh_from_db()
+        assert delivery.status == OutboxDelivery.STATUS_FAILED
+        assert delivery.attempts == 2
+
+    def test_inactive_endpoint_not_notified(
+        self, webhook_stub, webhook_endpoint, classified_work_package
+    ):
+        webhook_endpoint.active = False
+        webhook_endpoint.save()
+        classified_work_package(0)
+
+        assert dispatch_pending_deliveries() == (0, 0)
+        assert webhook_stub.requests == []
+
+    def test_endpoint_deactivated_after_event(
+        self, webhook_stub, webhook_endpoint, classified_work_package
+    ):
+        webhook_stub.status = 500
+        classified_work_package(0)
+        assert dispatch_pending_deliveries() == (0, 1)
+
+        webhook_endpoint.active = False
+        webhook_endpoint.save()
+        webhook_stub.status = 200
+        OutboxDelivery.objects.update(next_attempt_at=timezone.now())
+
+        # Deliveries already queued for the endpoint are no longer sent
+        assert dispatch_pending_deliveries() == (0, 0)
+        assert len(webhook_stub.requests) == 1
+        assert OutboxDelivery.objects.get().status == OutboxDelivery.STATUS_PENDING
+
+        webhook_endpoint.active = True
+        webhook_endpoint.save()
+        assert dispatch_pending_deliveries() == (1, 0)
+
+    def test_command(self, webhook_stub, webhook_endpoint, classified_work_package):
+        classified_work_package(0)
+
+        call_command("dispatch_webhooks", "--once")
+
+        assert len(webhook_stub.events()) == 1
+
+
+@pytest.mark.django_db
+class TestWebhookRegistration:
+    def test_register_application_with_webhook(
+        self, as_system_manager, oauth_application_registration_data
+    ):
+        data = {**oauth_application_registration_data, "webhook_url": "https://example.com/hook"}
+
+        response = as_system_manager.post(reverse("oauth2_provider:register"), data=data)
+
+        assert response.status_code == 302
+        endpoint = WebhookEndpoint.objects.get()
+        assert endpoint.url == "https://example.com/hook"
+        assert endpoint.application.client_id == data["client_id"]
+        assert len(endpoint.secret) == 64
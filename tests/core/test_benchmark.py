@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from haven.core.benchmark import ENDPOINTS, compare, percentile
+from haven.identity.models import User
+
+
+def test_percentile():
+    values = list(range(100, 0, -1))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+
+
+def test_compare():
+    baseline = {"endpoints": {"a": {"p50_ms": 10, "p95_ms": 20, "p99_ms": 40, "queries_mean": 5}}}
+    results = {
+        "endpoints": {
+            "a": {"p50_ms": 5, "p95_ms": 20, "p99_ms": 50, "queries_mean": 5},
+            "b": {"p50_ms": 1, "p95_ms": 1, "p99_ms": 1, "queries_mean": 1},
+        }
+    }
+
+    assert compare(baseline, results) == [
+        ("a", "p50_ms", 10, 5, -50.0),
+        ("a", "p95_ms", 20, 20, 0.0),
+        ("a", "p99_ms", 40, 50, 25.0),
+        ("a", "queries_mean", 5, 5, 0.0),
+    ]
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    def test_benchmark(self, tmp_path):
+        call_command(
+            "generate_synthetic_data",
+            *("--users", "30", "--projects", "3", "--work-packages", "12", "--datasets", "6"),
+            *("--seed", "1"),
+        )
+        users = User.objects.count()
+        output = tmp_path / "results.json"
+
+        call_command("benchmark", "--requests", "3", "--warmup", "0", "--output", str(output))
+
+        results = json.loads(output.read_text())
+        assert results["rows"]["projects.Project"] == 3
+        assert set(results["endpoints"]) == set(ENDPOINTS)
+        for name, result in results["endpoints"].items():
+            assert result["statuses"] == [200], name
+            assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+            assert result["queries_max"] > 0
+        # Nothing the benchmark does is kept
+        assert User.objects.count() == users
+
+        call_command(
+            "benchmark",
+            *("--requests", "1", "--warmup", "0", "--endpoint", "api_project_list"),
+            *("--output", str(tmp_path / "next.json"), "--baseline", str(output)),
+        )
+        assert list(json.loads((tmp_path / "next.json").read_text())["endpoints"]) == [
+            "api_project_list"
+        ]
@@ -0,0 +1,33 @@
+from django.template import Context, Template
+from django_bleach.templatetags.bleach_tags import bleach_value
+
+from haven.core.sanitize import clean_html, clean_html_no_links
+
+
+HTML = '<p>See <a href="#guidance">guidance</a> <script>alert(1)</script></p>'
+
+
+class TestSanitize:
+    def test_clean_html(self):
+        assert clean_html(HTML) == bleach_value(HTML)
+
+    def test_clean_html_no_links(self):
+        assert clean_html_no_links(HTML) == (
+            "<p>See guidance &lt;script&gt;alert(1)&lt;/script&gt;</p>"
+        )
+
+    def test_cached(self):
+        clean_html.cache_clear()
+        clean_html(HTML)
+        clean_html(HTML)
+        clean_html("<p>Other</p>")
+
+        info = clean_html.cache_info()
+        assert info.hits == 1
+        assert info.misses == 2
+
+    def test_sanitize_filter(self):
+        template = Template("{% load haven %}{{ value | sanitize }}")
+
+        assert template.render(Context({"value": HTML})) == bleach_value(HTML)
+        assert template.render(Context({"value": None})) == "None"
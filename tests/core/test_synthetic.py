@@ -0,0 +1,70 @@
+import pytest
+from django.core.management import call_command
+
+from haven.core.synthetic import spread
+from haven.data.tiers import Tier
+from haven.identity.models import User
+from haven.projects.models import (
+    ClassificationOpinion,
+    ProgrammeSummary,
+    Project,
+    WorkPackage,
+    WorkPackageParticipantApproval,
+    WorkPackageStatus,
+)
+
+
+def test_spread():
+    assert spread(10, 4) == [3, 3, 2, 2]
+    assert spread(2, 3) == [1, 1, 0]
+
+
+@pytest.mark.django_db
+class TestGenerateSyntheticData:
+    def generate(self, **kwargs):
+        options = {"users": 50, "projects": 5, "work_packages": 40, "datasets": 10, "seed": 1}
+        options.update(kwargs)
+        args = [arg for name, value in options.items() for arg in (f"--{name}", str(value))]
+        call_command("generate_synthetic_data", *[a.replace("_", "-") for a in args])
+
+    def test_volumes(self):
+        self.generate()
+
+        assert User.objects.count() == 50
+        assert Project.objects.count() == 5
+        assert WorkPackage.objects.count() == 40
+        assert sum(s.total_projects for s in ProgrammeSummary.objects.all()) == 5
+        for project in Project.objects.all():
+            assert project.datasets.count() == 2
+            assert project.work_packages.count() == 8
+
+    def test_classified_work_packages(self):
+        self.generate()
+
+        classified = WorkPackage.objects.filter(status=WorkPackageStatus.CLASSIFIED.value)
+        assert classified
+        for work_package in classified:
+            opinions = work_package.classifications.all()
+            assert {opinion.tier for opinion in opinions} == {work_package.tier}
+            assert work_package.is_classification_ready
+            for opinion in opinions:
+                answers = list(opinion.questions.order_by("order"))
+                assert answers
+                # The last answer leads to the tier
+                last = answers[-1]
+                tier = last.question.yes_tier if last.answer else last.question.no_tier
+                assert tier == opinion.tier
+            if work_package.tier >= Tier.THREE:
+                assert not work_package.get_work_package_participants_to_approve().exists()
+
+        assert not ClassificationOpinion.objects.filter(
+            work_package__status=WorkPackageStatus.NEW.value
+        ).exists()
+
+    def test_repeatable(self):
+        self.generate()
+        self.generate(seed=2)
+
+        assert User.objects.count() == 100
+        assert Project.objects.count() == 10
+        assert WorkPackageParticipantApproval.objects.exists()
@@ -0,0 +1,192 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haven.core import recipes
+from haven.data.classification import insert_initial_questions
+from haven.data.models import (
+    ClassificationGuidance,
+    ClassificationQuestion,
+    ClassificationQuestionSet,
+)
+from haven.data.question_graph import (
+    answer_bits,
+    get_default_question_graph,
+    get_question_graph,
+)
+
+
+@pytest.fixture
+def question_set():
+    insert_initial_questions(
+        ClassificationQuestion, ClassificationGuidance, ClassificationQuestionSet
+    )
+    return ClassificationQuestionSet.objects.get(name="turing")
+
+
+@pytest.mark.django_db
+class TestQuestionGraph:
+    def test_matches_ordered_questions(self, question_set):
+        graph = get_question_graph(question_set.id)
+
+        ordered = ClassificationQuestion.objects.get_ordered_questions(question_set.name)
+        assert [q.id for q in graph.ordered] == [q.id for q in ordered]
+        assert graph.start.id == ordered[0].id
+        assert graph.name == "turing"
+
+    def test_next(self, question_set):
+        graph = get_question_graph(question_set.id)
+
+        for question in ClassificationQuestion.objects.filter(question_set=question_set):
+            node = graph.get(question.id)
+            for answer, expected in [(True, question.answer_yes()), (False, question.answer_no())]:
+                following = graph.next(node, answer)
+                if isinstance(expected, int):
+                    assert following == expected
+                else:
+                    assert following.id == expected.id
+
+    def test_compiled_once(self, question_set):
+        get_default_question_graph()
+
+        with CaptureQueriesContext(connection) as context:
+            graph = get_question_graph(question_set.id)
+            graph.next(graph.start, True)
+            assert get_default_question_graph() is graph
+        assert len(context.captured_queries) == 0
+
+    def test_recompiled_on_question_change(self, question_set):
+        graph = get_question_graph(question_set.id)
+        question = ClassificationQuestion.objects.get(pk=graph.start.id)
+        question.question = "Changed"
+        question.save()
+
+        new_graph = get_question_graph(question_set.id)
+        assert new_graph is not graph
+        assert new_graph.start.question == "Changed"
+
+    def test_depth(self, question_set):
+        graph = get_question_graph(question_set.id)
+
+        def longest(question):
+            if isinstance(question, int):
+                return 0
+            return 1 + max(longest(graph.next(question, answer)) for answer in [True, False])
+
+        assert graph.depth == longest(graph.start)
+
+    def walk(self, graph, answer):
+        """Answer every question with `answer`, returning the answers and the tier reached"""
+        answers = []
+        question = graph.start
+        while not isinstance(question, int):
+            answers.append((question.id, answer))
+            question = graph.next(question, answer)
+        return answers, question
+
+    def test_validate_path(self, question_set):
+        graph = get_question_graph(question_set.id)
+        answers, tier = self.walk(graph, False)
+
+        assert graph.validate_path(answers) == (
+            tier,
+            [(graph.get(question_id), answer) for question_id, answer in answers],
+        )
+
+    def test_validate_path_invalid(self, question_set):
+        graph = get_question_graph(question_set.id)
+        answers, tier = self.walk(graph, False)
+
+        invalid = [
+            answers[:-1],
+            answers + [answers[-1]],
+            [(answers[0][0], True)] + answers[1:],
+            [(answers[0][0], "no")] + answers[1:],
+            answers[1:],
+            [],
+        ]
+        for path in invalid:
+            with pytest.raises(ValidationError):
+                graph.validate_path(path)
+
+    def test_paths(self, question_set):
+        graph = get_question_graph(question_set.id)
+
+        def all_paths(question, answers=()):
+            if isinstance(question, int):
+                yield answers, question
+                return
+            for answer in [True, False]:
+                yield from all_paths(graph.next(question, answer), answers + (answer,))
+
+        expected = list(all_paths(graph.start))
+        assert len(graph.paths) == len(expected)
+        for answers, tier in expected:
+            path = graph.paths[answer_bits(answers)]
+            assert path.tier == tier
+            assert len(path.question_ids) == len(answers)
+            assert graph.get_tier(answers) == tier
+        assert graph.get_tier([True] * (graph.depth + 1)) is None
+        assert graph.get_tier(["yes"]) is None
+
+    def test_tier_path_counts(self, question_set):
+        graph = get_question_graph(question_set.id)
+
+        counts = graph.tier_path_counts
+        assert list(counts) == [0, 1, 2, 3, 4]
+        assert sum(counts.values()) == len(graph.paths)
+        assert graph.unreachable_questions == []
+
+    def test_validate_path_uses_lookup(self, question_set):
+        graph = get_question_graph(question_set.id)
+        answers, tier = self.walk(graph, True)
+        graph.paths
+
+        with patch.object(graph, "next", side_effect=AssertionError("walked the graph")):
+            assert graph.validate_path(answers)[0] == tier
+
+    def test_report_command(self, question_set, capsys):
+        other = recipes.question_set.make(name="other")
+        recipes.question.make(question_set=other, name="first", yes_tier=1, no_tier=0)
+        unreachable = recipes.question.make(
+            question_set=other, name="unreachable", yes_tier=4, no_tier=4
+        )
+        recipes.question.make(
+            question_set=other, name="second", yes_question=unreachable, no_tier=2
+        )
+
+        call_command("question_set_report", "other")
+
+        graph = get_question_graph(other.id)
+        assert capsys.readouterr().out == (
+            "other\n"
+            "  Questions: 3\n"
+            f"  Longest path: {graph.depth} questions\n"
+            "  Paths: 2\n"
+            "    Tier 0: 1\n"
+            "    Tier 1: 1\n"
+            "  Unreachable questions: second, unreachable\n"
+        )
+
+
+@pytest.mark.django_db
+class TestDefaultQuestionSetId:
+    def test_cached(self, question_set):
+        assert ClassificationQuestionSet.get_default_id() == question_set.id
+
+        with CaptureQueriesContext(connection) as context:
+            assert ClassificationQuestionSet.get_default_id() == question_set.id
+        assert len(context.captured_queries) == 0
+
+    def test_invalidated_on_question_set_change(self, question_set):
+        ClassificationQuestionSet.get_default_id()
+        question_set.name = "renamed"
+        question_set.save()
+
+        new_id = ClassificationQuestionSet.get_default_id()
+        assert new_id != question_set.id
+        assert ClassificationQuestionSet.objects.get(pk=new_id).name == "turing"
@@ -0,0 +1,78 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haven.core import recipes
+from haven.data import question_history
+from haven.data.caching import GENERATION_KEY
+from haven.data.models import ClassificationQuestion
+
+
+@pytest.mark.django_db
+class TestQuestionHistory:
+    def test_question_versions_loaded_once(self):
+        question = recipes.question.make(question="Before")
+        before = question.history.latest().history_id
+        question.question = "After"
+        question.save()
+        after = question.history.latest().history_id
+
+        with CaptureQueriesContext(connection) as context:
+            versions = question_history.get_question_versions([before, after])
+            assert question_history.get_question_version(before) == versions[before]
+        assert len(context.captured_queries) == 1
+
+        assert versions[before].question == "Before"
+        assert versions[after].question == "After"
+        assert versions[after].name == question.name
+
+    def test_missing_question_version(self):
+        assert question_history.get_question_versions([0]) == {}
+        with pytest.raises(ClassificationQuestion.history.model.DoesNotExist):
+            question_history.get_question_version(0)
+
+    def test_latest_versions_cached(self):
+        questions = recipes.question.make(_quantity=3)
+        expected = {q.id: q.history.latest().history_id for q in questions}
+
+        with CaptureQueriesContext(connection) as context:
+            assert question_history.get_latest_versions([q.id for q in questions]) == expected
+            for q in questions:
+                assert question_history.get_latest_version(q.id) == expected[q.id]
+        assert len(context.captured_queries) == 1
+
+    def test_latest_version_invalidated_on_save(self):
+        question = recipes.question.make()
+        original = question_history.get_latest_version(question.id)
+
+        question.question = "Changed"
+        question.save()
+
+        latest = question_history.get_latest_version(question.id)
+        assert latest != original
+        assert latest == question.history.latest().history_id
+
+    def test_latest_version_invalidated_by_other_process(self):
+        question = recipes.question.make()
+        original = question_history.get_latest_version(question.id)
+
+        # Another process saving the question only changes the shared generation
+        ClassificationQuestion.objects.filter(pk=question.pk).update(question="Changed")
+        new = question.history.create(
+            id=question.id,
+            name=question.name,
+            question_set=question.question_set,
+            question="Changed",
+            hidden=False,
+            history_date=question.history.latest().history_date,
+            history_type="~",
+        )
+        assert question_history.get_latest_version(question.id) == original
+        cache.set(GENERATION_KEY, "other process")
+
+        assert question_history.get_latest_version(question.id) == new.history_id
+
+    def test_missing_latest_version(self):
+        with pytest.raises(ClassificationQuestion.history.model.DoesNotExist):
+            question_history.get_latest_version(0)
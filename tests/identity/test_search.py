@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haven.identity import search
+from haven.identity.models import User
+from haven.identity.search import (
+    SQLITE_SEARCH_TABLE,
+    create_search_index,
+    has_sqlite_search_table,
+    search_users,
+)
+
+
+@pytest.mark.django_db
+class TestSearchUsers:
+    @pytest.fixture
+    def users(self):
+        return {
+            name: User.objects.create_user(
+                first_name=first_name,
+                last_name=last_name,
+                username=f"{name}@example.com",
+                email=f"{name}@mail.example.org",
+            )
+            for name, first_name, last_name in [
+                ("kjohnson", "Katherine", "Johnson"),
+                ("mjackson", "Mary", "Jackson"),
+                ("jmary", "Jon", "Maryon"),
+                ("dvaughan", "Dorothy", "Vaughan"),
+            ]
+        }
+
+    def search(self, query):
+        return [user.username.split("@")[0] for user in search_users(User.objects.all(), query)]
+
+    def test_substrings(self, users):
+        assert set(self.search("son")) == {"kjohnson", "mjackson"}
+        assert set(self.search("Mar")) == {"mjackson", "jmary"}
+        assert self.search("ugh") == ["dvaughan"]
+        assert self.search("D Vaughan") == ["dvaughan"]
+        assert self.search("mail.example.org Kath") == ["kjohnson"]
+        assert self.search("Dott Va") == []
+
+    def test_ranking(self, users):
+        # Exact matches first, then prefixes, then anything containing the term
+        assert self.search("mary") == ["mjackson", "jmary"]
+        assert self.search("ary") == ["mjackson", "jmary"]
+        assert self.search("maryo") == ["jmary"]
+        assert self.search("jackson") == ["mjackson"]
+        assert self.search("j") == ["mjackson", "kjohnson", "jmary"]
+
+    def test_index_kept_up_to_date(self, users):
+        user = users["dvaughan"]
+        user.first_name = "Dot"
+        user.last_name = "Hamilton"
+        user.save()
+        assert self.search("Dorothy") == []
+        assert self.search("Dot Hamilton") == ["dvaughan"]
+
+        user.delete()
+        assert self.search("Hamilton") == []
+
+    @pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite search table")
+    def test_sqlite_search_table(self, users):
+        assert has_sqlite_search_table(connection)
+
+        with CaptureQueriesContext(connection) as context:
+            assert self.search("Dorothy") == ["dvaughan"]
+        assert SQLITE_SEARCH_TABLE in context.captured_queries[0]["sql"]
+
+        # Terms too short for trigrams are searched without the index
+        with CaptureQueriesContext(connection) as context:
+            assert self.search("Do") == ["dvaughan"]
+        assert SQLITE_SEARCH_TABLE not in context.captured_queries[0]["sql"]
+
+    @pytest.mark.parametrize("vendor", ["postgresql", "sqlite"])
+    def test_index_not_created(self, users, vendor, caplog):
+        """Test that failing to create the indexes leaves users searchable without them"""
+        statements = ["CREATE TABLE identity_user_search_test (id integer)", "NOT SQL"]
+        with patch.object(connection, "vendor", vendor), patch.object(
+            search, "POSTGRESQL_INDEX_SQL", statements
+        ), patch.object(search, "SQLITE_INDEX_SQL", statements), patch.object(
+            search, "has_sqlite_search_table", return_value=False
+        ):
+            create_search_index(connection.alias)
+
+        assert "searched without an index" in caplog.text
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        assert "identity_user_search_test" not in tables
+        assert self.search("Dorothy") == ["dvaughan"]
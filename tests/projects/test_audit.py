@@ -0,0 +1,173 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from easyaudit.models import CRUDEvent
+
+from haven.core import recipes
+from haven.projects.archive import archive_audit_log
+from haven.projects.models import (
+    ArchivedAuditEvent,
+    ProjectAuditEvent,
+    WorkPackageParticipant,
+    WorkPackageParticipantApproval,
+)
+from haven.projects.views import ProjectHistory
+
+
+@pytest.fixture(autouse=True)
+def synchronous_audit(settings):
+    # easyaudit normally writes audit log entries once the transaction commits, which never
+    # happens inside a test
+    settings.TEST = True
+
+
+def audited_models(events):
+    return {event.content_type.model for event in events}
+
+
+@pytest.mark.django_db
+class TestProjectAuditHistory:
+    def test_project_events(self, programme_manager):
+        project = recipes.project.make(created_by=programme_manager)
+        project.name = "Renamed"
+        project.save()
+
+        history = project.get_audit_history()
+
+        assert [event.event_type for event in history] == [CRUDEvent.UPDATE, CRUDEvent.CREATE]
+
+    def test_related_events(self, classified_work_package):
+        work_package = classified_work_package(3)
+        other_work_package = classified_work_package(0)
+
+        history = work_package.project.get_audit_history()
+
+        assert {
+            "project",
+            "participant",
+            "projectdataset",
+            "workpackage",
+            "workpackagedataset",
+            "workpackageparticipant",
+            "workpackageparticipantapproval",
+            "classificationopinion",
+        } <= audited_models(history)
+        assert not set(history) & set(other_work_package.project.get_audit_history())
+
+    def test_deleted_objects(self, classified_work_package):
+        work_package = classified_work_package(3)
+        project = work_package.project
+        approval_ids = set(
+            WorkPackageParticipantApproval.objects.filter(
+                work_package_participant__work_package=work_package
+            ).values_list("id", flat=True)
+        )
+        assert approval_ids
+
+        work_package.delete()
+        assert not WorkPackageParticipant.objects.filter(work_package_id=work_package.id)
+        self.assert_deletions_linked(project, approval_ids)
+
+        # Relinking once the work package, its participants and approvals are all gone relies on
+        # their audited field values
+        ProjectAuditEvent.objects.all().delete()
+        call_command("backfill_project_audit")
+        self.assert_deletions_linked(project, approval_ids)
+
+    def assert_deletions_linked(self, project, approval_ids):
+        deleted = project.get_audit_history().filter(event_type=CRUDEvent.DELETE)
+        assert {"workpackage", "workpackageparticipant"} <= audited_models(deleted)
+        assert approval_ids == {
+            int(event.object_id)
+            for event in deleted.filter(content_type__model="workpackageparticipantapproval")
+        }
+
+    def test_backfill(self, classified_work_package):
+        work_package = classified_work_package(3)
+        project = work_package.project
+        expected = list(project.get_audit_history())
+
+        ProjectAuditEvent.objects.all().delete()
+        assert not project.get_audit_history()
+
+        call_command("backfill_project_audit", "--batch-size", "7")
+        history = set(project.get_audit_history())
+        assert set(expected) <= history
+        # The dataset was created before it was added to the project, so its creation is only
+        # linked once the link is backfilled
+        assert "dataset" in audited_models(history - set(expected))
+
+        # Running again doesn't duplicate anything
+        call_command("backfill_project_audit")
+        assert project.get_audit_history().count() == len(history)
+
+
+@pytest.mark.django_db
+class TestArchiveAuditLog:
+    def make_history(self, user, count):
+        """Make a project with `count` audit events, one day apart with the last half a day ago"""
+        project = recipes.project.make(created_by=user)
+        for i in range(count - 1):
+            project.name = f"Name {i}"
+            project.save()
+        events = list(project.get_audit_history().order_by("id"))
+        start = timezone.now() - timedelta(days=count - 0.5)
+        for i, event in enumerate(events):
+            CRUDEvent.objects.filter(pk=event.pk).update(datetime=start + timedelta(days=i))
+        return project, list(project.get_audit_history().order_by("id"))
+
+    def test_archive(self, programme_manager):
+        project, events = self.make_history(programme_manager, 5)
+
+        call_command("archive_audit_log", "--older-than-days", "2", "--batch-size", "2")
+
+        assert list(project.get_audit_history().order_by("id")) == events[3:]
+        archived = list(project.get_archived_audit_history().order_by("id"))
+        assert [event.pk for event in archived] == [event.pk for event in events[:3]]
+        for original, event in zip(events, archived):
+            assert event.partition == original.datetime.strftime("%Y-%m")
+            assert event.datetime == original.datetime
+            assert event.get_event_type_display() == original.get_event_type_display()
+            assert event.user == original.user
+            assert event.object_json_repr == original.object_json_repr
+            assert event.changed_fields == original.changed_fields
+        assert not ProjectAuditEvent.objects.filter(event_id__in=[e.pk for e in archived])
+
+    def test_resume(self, programme_manager):
+        project, events = self.make_history(programme_manager, 5)
+        cutoff = timezone.now() - timedelta(days=2)
+
+        # Interrupted after the first batch
+        assert next(archive_audit_log(cutoff, 2)) == 2
+        assert project.get_archived_audit_history().count() == 2
+
+        assert list(archive_audit_log(cutoff, 2)) == [1]
+        assert list(archive_audit_log(cutoff, 2)) == []
+        assert project.get_archived_audit_history().count() == 3
+
+    def test_history_includes_archive(self, as_programme_manager):
+        project, events = self.make_history(as_programme_manager._user, 5)
+        call_command("archive_audit_log", "--older-than-days", "2")
+        url = f"/projects/{project.uuid}/history"
+
+        with patch.object(ProjectHistory, "paginate_by", 2):
+            response = as_programme_manager.get(url)
+            page = list(response.context["history_table"].data)
+            response = as_programme_manager.get(url, {"after": response.context["older_cursor"]})
+            page += list(response.context["history_table"].data)
+            response = as_programme_manager.get(url, {"after": response.context["older_cursor"]})
+            page += list(response.context["history_table"].data)
+
+        assert [event.pk for event in page] == [event.pk for event in reversed(events)]
+        assert isinstance(page[-1], ArchivedAuditEvent)
+
+        response = as_programme_manager.get(f"{url}/{events[0].pk}")
+        assert response.json()["object_json_repr"] == events[0].object_json_repr
+
+        response = as_programme_manager.get(f"{url}/export.jsonl")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [event.pk for event in events]
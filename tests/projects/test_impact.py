@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from haven.core import recipes
+from haven.data.question_graph import get_question_graph
+from haven.projects import impact
+from haven.projects.impact import (
+    get_work_package_impact,
+    replay_all_opinions,
+    replay_answers,
+)
+
+
+def make_questions(question_set, changed=False):
+    """
+    Make questions `a` and `b` in a question set
+
+    When `changed`, answering yes to `a` leads to tier 3 rather than 2, and answering no to `b`
+    leads to a new question `c` rather than tier 0.
+    """
+    if changed:
+        c = recipes.question.make(question_set=question_set, name="c", yes_tier=1, no_tier=0)
+        b = recipes.question.make(question_set=question_set, name="b", yes_tier=1, no_question=c)
+    else:
+        b = recipes.question.make(question_set=question_set, name="b", yes_tier=1, no_tier=0)
+    a = recipes.question.make(
+        question_set=question_set, name="a", yes_tier=3 if changed else 2, no_question=b
+    )
+    return a, b
+
+
+@pytest.mark.django_db
+class TestImpact:
+    def classify(self, work_package, user, questions):
+        tier = None
+        graph = get_question_graph(questions[0][0].question_set_id)
+        for question, answer in questions:
+            tier = graph.next(graph.get(question.id), answer)
+        work_package.classify_as(tier, user, questions=questions)
+
+    def make_opinions(
+        self, classified_work_package, investigator, data_provider_representative, referee
+    ):
+        a, b = make_questions(recipes.question_set.make(name="current"))
+        candidate = recipes.question_set.make(name="candidate")
+        make_questions(candidate, changed=True)
+
+        work_packages = [classified_work_package(None) for i in range(3)]
+        self.classify(work_packages[0], investigator.user, [(a, True)])
+        self.classify(work_packages[0], data_provider_representative.user, [(a, False), (b, True)])
+        self.classify(work_packages[1], investigator.user, [(a, False), (b, False)])
+        self.classify(work_packages[1], data_provider_representative.user, [(a, False), (b, True)])
+        self.classify(work_packages[2], investigator.user, [(a, False), (b, True)])
+        # Classifications without recorded answers can't be replayed
+        work_packages[2].classify_as(1, referee.user)
+        return candidate, work_packages
+
+    def test_replay_answers(self):
+        candidate = recipes.question_set.make(name="candidate")
+        make_questions(candidate, changed=True)
+        graph = get_question_graph(candidate.id)
+
+        assert replay_answers(graph, {"a": True}) == (3, None)
+        assert replay_answers(graph, {"a": False, "b": True}) == (1, None)
+        assert replay_answers(graph, {"a": False, "b": False}) == (None, "c")
+        assert replay_answers(graph, {"a": False, "b": False, "c": True}) == (1, None)
+
+    def test_replay_all_opinions(
+        self, classified_work_package, investigator, data_provider_representative, referee
+    ):
+        candidate, work_packages = self.make_opinions(
+            classified_work_package, investigator, data_provider_representative, referee
+        )
+
+        with patch.object(impact, "replay_answers", wraps=replay_answers) as replayed:
+            chunks = list(replay_all_opinions(candidate.id, chunk_size=3))
+        # Each distinct set of answers is only replayed once in each chunk
+        assert replayed.call_count == 4
+
+        assert [len(chunk) for chunk in chunks] == [3, 2]
+        replays = [replay for chunk in chunks for replay in chunk]
+        assert [(r.work_package_id, r.tier, r.new_tier, r.unanswered) for r in replays] == [
+            (work_packages[0].id, 2, 3, None),
+            (work_packages[0].id, 1, 1, None),
+            (work_packages[1].id, 0, None, "c"),
+            (work_packages[1].id, 1, 1, None),
+            (work_packages[2].id, 1, 1, None),
+        ]
+        assert [r.changed for r in replays] == [True, False, True, False, False]
+
+    def test_work_package_impact(
+        self, classified_work_package, investigator, data_provider_representative, referee
+    ):
+        candidate, work_packages = self.make_opinions(
+            classified_work_package, investigator, data_provider_representative, referee
+        )
+        replays = [replay for chunk in replay_all_opinions(candidate.id) for replay in chunk]
+
+        report = get_work_package_impact(replays)
+
+        assert sorted(i.work_package_id for i in report) == [w.id for w in work_packages[:2]]
+        for work_package_impact in report:
+            assert work_package_impact.new_tier is None
+            assert [r.username for r in work_package_impact.changes] == [investigator.user.username]
+
+    def test_command(
+        self, classified_work_package, investigator, data_provider_representative, referee, capsys
+    ):
+        candidate, work_packages = self.make_opinions(
+            classified_work_package, investigator, data_provider_representative, referee
+        )
+        work_package = work_packages[1]
+
+        call_command("question_set_impact", "candidate", "--chunk-size", "2", "--workers", "1")
+
+        output = capsys.readouterr().out
+        assert output.startswith(
+            "Replayed 5 classifications against candidate: 2 would change, in 2 work packages\n"
+        )
+        assert (
+            f"{work_package.project.name} / {work_package.name}: undecided -> undecided\n"
+            f"  {investigator.user.username}: tier 0 -> needs an answer to c\n"
+        ) in output
+        assert f"  {investigator.user.username}: tier 2 -> tier 3\n" in output
+
+    def test_command_unknown_question_set(self):
+        with pytest.raises(CommandError):
+            call_command("question_set_impact", "missing")
@@ -11,7 +11,9 @@ from haven.data.models import (
     ClassificationQuestion,
     ClassificationQuestionSet,
 )
+from haven.data.question_graph import get_default_question_graph
 from haven.projects.models import (
+    ClassificationDraft,
     Policy,
     PolicyAssignment,
     PolicyGroup,
@@ -22,6 +24,7 @@ from haven.projects.models import (
 )
 from haven.projects.policies import insert_initial_policies
 from haven.projects.roles import ProjectRole
+from haven.projects.view_models import WorkPackageDetailData
 
 
 @pytest.mark.django_db
@@ -998,6 +1001,12 @@ class TestParticipant:
         actual = [[p.participant.role, p.approved, p.approved_by_you] for p in participants]
         assert expected == actual
 
+        # The work package detail page works out the same approvals from what it has loaded
+        data = WorkPackageDetailData(work_package, approver)
+        actual = [[p.participant.role, p.approved, p.approved_by_you] for p in data.participants]
+        assert expected == actual
+        assert data.show_approve_participants == work_package.show_approve_participants(approver)
+
     def test_participant_not_approved_for_unassigned_work_package(
         self, classified_work_package, user1, programme_manager
     ):
@@ -1251,6 +1260,27 @@ class TestParticipant:
         )
 
 
+@pytest.mark.django_db
+class TestClassificationDraft:
+    def test_walk(self):
+        insert_initial_questions(
+            ClassificationQuestion, ClassificationGuidance, ClassificationQuestionSet
+        )
+        graph = get_default_question_graph()
+        first = graph.start
+        second = graph.next(first, False)
+        third = graph.next(second, False)
+        unreachable = graph.next(first, True)
+        draft = ClassificationDraft(
+            answers={str(first.id): False, str(second.id): False, str(unreachable.id): True}
+        )
+
+        assert draft.get_answer(first.id) is False
+        assert draft.get_answer(third.id) is None
+        assert draft.walk(graph) == ([(first, False), (second, False)], third)
+        assert draft.walk(graph, until=second) == ([(first, False)], second)
+
+
 class TestUtils:
     def test_a_or_an(self):
         assert a_or_an("Investigator") == "An Investigator"
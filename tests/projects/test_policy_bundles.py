@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haven.projects.models import Policy, PolicyAssignment, PolicyGroup
+from haven.projects.policies import insert_initial_policies
+from haven.projects.policy_bundles import get_policy_bundle
+
+
+@pytest.fixture
+def policies():
+    if not Policy.objects.exists():
+        insert_initial_policies(PolicyGroup, Policy, PolicyAssignment)
+
+
+@pytest.mark.django_db
+class TestPolicyBundles:
+    def test_matches_assignments(self, policies):
+        for tier in range(5):
+            expected = [
+                (a.pk, a.policy.name, a.policy.description, a.policy.group.description)
+                for a in PolicyAssignment.objects.filter(tier=tier).order_by("pk")
+            ]
+            bundle = get_policy_bundle(tier)
+            assert isinstance(bundle, tuple)
+            assert [
+                (a.id, a.policy.name, a.policy.description, a.policy.group.description)
+                for a in bundle
+            ] == expected
+        assert get_policy_bundle(5) == ()
+
+    def test_loaded_once(self, policies):
+        with CaptureQueriesContext(connection) as context:
+            get_policy_bundle(0)
+        assert len(context.captured_queries) == 1
+
+        with CaptureQueriesContext(connection) as context:
+            for tier in range(5):
+                get_policy_bundle(tier)
+        assert len(context.captured_queries) == 0
+
+    def test_invalidated_on_policy_change(self, policies):
+        bundle = get_policy_bundle(0)
+        group = bundle[0].policy.group
+
+        PolicyGroup.objects.filter(pk=group.id).update(description="Unsaved")
+        assert get_policy_bundle(0)[0].policy.group.description == group.description
+
+        policy_group = PolicyGroup.objects.get(pk=group.id)
+        policy_group.description = "Changed"
+        policy_group.save()
+        assert get_policy_bundle(0)[0].policy.group.description == "Changed"
+
+        PolicyAssignment.objects.get(pk=bundle[0].id).delete()
+        assert len(get_policy_bundle(0)) == len(bundle) - 1
+
+    def test_work_package_policies(self, policies, classified_work_package):
+        work_package = classified_work_package(1)
+
+        with CaptureQueriesContext(connection) as context:
+            assert work_package.get_policies() == get_policy_bundle(1)
+        assert len(context.captured_queries) == 1
+
+        work_package = classified_work_package(None)
+        assert work_package.get_policies() == []
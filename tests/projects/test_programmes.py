@@ -0,0 +1,120 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from taggit.models import Tag
+
+from haven.core import recipes
+from haven.projects.models import ProgrammeSummary
+
+
+def get_summary(name):
+    return ProgrammeSummary.objects.filter(tag__name=name).first()
+
+
+def summary_counts(name):
+    summary = get_summary(name)
+    return summary and (
+        summary.active_projects,
+        summary.archived_projects,
+        summary.work_package_tiers,
+    )
+
+
+@pytest.mark.django_db
+class TestProgrammeSummary:
+    def test_tagging(self):
+        project1, project2 = recipes.project.make(_quantity=2)
+
+        project1.programmes.add("prog1", "prog2")
+        project2.programmes.add("prog2")
+
+        assert summary_counts("prog1") == (1, 0, {})
+        assert summary_counts("prog2") == (2, 0, {})
+
+        project2.programmes.remove("prog2")
+        assert summary_counts("prog2") == (1, 0, {})
+
+        project1.programmes.clear()
+        assert get_summary("prog1") is None
+        assert get_summary("prog2") is None
+
+    def test_archiving(self):
+        project1, project2 = recipes.project.make(_quantity=2)
+        project1.programmes.add("prog1")
+        project2.programmes.add("prog1")
+
+        project1.archive()
+
+        assert summary_counts("prog1") == (1, 1, {})
+
+    def test_work_packages(self, classified_work_package):
+        work_package = classified_work_package(2)
+        project = work_package.project
+        project.programmes.add("prog1")
+        recipes.work_package.make(project=project)
+        assert summary_counts("prog1") == (1, 0, {"2": 1})
+
+        other = classified_work_package(2)
+        other.project = project
+        other.save()
+        assert summary_counts("prog1") == (1, 0, {"2": 2})
+
+        work_package.delete()
+        assert summary_counts("prog1") == (1, 0, {"2": 1})
+
+        # Work packages in archived projects aren't counted
+        project.archive()
+        assert summary_counts("prog1") == (0, 1, {})
+
+    def test_project_deleted(self):
+        project1, project2 = recipes.project.make(_quantity=2)
+        project1.programmes.add("prog1")
+        project2.programmes.add("prog1")
+
+        project1.delete()
+
+        assert summary_counts("prog1") == (1, 0, {})
+
+    def test_refresh_command(self, classified_work_package):
+        work_package = classified_work_package(1)
+        work_package.project.programmes.add("prog1", "prog2")
+        recipes.project.make().programmes.add("prog2")
+        expected = {s.tag_id: summary_counts(s.tag.name) for s in ProgrammeSummary.objects.all()}
+
+        ProgrammeSummary.objects.all().delete()
+        ProgrammeSummary.objects.create(tag=Tag.objects.create(name="stale", slug="stale"))
+        call_command("refresh_programme_summaries")
+
+        assert {
+            s.tag_id: summary_counts(s.tag.name) for s in ProgrammeSummary.objects.all()
+        } == expected
+
+
+@pytest.mark.django_db
+class TestProgrammeList:
+    def test_list(self, as_standard_user):
+        project1, project2, project3 = recipes.project.make(_quantity=3)
+        project1.programmes.add("prog1", "prog2")
+        project2.programmes.add("prog2")
+        project3.programmes.add("prog2")
+        project3.archive()
+
+        response = as_standard_user.get("/projects/programmes")
+
+        programmes = list(response.context["programmes"])
+        assert [p.tag.name for p in programmes] == ["prog2", "prog1"]
+        assert (programmes[0].active_projects, programmes[0].archived_projects) == (2, 1)
+        assert "(1 archived)" in response.content.decode()
+
+    def test_single_query(self, as_standard_user):
+        for i in range(5):
+            recipes.project.make().programmes.add(f"prog{i}")
+
+        with CaptureQueriesContext(connection) as context:
+            as_standard_user.get("/projects/programmes")
+
+        # Apart from loading the session and user, the page is a single read of the summaries
+        queries = [q["sql"] for q in context.captured_queries if q["sql"].startswith("SELECT")]
+        assert len(queries) == 3
+        assert "projects_programmesummary" in queries[-1]
@@ -0,0 +1,78 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haven.core import recipes
+from haven.data.models import ClassificationGuidance
+from haven.data.question_graph import get_question_graph
+from haven.projects.question_bundle import (
+    get_guidance_closures,
+    get_question_bundle,
+)
+
+
+@pytest.mark.django_db
+class TestGuidanceClosures:
+    def make_questions(self):
+        question_set = recipes.question_set.make()
+        linked = recipes.question.make(
+            question_set=question_set,
+            name="linked",
+            question='Is it <a href="#first">first</a>?',
+            yes_tier=1,
+            no_tier=0,
+        )
+        plain = recipes.question.make(
+            question_set=question_set,
+            name="plain",
+            question="Is it plain?",
+            yes_question=linked,
+            no_tier=0,
+        )
+        for name, guidance in [
+            ("first", '<p>See <a href="#second">second</a></p>'),
+            ("second", '<p>See <a href="#first">first</a> and <a href="#missing">missing</a></p>'),
+            ("plain", '<p>Explains <a href="#third">third</a></p>'),
+            ("third", "<p>Third</p>"),
+            ("unused", "<p>Unused</p>"),
+        ]:
+            ClassificationGuidance.objects.create(
+                name=name, guidance=guidance, question_set=question_set
+            )
+        return get_question_graph(question_set.id), linked, plain
+
+    def test_closure(self):
+        graph, linked, plain = self.make_questions()
+
+        closures = get_guidance_closures(graph)
+
+        explanation, guidance = closures[linked.id]
+        assert explanation is None
+        assert [g.name for g in guidance] == ["first", "second"]
+        explanation, guidance = closures[plain.id]
+        assert explanation.name == "plain"
+        assert explanation.guidance == '<p>Explains <a href="#third">third</a></p>'
+        assert [g.name for g in guidance] == ["third"]
+
+    def test_computed_once(self):
+        graph, linked, plain = self.make_questions()
+        closures = get_guidance_closures(graph)
+
+        with CaptureQueriesContext(connection) as context:
+            assert get_guidance_closures(graph) is closures
+        assert len(context.captured_queries) == 0
+
+    def test_invalidated_on_guidance_change(self):
+        graph, linked, plain = self.make_questions()
+        get_guidance_closures(graph)
+        bundle = get_question_bundle(graph)
+        assert bundle["guidance"]["third"] == "<p>Third</p>"
+
+        third = ClassificationGuidance.objects.get(name="third")
+        third.guidance = '<p>Third, see <a href="#first">first</a></p>'
+        third.save()
+
+        explanation, guidance = get_guidance_closures(graph)[plain.id]
+        assert [g.name for g in guidance] == ["third", "first", "second"]
+        bundle = get_question_bundle(graph)
+        assert bundle["guidance"]["third"] == '<p>Third, see <a href="#first">first</a></p>'
@@ -0,0 +1,110 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haven.core import recipes
+from haven.core.sanitize import clean_html_no_links
+from haven.data.classification import initial_questions
+from haven.projects.models import (
+    ClassificationOpinion,
+    ClassificationOpinionQuestion,
+)
+from haven.projects.roles import ProjectRole
+from haven.projects.tables import ClassificationOpinionQuestionTable
+
+
+@pytest.mark.django_db
+class TestClassificationOpinionQuestionTable:
+    def make_opinions(self, work_package, answered):
+        """
+        Add an opinion on `work_package` for each list of answered questions in `answered`
+        """
+        opinions = []
+        for questions in answered:
+            opinion = ClassificationOpinion.objects.create(
+                work_package=work_package,
+                tier=0,
+                role=ProjectRole.RESEARCHER.value,
+                created_by=recipes.user.make(),
+            )
+            ClassificationOpinionQuestion.objects.bulk_create(
+                ClassificationOpinionQuestion(
+                    opinion=opinion,
+                    order=i,
+                    question=question,
+                    question_version=question.history.latest().history_id,
+                    answer=i % 2 == 0,
+                )
+                for i, question in enumerate(questions)
+            )
+            opinions.append(opinion)
+        return opinions
+
+    def test_merges_question_order(self):
+        work_package = recipes.work_package.make()
+        question_set = recipes.question_set.make()
+        q = [recipes.question.make(question_set=question_set, question=f"Q{i}") for i in range(7)]
+        self.make_opinions(
+            work_package,
+            [
+                [q[1], q[2], q[4]],
+                [q[1], q[3], q[4], q[5]],
+                [q[0], q[2]],
+                [q[6], q[0]],
+            ],
+        )
+
+        table = ClassificationOpinionQuestionTable(work_package.classifications.all())
+
+        rows = [row[0] for row in table.as_values()][1:]
+        assert rows == ["Q1", "Q6", "Q0", "Q2", "Q3", "Q4", "Q5"]
+
+    def test_shows_question_as_answered(self):
+        work_package = recipes.work_package.make()
+        question = recipes.question.make(question="Before")
+        self.make_opinions(work_package, [[question]])
+        question.question = "After"
+        question.save()
+
+        table = ClassificationOpinionQuestionTable(work_package.classifications.all())
+
+        assert [row[0] for row in table.as_values()][1:] == ["Before"]
+
+    def test_many_opinions(self):
+        work_package = recipes.work_package.make()
+        question_set = recipes.question_set.make()
+        questions = recipes.question.make(question_set=question_set, _quantity=40)
+        # Each opinion answers the questions in a different order, so rows are merged
+        answered = [questions[i:] + questions[:i] for i in range(0, 40, 4)]
+        self.make_opinions(work_package, answered)
+
+        with CaptureQueriesContext(connection) as context:
+            table = ClassificationOpinionQuestionTable(work_package.classifications.all())
+
+        # Opinions, their authors, their answers and the questions as they were answered
+        assert len(context.captured_queries) == 4
+        assert len(table.rows) == 40
+        assert len(table.columns) == 11
+
+    def test_sanitizes_each_question_once(self):
+        work_package = recipes.work_package.make()
+        question_set = recipes.question_set.make()
+        questions = [
+            recipes.question.make(question_set=question_set, question=q["question"])
+            for q in initial_questions()
+        ]
+        self.make_opinions(work_package, [questions] * 10)
+
+        def render():
+            table = ClassificationOpinionQuestionTable(work_package.classifications.all())
+            return [row.get_cell("question") for row in table.rows]
+
+        clean_html_no_links.cache_clear()
+        cold_cells = render()
+        misses = clean_html_no_links.cache_info().misses
+        warm_cells = render()
+
+        assert warm_cells == cold_cells
+        # Each question's text is only sanitized the first time it is rendered
+        assert misses == len({q.question for q in questions})
+        assert clean_html_no_links.cache_info().misses == misses
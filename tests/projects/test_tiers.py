@@ -0,0 +1,145 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from haven.projects.models import WorkPackage, WorkPackageStatus
+from haven.projects.tiers import (
+    NO_OPINIONS,
+    TierConsensus,
+    calculate_tier,
+    get_tier_consensus,
+    recalculate_all_tiers,
+)
+
+
+def close_without_tier(work_package):
+    """Mark a work package's classification as closed, without calculating its tier"""
+    WorkPackage.objects.filter(pk=work_package.pk).update(status=WorkPackageStatus.CLASSIFIED.value)
+    work_package.refresh_from_db()
+    return work_package
+
+
+@pytest.mark.django_db
+class TestTierConsensus:
+    def test_single_query(
+        self, classified_work_package, investigator, data_provider_representative
+    ):
+        agreed = classified_work_package(None)
+        agreed.classify_as(2, investigator.user)
+        agreed.classify_as(2, data_provider_representative.user)
+        conflict = classified_work_package(None)
+        conflict.classify_as(0, investigator.user)
+        conflict.classify_as(1, data_provider_representative.user)
+        unclassified = classified_work_package(None)
+
+        with CaptureQueriesContext(connection) as context:
+            consensus = get_tier_consensus([agreed.pk, conflict.pk, unclassified.pk])
+        assert len(context.captured_queries) == 1
+
+        assert consensus[agreed.pk][:3] == (2, 1, 2)
+        assert consensus[conflict.pk][:3] == (2, 2, 0)
+        assert consensus[unclassified.pk] == NO_OPINIONS
+        assert isinstance(consensus[agreed.pk], TierConsensus)
+
+
+@pytest.mark.django_db
+class TestCalculateTier:
+    def test_recalculated_when_conflict_resolved(
+        self, classified_work_package, investigator, data_provider_representative
+    ):
+        work_package = classified_work_package(None)
+        work_package.classify_as(0, investigator.user)
+        work_package.classify_as(1, data_provider_representative.user)
+        work_package.close_classification()
+        assert work_package.tier_conflict
+        assert not work_package.has_tier
+
+        work_package.classification_for(investigator.user).delete()
+        work_package.refresh_from_db()
+        assert not work_package.has_tier
+
+        work_package.classify_as(1, investigator.user)
+        work_package.refresh_from_db()
+        assert work_package.tier == 1
+
+    def test_not_recalculated_before_close(
+        self, classified_work_package, investigator, data_provider_representative
+    ):
+        work_package = classified_work_package(None)
+        work_package.classify_as(0, investigator.user)
+        work_package.classify_as(0, data_provider_representative.user)
+
+        work_package.refresh_from_db()
+        assert work_package.is_classification_ready
+        assert not work_package.has_tier
+
+    def test_unchanged_inputs_skipped(self, classified_work_package, investigator):
+        work_package = close_without_tier(classified_work_package(None))
+        work_package.classify_as(0, investigator.user)
+        assert not work_package.has_tier
+
+        # The work package was found not to be ready when it was classified, and nothing has
+        # changed since, so only its inputs are read
+        with CaptureQueriesContext(connection) as context:
+            assert not calculate_tier(work_package)
+        assert len(context.captured_queries) == 2
+
+        with CaptureQueriesContext(connection) as context:
+            assert not calculate_tier(work_package, force=True)
+        assert len(context.captured_queries) > 2
+
+    def test_skipped_after_single_query_on_conflict(
+        self, classified_work_package, investigator, data_provider_representative
+    ):
+        work_package = classified_work_package(None)
+        work_package.classify_as(0, investigator.user)
+        work_package.classify_as(1, data_provider_representative.user)
+
+        with CaptureQueriesContext(connection) as context:
+            assert not calculate_tier(work_package, force=True)
+        assert len(context.captured_queries) == 1
+
+
+@pytest.mark.django_db
+class TestRecalculateAllTiers:
+    def make_work_packages(
+        self, classified_work_package, investigator, data_provider_representative
+    ):
+        ready = []
+        for tier in [0, 1, 1]:
+            work_package = classified_work_package(None)
+            work_package.classify_as(tier, investigator.user)
+            work_package.classify_as(tier, data_provider_representative.user)
+            ready.append(close_without_tier(work_package))
+        not_ready = classified_work_package(None)
+        not_ready.classify_as(0, investigator.user)
+        not_ready = close_without_tier(not_ready)
+        return ready, not_ready
+
+    def test_recalculate_all_tiers(
+        self, classified_work_package, investigator, data_provider_representative
+    ):
+        ready, not_ready = self.make_work_packages(
+            classified_work_package, investigator, data_provider_representative
+        )
+
+        assert list(recalculate_all_tiers(chunk_size=3)) == [3, 0]
+
+        for work_package, tier in zip(ready, [0, 1, 1]):
+            work_package.refresh_from_db()
+            assert work_package.tier == tier
+        not_ready.refresh_from_db()
+        assert not not_ready.has_tier
+
+    def test_command(
+        self, classified_work_package, investigator, data_provider_representative, capsys
+    ):
+        ready, not_ready = self.make_work_packages(
+            classified_work_package, investigator, data_provider_representative
+        )
+
+        call_command("recalculate_tiers", "--chunk-size", "2", "--workers", "1")
+
+        assert capsys.readouterr().out == "Assigned a tier to 3 work packages\n"
+        assert WorkPackage.objects.filter(tier__isnull=False).count() == 3
@@ -1,7 +1,15 @@
+import csv
+import io
 import json
+from unittest.mock import patch
 
 import bleach
 import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from taggit.models import Tag, TaggedItem
 
 from haven.core import recipes
 from haven.data.classification import insert_initial_questions
@@ -10,17 +18,26 @@ from haven.data.models import (
     ClassificationQuestion,
     ClassificationQuestionSet,
 )
+from haven.data.question_graph import get_default_question_graph
 from haven.identity.models import User
 from haven.projects.models import (
+    ClassificationDraft,
     ClassificationOpinion,
+    Participant,
     Policy,
     PolicyAssignment,
     PolicyGroup,
     Project,
+    ProjectDataset,
     WorkPackageStatus,
 )
 from haven.projects.policies import insert_initial_policies
 from haven.projects.roles import ProjectRole
+from haven.projects.views import (
+    ProjectHistory,
+    ProjectHistoryExport,
+    ProjectList,
+)
 
 
 @pytest.mark.django_db
@@ -163,6 +180,90 @@ class TestListProjects:
         response = as_system_manager.get("/projects/?programme=prog1")
         assert response.status_code == 404
 
+    def test_list_projects_by_role(self, as_project_participant):
+        project1, project2, project3 = recipes.project.make(_quantity=3)
+        user = as_project_participant._user
+        recipes.participant.make(project=project1, user=user, role=ProjectRole.RESEARCHER.value)
+        recipes.participant.make(project=project2, user=user, role=ProjectRole.REFEREE.value)
+
+        response = as_project_participant.get("/projects/?role=researcher")
+        assert list(response.context["projects"]) == [project1]
+
+        response = as_project_participant.get("/projects/?role=referee")
+        assert list(response.context["projects"]) == [project2]
+
+        response = as_project_participant.get("/projects/?role=investigator")
+        assert list(response.context["projects"]) == []
+
+    def test_invalid_role(self, as_project_participant):
+        response = as_project_participant.get("/projects/?role=nonsense")
+        assert response.status_code == 404
+
+    def test_paginated(self, as_system_manager):
+        projects = recipes.project.make(_quantity=3)
+        for project in projects:
+            project.programmes.add("prog1")
+
+        with patch.object(ProjectList, "paginate_by", 2):
+            response = as_system_manager.get("/projects/?programme=prog1")
+            assert list(response.context["projects"]) == projects[:0:-1]
+            assert "?programme=prog1&page=2" in response.content.decode()
+
+            response = as_system_manager.get("/projects/?programme=prog1&page=2")
+            assert list(response.context["projects"]) == projects[:1]
+
+    def make_projects(self, count, user):
+        """Quickly make `count` projects in a programme, with `user` participating in each"""
+        question_set = ClassificationQuestionSet.objects.get(
+            pk=ClassificationQuestionSet.get_default_id()
+        )
+        Project.objects.bulk_create(
+            Project(
+                name=f"Project {i}",
+                description="Description",
+                created_by=user,
+                question_set=question_set,
+            )
+            for i in range(count)
+        )
+        project_ids = list(Project.objects.values_list("pk", flat=True))
+        Participant.objects.bulk_create(
+            Participant(
+                project_id=project_id,
+                user=user,
+                role=ProjectRole.RESEARCHER.value,
+                created_by=user,
+            )
+            for project_id in project_ids
+        )
+        tag = Tag.objects.create(name="Programme", slug="programme")
+        content_type = ContentType.objects.get_for_model(Project)
+        TaggedItem.objects.bulk_create(
+            TaggedItem(tag=tag, content_type=content_type, object_id=project_id)
+            for project_id in project_ids
+        )
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    @pytest.mark.parametrize(
+        "url", ["/projects/", "/projects/?programme=programme&role=researcher"]
+    )
+    def test_constant_queries(self, as_project_participant, url):
+        user = as_project_participant._user
+        self.make_projects(10, user)
+        small = self.count_queries(as_project_participant, url)
+
+        Project.objects.all().delete()
+        Tag.objects.all().delete()
+        self.make_projects(10000, user)
+        large = self.count_queries(as_project_participant, url)
+
+        assert large == small
+
 
 @pytest.mark.django_db
 class TestViewProject:
@@ -210,6 +311,38 @@ class TestViewProject:
 
         assert response.status_code == 404
 
+    def make_rows(self, project, count):
+        """Add `count` participants, work packages and datasets to a project"""
+        creator = project.created_by
+        for _ in range(count):
+            user = recipes.user.make(created_by=creator)
+            recipes.participant.make(
+                project=project, user=user, role=ProjectRole.RESEARCHER.value, created_by=creator
+            )
+            recipes.work_package.make(project=project, created_by=creator)
+            ProjectDataset.objects.create(
+                project=project,
+                dataset=recipes.dataset.make(),
+                representative=user,
+                created_by=creator,
+            )
+
+    def count_queries(self, client, project):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f"/projects/{project.uuid}")
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    def test_constant_queries(self, as_programme_manager):
+        project = recipes.project.make(created_by=as_programme_manager._user)
+        self.make_rows(project, 2)
+        small = self.count_queries(as_programme_manager, project)
+
+        self.make_rows(project, 100)
+        large = self.count_queries(as_programme_manager, project)
+
+        assert large == small
+
 
 @pytest.mark.django_db
 class TestViewProjectHistory:
@@ -234,6 +367,117 @@ class TestViewProjectHistory:
             "Changes",
         ]
 
+    def make_history(self, settings, user, count):
+        """Make a project with a creation event followed by `count` update events"""
+        # Write audit log entries immediately, rather than when the transaction is committed
+        settings.TEST = True
+        project = recipes.project.make(created_by=user)
+        for i in range(count):
+            project.name = f"Name {i}"
+            project.save()
+        return project, list(project.get_audit_history().order_by("-datetime", "-pk"))
+
+    def get_event_ids(self, response):
+        return [event.pk for event in response.context["history_table"].data]
+
+    def test_keyset_pagination(self, settings, as_programme_manager):
+        project, events = self.make_history(settings, as_programme_manager._user, 4)
+        url = f"/projects/{project.uuid}/history"
+
+        with patch.object(ProjectHistory, "paginate_by", 2):
+            response = as_programme_manager.get(url)
+            assert self.get_event_ids(response) == [e.pk for e in events[:2]]
+            assert response.context["newer_cursor"] is None
+            assert response.context["older_cursor"] == events[1].pk
+
+            response = as_programme_manager.get(url, {"after": events[1].pk})
+            assert self.get_event_ids(response) == [e.pk for e in events[2:4]]
+            assert response.context["newer_cursor"] == events[2].pk
+            assert response.context["older_cursor"] == events[3].pk
+
+            response = as_programme_manager.get(url, {"after": events[3].pk})
+            assert self.get_event_ids(response) == [events[4].pk]
+            assert response.context["older_cursor"] is None
+
+            response = as_programme_manager.get(url, {"before": events[4].pk})
+            assert self.get_event_ids(response) == [e.pk for e in events[2:4]]
+            assert response.context["newer_cursor"] == events[2].pk
+
+            # Invalid cursors show the first page
+            response = as_programme_manager.get(url, {"after": "invalid"})
+            assert self.get_event_ids(response) == [e.pk for e in events[:2]]
+
+    def test_details_loaded_separately(self, settings, as_programme_manager):
+        project, (event, *_) = self.make_history(settings, as_programme_manager._user, 1)
+
+        response = as_programme_manager.get(f"/projects/{project.uuid}/history")
+        assert event.object_json_repr not in response.content.decode()
+        detail_url = f"/projects/{project.uuid}/history/{event.pk}"
+        assert detail_url in response.content.decode()
+
+        response = as_programme_manager.get(detail_url)
+        assert response.json() == {
+            "object_json_repr": event.object_json_repr,
+            "changed_fields": event.changed_fields,
+        }
+
+    def test_details_of_other_project(self, settings, as_programme_manager):
+        project = recipes.project.make(created_by=as_programme_manager._user)
+        _, (event, *_) = self.make_history(settings, as_programme_manager._user, 1)
+
+        response = as_programme_manager.get(f"/projects/{project.uuid}/history/{event.pk}")
+        assert response.status_code == 404
+
+    def test_export_csv(self, settings, as_programme_manager):
+        project, events = self.make_history(settings, as_programme_manager._user, 3)
+
+        with patch.object(ProjectHistoryExport, "chunk_size", 2):
+            response = as_programme_manager.get(f"/projects/{project.uuid}/history/export.csv")
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert [int(row["id"]) for row in rows] == [e.pk for e in reversed(events)]
+        assert rows[-1]["object_json_repr"] == events[0].object_json_repr
+
+    def test_export_csv_escapes_formulas(self, settings, as_programme_manager):
+        project, events = self.make_history(settings, as_programme_manager._user, 0)
+        name = '=HYPERLINK("https://example.com", "Click")'
+        project.name = name
+        project.save()
+
+        response = as_programme_manager.get(f"/projects/{project.uuid}/history/export.csv")
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert rows[-1]["object_repr"] == "'" + name
+
+        response = as_programme_manager.get(f"/projects/{project.uuid}/history/export.jsonl")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert json.loads(lines[-1])["object_repr"] == name
+
+    def test_export_jsonl(self, settings, as_programme_manager):
+        project, events = self.make_history(settings, as_programme_manager._user, 3)
+
+        with patch.object(ProjectHistoryExport, "chunk_size", 2):
+            response = as_programme_manager.get(f"/projects/{project.uuid}/history/export.jsonl")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [e.pk for e in reversed(events)]
+        assert json.loads(lines[0])["event_type"] == "Create"
+
+    def test_export_unknown_format(self, as_programme_manager):
+        project = recipes.project.make(created_by=as_programme_manager._user)
+
+        response = as_programme_manager.get(f"/projects/{project.uuid}/history/export.xml")
+        assert response.status_code == 404
+
+    def test_export_requires_permission(self, as_standard_user, programme_manager):
+        project = recipes.project.make(created_by=programme_manager)
+
+        response = as_standard_user.get(f"/projects/{project.uuid}/history/export.csv")
+        assert response.status_code in (403, 404)
+
 
 @pytest.mark.django_db
 class TestArchiveProject:
@@ -324,6 +568,52 @@ class TestViewWorkPackage:
             [user3.display_name(), "Researcher", "False", "False"],
         ]
 
+    def make_rows(self, work_package, count):
+        """Add `count` researchers and datasets to a work package, and opinions on it"""
+        project = work_package.project
+        creator = project.created_by
+        representative = project.get_participant(
+            ProjectRole.DATA_PROVIDER_REPRESENTATIVE.value
+        ).user
+        for _ in range(count):
+            user = recipes.user.make()
+            project.add_user(user, ProjectRole.RESEARCHER.value, creator)
+            work_package.add_user(user, creator)
+            dataset = recipes.dataset.make()
+            project.add_dataset(dataset, representative, creator)
+            work_package.add_dataset(dataset, creator)
+            ClassificationOpinion.objects.create(
+                work_package=work_package,
+                tier=work_package.tier or 0,
+                role=ProjectRole.RESEARCHER.value,
+                created_by=user,
+            )
+
+    def count_queries(self, client, work_package):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                f"/projects/{work_package.project.uuid}/work_packages/{work_package.uuid}"
+            )
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    @pytest.mark.parametrize("tier", [None, 3])
+    def test_constant_queries(self, classified_work_package, tier, client):
+        work_package = classified_work_package(tier)
+        representative = work_package.project.get_participant(
+            ProjectRole.DATA_PROVIDER_REPRESENTATIVE.value
+        ).user
+        client.force_login(representative)
+        self.make_rows(work_package, 2)
+        # The first request loads the policies of each tier, which are kept from then on
+        self.count_queries(client, work_package)
+        small = self.count_queries(client, work_package)
+
+        self.make_rows(work_package, 20)
+        large = self.count_queries(client, work_package)
+
+        assert large == small
+
 
 @pytest.mark.django_db
 class TestEditProject:
@@ -2330,6 +2620,121 @@ class TestWorkPackageClassifyData:
         assert response.context["work_package"] == work_package
         assert "question" in response.context
 
+    def test_no_question_queries(self, as_project_participant, programme_manager):
+        insert_initial_questions(
+            ClassificationQuestion, ClassificationGuidance, ClassificationQuestionSet
+        )
+        project = recipes.project.make(created_by=programme_manager)
+        work_package = recipes.work_package.make(
+            project=project, status=WorkPackageStatus.UNDERWAY.value
+        )
+        project.add_user(
+            user=as_project_participant._user,
+            role=ProjectRole.DATA_PROVIDER_REPRESENTATIVE.value,
+            created_by=programme_manager,
+        )
+        work_package.add_user(user=as_project_participant._user, created_by=programme_manager)
+        starting_question = ClassificationQuestion.objects.get_starting_question()
+        url = self.url(work_package, f"classify/{starting_question.pk}")
+        as_project_participant.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = as_project_participant.post(url, {"submit_no": "No"}, follow=True)
+        assert response.status_code == 200
+
+        tables = [
+            f'"{model._meta.db_table}"'
+            for model in [ClassificationQuestion, ClassificationQuestionSet, ClassificationGuidance]
+        ]
+        assert not [
+            q["sql"] for q in context.captured_queries if any(table in q["sql"] for table in tables)
+        ]
+
+    def setup_classification(self, client, programme_manager):
+        insert_initial_questions(
+            ClassificationQuestion, ClassificationGuidance, ClassificationQuestionSet
+        )
+        project = recipes.project.make(created_by=programme_manager)
+        work_package = recipes.work_package.make(
+            project=project, status=WorkPackageStatus.UNDERWAY.value
+        )
+        project.add_user(
+            user=client._user,
+            role=ProjectRole.DATA_PROVIDER_REPRESENTATIVE.value,
+            created_by=programme_manager,
+        )
+        work_package.add_user(user=client._user, created_by=programme_manager)
+        return work_package
+
+    def test_single_write_per_answer(self, as_project_participant, programme_manager):
+        work_package = self.setup_classification(as_project_participant, programme_manager)
+        starting_question = ClassificationQuestion.objects.get_starting_question()
+        url = self.url(work_package, f"classify/{starting_question.pk}")
+        as_project_participant.get(url)
+
+        draft_table = ClassificationDraft._meta.db_table
+        question = starting_question
+        expected = {}
+        for _ in range(2):
+            # Answer so that there is another question to come
+            answer = question.no_question is None
+            url = self.url(work_package, f"classify/{question.pk}")
+            with CaptureQueriesContext(connection) as context:
+                response = as_project_participant.post(
+                    url, {"submit_yes": "Yes"} if answer else {"submit_no": "No"}
+                )
+            assert response.status_code == 302
+            # Loading the draft, then inserting or updating it
+            draft_queries = [q["sql"] for q in context.captured_queries if draft_table in q["sql"]]
+            assert len(draft_queries) == 2
+            assert draft_queries[0].startswith("SELECT")
+            assert not draft_queries[1].startswith("SELECT")
+            expected[str(question.pk)] = answer
+            question = question.yes_question if answer else question.no_question
+
+        draft = ClassificationDraft.objects.get(
+            work_package=work_package, user=as_project_participant._user
+        )
+        assert draft.answers == expected
+        assert not draft.is_modification
+
+    def test_answers_shared_between_sessions(self, as_project_participant, programme_manager):
+        work_package = self.setup_classification(as_project_participant, programme_manager)
+        starting_question = ClassificationQuestion.objects.get_starting_question()
+        url = self.url(work_package, f"classify/{starting_question.pk}")
+        as_project_participant.get(url)
+        as_project_participant.post(url, {"submit_yes": "Yes"})
+        next_question = starting_question.yes_question
+
+        # Another worker, without the original session, carries on from the same answers
+        other_client = Client()
+        other_client.force_login(as_project_participant._user)
+        response = other_client.get(self.url(work_package, f"classify/{next_question.pk}"))
+        assert response.context["question"].name == next_question.name
+        assert response.context["question_number"] == 2
+        assert response.context["previous_question"].name == starting_question.name
+
+    def test_going_back_clears_later_answers(self, as_project_participant, programme_manager):
+        work_package = self.setup_classification(as_project_participant, programme_manager)
+        starting_question = ClassificationQuestion.objects.get_starting_question()
+        url = self.url(work_package, f"classify/{starting_question.pk}")
+        as_project_participant.get(url)
+        as_project_participant.post(url, {"submit_no": "No"})
+        second = starting_question.no_question
+        second_url = self.url(work_package, f"classify/{second.pk}")
+        as_project_participant.post(second_url, {"submit_no": "No"})
+
+        response = as_project_participant.get(url)
+        assert response.context["question_number"] == 1
+        draft = ClassificationDraft.objects.get(
+            work_package=work_package, user=as_project_participant._user
+        )
+        assert draft.answers == {}
+
+        # Starting again removes the draft
+        as_project_participant.get(self.url(work_package))
+        assert not ClassificationDraft.objects.filter(work_package=work_package).exists()
+
     def test_returns_404_for_invisible_project(self, as_standard_user):
         project = recipes.project.make()
         work_package = recipes.work_package.make(project=project)
@@ -3574,6 +3979,148 @@ class TestWorkPackageClassifyData:
         )
 
 
+@pytest.mark.django_db
+class TestWorkPackageClassifyAll:
+    def url(self, work_package, page="classify_all"):
+        return f"/projects/{work_package.project.uuid}/work_packages/{work_package.uuid}/{page}"
+
+    def setup_questions(self):
+        insert_initial_questions(
+            ClassificationQuestion,
+            ClassificationGuidance,
+            ClassificationQuestionSet,
+            question_set_exists=True,
+        )
+        return get_default_question_graph()
+
+    def answer_all(self, graph, answer):
+        """Return the path of answers from answering every question the same way"""
+        answers = []
+        question = graph.start
+        while not isinstance(question, int):
+            answers.append([question.id, answer])
+            question = graph.next(question, answer)
+        return answers, question
+
+    def test_bundle(self, classified_work_package, as_investigator):
+        graph = self.setup_questions()
+        work_package = classified_work_package(None)
+
+        response = as_investigator.get(self.url(work_package))
+
+        assert response.status_code == 200
+        bundle = response.context["bundle"]
+        assert bundle["start"] == graph.start.id
+        assert set(bundle["questions"]) == set(graph.questions)
+        start = bundle["questions"][graph.start.id]
+        assert start["yes"] == {"question": graph.start.yes_question_id}
+        assert start["guidance"]
+        for name in start["guidance"]:
+            assert name in bundle["guidance"]
+        assert b'id="classification-bundle"' in response.content
+
+    def test_bundle_sanitized(self, classified_work_package, as_investigator):
+        question_set = recipes.question_set.make()
+        recipes.question.make(
+            question_set=question_set,
+            question='<a href="#more">Is it</a> <script>alert(1)</script>?',
+            yes_tier=1,
+            no_tier=0,
+        )
+        work_package = classified_work_package(None)
+        work_package.project.question_set = question_set
+        work_package.project.save()
+
+        response = as_investigator.get(self.url(work_package))
+
+        question = list(response.context["bundle"]["questions"].values())[0]
+        assert "<script>" not in question["question"]
+        assert '<a href="#more">' in question["question"]
+        assert question["summary"] == "Is it &lt;script&gt;alert(1)&lt;/script&gt;?"
+        assert question["yes"] == {"tier": 1}
+
+    def test_submit(self, classified_work_package, as_investigator):
+        graph = self.setup_questions()
+        work_package = classified_work_package(None)
+        answers, tier = self.answer_all(graph, False)
+
+        with CaptureQueriesContext(connection) as context:
+            response = as_investigator.post(
+                self.url(work_package), {"answers": json.dumps(answers)}
+            )
+
+        assert response.status_code == 302
+        assert response.url == self.url(work_package, "classify_results")
+        question_table = ClassificationQuestion._meta.db_table
+        assert not [q for q in context.captured_queries if f'"{question_table}"' in q["sql"]]
+
+        classification = work_package.classification_for(as_investigator._user).get()
+        assert classification.tier == tier
+        assert [
+            [q.question_id, q.answer] for q in classification.questions.order_by("order")
+        ] == answers
+
+    def test_submit_modification(self, classified_work_package, as_investigator):
+        graph = self.setup_questions()
+        work_package = classified_work_package(None)
+        work_package.classify_as(0, as_investigator._user)
+        answers, tier = self.answer_all(graph, True)
+
+        response = as_investigator.post(self.url(work_package), {"answers": json.dumps(answers)})
+        assert response.status_code == 302
+        assert work_package.classification_for(as_investigator._user).get().tier == 0
+
+        response = as_investigator.post(
+            self.url(work_package) + "?modify=1", {"answers": json.dumps(answers)}
+        )
+        assert response.status_code == 302
+        assert work_package.classification_for(as_investigator._user).get().tier == tier
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda answers: answers[:-1],
+            lambda answers: answers + [answers[-1]],
+            lambda answers: answers[1:],
+            lambda answers: [[answers[0][0], "yes"]] + answers[1:],
+            lambda answers: [[answers[0][0], not answers[0][1]]] + answers[1:],
+            lambda answers: answers[0],
+            lambda answers: "invalid",
+        ],
+    )
+    def test_submit_invalid(self, classified_work_package, as_investigator, change):
+        graph = self.setup_questions()
+        work_package = classified_work_package(None)
+        answers, tier = self.answer_all(graph, False)
+
+        response = as_investigator.post(
+            self.url(work_package), {"answers": json.dumps(change(answers))}
+        )
+
+        assert response.status_code == 400
+        assert "bundle" in response.context
+        assert [m.message for m in response.context["messages"]] == [
+            "Your answers could not be saved. Please answer the questions again."
+        ]
+        assert not work_package.classification_for(as_investigator._user).exists()
+
+    def test_already_classified(self, classified_work_package, as_investigator):
+        self.setup_questions()
+        work_package = classified_work_package(None)
+        work_package.classify_as(0, as_investigator._user)
+
+        response = as_investigator.get(self.url(work_package))
+
+        assert response.status_code == 302
+        assert response.url == self.url(work_package, "classify_results")
+
+    def test_returns_404_for_invisible_project(self, classified_work_package, as_standard_user):
+        work_package = classified_work_package(None)
+
+        response = as_standard_user.get(self.url(work_package))
+        assert response.status_code == 404
+
+
 @pytest.mark.django_db
 class TestWorkPackageClassifyResults:
     def url(self, work_package, page="classify_results"):
@@ -0,0 +1,323 @@
+"""
+Query-count budgets for every named route in the projects, identity and API apps
+
+Each route is requested against data scaled to 1, 10 and 100 related rows (participants,
+datasets, work packages, audit events, programmes and users), and the test fails if a route's
+query count grows with the amount of data, which is the signature of an N+1 query, or exceeds the
+route's budget. Adding a route without a budget also fails, so new views are covered from the
+start.
+
+Run with ``pytest tests/test_query_budgets.py -s`` to see the table of query counts.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils.timezone import make_aware
+from oauth2_provider.models import AccessToken
+from rest_framework.test import APIClient
+
+from haven.core import recipes
+from haven.data.classification import insert_initial_questions
+from haven.data.models import (
+    ClassificationGuidance,
+    ClassificationQuestion,
+    ClassificationQuestionSet,
+)
+from haven.data.tiers import Tier
+from haven.projects.models import WorkPackage, WorkPackageStatus
+from haven.projects.roles import ProjectRole
+
+
+SIZES = [1, 10, 100]
+
+
+class Route:
+    """
+    How to request a route and how many queries it may make
+
+    `budget` is the most queries the route may make. `kwargs` maps each URL keyword argument to
+    the attribute of the `World` supplying it, and `user` is the `World` attribute for who makes
+    the request. `query` is an optional query string for views which need one, and `status` the
+    expected response status.
+
+    `batched` routes read rows in fixed-size batches, so make an extra query per batch. Routes
+    with a `n_plus_one` issue are known to make queries per row; the test fails once they stop
+    doing so, so that the issue is removed and the route's count is held constant from then on.
+    """
+
+    def __init__(
+        self,
+        budget,
+        user="manager",
+        kwargs=None,
+        query=None,
+        status=200,
+        batched=False,
+        n_plus_one=None,
+    ):
+        self.budget = budget
+        self.user = user
+        self.kwargs = kwargs or {}
+        self.query = query
+        self.status = status
+        self.batched = batched
+        self.n_plus_one = n_plus_one
+
+
+PROJECT = {"uuid": "project_uuid"}
+PROJECT_DATASET = {"project__uuid": "project_uuid", "uuid": "dataset_uuid"}
+UNUSED_DATASET = {"project__uuid": "project_uuid", "uuid": "unused_dataset_uuid"}
+NEW_WORK_PACKAGE = {"project__uuid": "project_uuid", "uuid": "new_work_package_uuid"}
+WORK_PACKAGE = {"project__uuid": "project_uuid", "uuid": "work_package_uuid"}
+READY_WORK_PACKAGE = {"project__uuid": "project_uuid", "uuid": "ready_work_package_uuid"}
+CLASSIFIED = {"project__uuid": "project_uuid", "uuid": "classified_work_package_uuid"}
+API_CLASSIFIED = {"work_packages__uuid": "classified_work_package_uuid"}
+API_PROJECT = {"projects__uuid": "project_uuid"}
+API_DATASET = {"uuid": "dataset_uuid"}
+
+ROUTES = {
+    "projects:list": Route(7),
+    "projects:create": Route(8),
+    "projects:programmes": Route(5),
+    "projects:detail": Route(30, kwargs=PROJECT),
+    "projects:edit": Route(12, kwargs=PROJECT),
+    "projects:history": Route(11, kwargs=PROJECT),
+    "projects:history_event": Route(7, kwargs={"uuid": "project_uuid", "event_id": "event_id"}),
+    "projects:history_export": Route(
+        10, kwargs={"uuid": "project_uuid", "format": "export_format"}, batched=True
+    ),
+    "projects:archive": Route(9, kwargs=PROJECT),
+    "projects:edit_participants": Route(335, kwargs=PROJECT, n_plus_one="participant formset"),
+    "projects:add_user": Route(9, kwargs=PROJECT),
+    "projects:edit_participant": Route(
+        11, kwargs={"project__uuid": "project_uuid", "uuid": "researcher_uuid"}
+    ),
+    "projects:add_dataset": Route(12, kwargs=PROJECT),
+    "projects:dataset_detail": Route(23, kwargs=PROJECT_DATASET),
+    "projects:delete_dataset": Route(13, kwargs=UNUSED_DATASET),
+    "projects:edit_dataset": Route(14, kwargs=UNUSED_DATASET),
+    "projects:edit_dataset_dpr": Route(14, kwargs=UNUSED_DATASET),
+    "projects:add_work_package": Route(10, kwargs=PROJECT),
+    "projects:work_package_detail": Route(44, kwargs=WORK_PACKAGE),
+    "projects:work_package_delete": Route(11, kwargs=NEW_WORK_PACKAGE),
+    "projects:work_package_edit": Route(11, kwargs=NEW_WORK_PACKAGE),
+    "projects:classify_data": Route(
+        19, user="investigator", kwargs={**WORK_PACKAGE, "question_pk": "question_pk"}
+    ),
+    "projects:classify_all": Route(19, user="investigator", kwargs=WORK_PACKAGE),
+    "projects:classify_results": Route(36, kwargs=WORK_PACKAGE),
+    "projects:classify_clear": Route(11, kwargs=WORK_PACKAGE),
+    "projects:classify_delete": Route(12, user="representative", kwargs=WORK_PACKAGE),
+    "projects:classify_close": Route(16, kwargs=READY_WORK_PACKAGE),
+    "projects:classify_open": Route(12, kwargs=NEW_WORK_PACKAGE),
+    "projects:work_package_add_dataset": Route(15, kwargs=NEW_WORK_PACKAGE),
+    "projects:work_package_edit_datasets": Route(
+        112, kwargs=NEW_WORK_PACKAGE, n_plus_one="dataset formset"
+    ),
+    "projects:work_package_add_participant": Route(12, kwargs=NEW_WORK_PACKAGE),
+    "projects:work_package_edit_participants": Route(
+        216, kwargs=WORK_PACKAGE, n_plus_one="participant formset"
+    ),
+    "projects:work_package_approve_participants": Route(
+        214, user="representative", kwargs=WORK_PACKAGE, n_plus_one="participant formset"
+    ),
+    "projects:autocomplete_dpr": Route(12, kwargs=PROJECT, query={"q": "user"}),
+    "projects:autocomplete_new_participant": Route(9, kwargs=PROJECT, query={"q": "user"}),
+    "projects:autocomplete_programme": Route(6, query={"q": "prog"}),
+    "identity:list": Route(7),
+    "identity:add_user": Route(6),
+    # Importing users is POST only
+    "identity:import_users": Route(4, status=405),
+    "identity:export_users": Route(5),
+    "identity:edit_user": Route(11, kwargs={"uuid": "researcher_uuid"}),
+    "api:schema": Route(32, user="api"),
+    "api:api-docs": Route(4, user="api"),
+    "api:dataset_list": Route(506, user="api", n_plus_one="dataset serializer"),
+    "api:dataset_detail": Route(10, user="api", kwargs=API_DATASET),
+    "api:dataset_expiry": Route(6, user="api", kwargs=API_DATASET),
+    "api:project_list": Route(9, user="api"),
+    "api:project_detail": Route(8, user="api", kwargs=PROJECT),
+    "api:project_work_package_list": Route(9, user="api", kwargs={"project__uuid": "project_uuid"}),
+    "api:project_work_package_detail": Route(8, user="api", kwargs=CLASSIFIED),
+    "api:project_work_package_policies": Route(6, user="api", kwargs=CLASSIFIED),
+    "api:project_dataset_list": Route(
+        506, user="api", kwargs=API_PROJECT, n_plus_one="dataset serializer"
+    ),
+    "api:project_dataset_detail": Route(10, user="api", kwargs={**API_PROJECT, **API_DATASET}),
+    "api:project_work_package_dataset_list": Route(
+        506, user="api", kwargs={**API_PROJECT, **API_CLASSIFIED}, n_plus_one="dataset serializer"
+    ),
+    "api:project_work_package_dataset_detail": Route(
+        10, user="api", kwargs={**API_PROJECT, **API_CLASSIFIED, **API_DATASET}
+    ),
+    "api:work_package_list": Route(9, user="api"),
+    "api:work_package_detail": Route(
+        8, user="api", kwargs={"uuid": "classified_work_package_uuid"}
+    ),
+    "api:work_package_dataset_list": Route(
+        506, user="api", kwargs=API_CLASSIFIED, n_plus_one="dataset serializer"
+    ),
+    "api:work_package_dataset_detail": Route(
+        10, user="api", kwargs={**API_CLASSIFIED, **API_DATASET}
+    ),
+}
+
+
+def get_route_names(namespace):
+    """Names of the routes defined directly in the urlconf included under `namespace`"""
+    namespace_resolver = get_resolver().namespace_dict[namespace][1]
+    return [
+        f"{namespace}:{pattern.name}"
+        for pattern in namespace_resolver.url_patterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    ]
+
+
+class World:
+    """
+    A project whose participants, datasets, work packages and programmes scale with `size`
+
+    Work packages are set up in each state the work package views need: `new_work_package` is
+    ready for classification to be opened, `work_package` has classification underway with an
+    opinion from the data provider representative, `ready_work_package` has all the opinions it
+    needs for classification to be closed, and `classified_work_package` is classified at tier 0
+    so that the API exposes it.
+    """
+
+    export_format = "csv"
+
+    def __init__(self, size, manager, oauth_application):
+        self.manager = manager
+        project = recipes.project.make(created_by=manager)
+
+        self.investigator = recipes.user.make()
+        self.representative = recipes.user.make()
+        project.add_user(self.investigator, ProjectRole.INVESTIGATOR.value, manager)
+        project.add_user(
+            self.representative, ProjectRole.DATA_PROVIDER_REPRESENTATIVE.value, manager
+        )
+        researchers = recipes.user.make(_quantity=size)
+        # Users who aren't on the project, for the autocomplete routes to find. Other usernames
+        # are random, so may or may not match too
+        for i in range(size):
+            recipes.user.make(username=f"user-{project.pk}-{i}@example.com")
+        for user in researchers:
+            project.add_user(user, ProjectRole.RESEARCHER.value, manager)
+
+        datasets = recipes.dataset.make(_quantity=size, default_representative=self.representative)
+        for dataset in datasets:
+            project.add_dataset(dataset, self.representative, manager)
+        # Datasets can only be edited or removed while they aren't used by a work package
+        unused_dataset = recipes.dataset.make(default_representative=self.representative)
+        project.add_dataset(unused_dataset, self.representative, manager)
+
+        work_packages = recipes.work_package.make(project=project, _quantity=4)
+        recipes.work_package.make(project=project, _quantity=size)
+        new_work_package, work_package, ready_work_package, classified_work_package = work_packages
+        for package in work_packages:
+            package.add_user(self.investigator, manager)
+            for dataset in datasets:
+                package.add_dataset(dataset, manager)
+        for user in researchers:
+            new_work_package.add_user(user, manager)
+            work_package.add_user(user, manager)
+        work_package.open_classification()
+        work_package.classify_as(Tier.ZERO, self.representative)
+        ready_work_package.open_classification()
+        ready_work_package.classify_as(Tier.ZERO, self.representative)
+        ready_work_package.classify_as(Tier.ZERO, self.investigator)
+        WorkPackage.objects.filter(pk=classified_work_package.pk).update(
+            status=WorkPackageStatus.CLASSIFIED.value, tier=Tier.ZERO
+        )
+
+        # Tagged last, as every work package change refreshes the programme summaries
+        project.programmes.add(*(f"{project.name} prog{i}" for i in range(size)))
+
+        self.api = AccessToken.objects.create(
+            token=f"token-{project.uuid}",
+            user=self.investigator,
+            application=oauth_application,
+            scope="read",
+            expires=make_aware(datetime.now() + timedelta(days=1)),
+        )
+        self.project_uuid = project.uuid
+        self.dataset_uuid = datasets[0].uuid
+        self.unused_dataset_uuid = unused_dataset.uuid
+        self.researcher_uuid = researchers[0].uuid
+        self.new_work_package_uuid = new_work_package.uuid
+        self.work_package_uuid = work_package.uuid
+        self.ready_work_package_uuid = ready_work_package.uuid
+        self.classified_work_package_uuid = classified_work_package.uuid
+        self.event_id = project.get_audit_history().values_list("pk", flat=True)[0]
+        self.question_pk = ClassificationQuestion.objects.get_starting_question().pk
+
+    def get_client(self, user):
+        requester = getattr(self, user)
+        client = APIClient()
+        if isinstance(requester, AccessToken):
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {requester.token}")
+        else:
+            client.force_login(requester)
+        return client
+
+    def count_queries(self, name, route):
+        """Request `route` and return the number of queries made"""
+        url = reverse(name, kwargs={k: getattr(self, v) for k, v in route.kwargs.items()})
+        client = self.get_client(route.user)
+        # Measure uncached responses
+        for cache in caches.all():
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, route.query)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        assert response.status_code == route.status, f"{name} returned {response.status_code}"
+        return len(context.captured_queries)
+
+
+def format_table(counts):
+    rows = [["Route", *(f"{size} rows" for size in SIZES), "Budget", "Known N+1"]]
+    for name, route in ROUTES.items():
+        rows.append([name, *map(str, counts[name]), str(route.budget), route.n_plus_one or ""])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows
+    )
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    def test_all_routes_have_budgets(self):
+        names = {
+            name
+            for namespace in ["projects", "identity", "api"]
+            for name in get_route_names(namespace)
+        }
+        assert names == set(ROUTES)
+
+    def test_query_budgets(self, settings, system_manager, application_profile):
+        settings.TEST = True
+        insert_initial_questions(
+            ClassificationQuestion, ClassificationGuidance, ClassificationQuestionSet
+        )
+        counts = {name: [] for name in ROUTES}
+        for size in SIZES:
+            world = World(size, system_manager, application_profile.application)
+            for name, route in ROUTES.items():
+                counts[name].append(world.count_queries(name, route))
+
+        table = format_table(counts)
+
+        growing = {name for name in ROUTES if counts[name][-1] > counts[name][0]}
+        unexpected = {
+            name for name in growing if not (ROUTES[name].batched or ROUTES[name].n_plus_one)
+        }
+        fixed = {name for name, route in ROUTES.items() if route.n_plus_one} - growing
+        over_budget = {name for name, route in ROUTES.items() if max(counts[name]) > route.budget}
+        assert not unexpected, f"Query counts grow with data size: {sorted(unexpected)}\n{table}"
+        assert not fixed, f"N+1 queries fixed, update their routes: {sorted(fixed)}\n{table}"
+        assert not over_budget, f"Query counts over budget: {sorted(over_budget)}\n{table}"